@@ -2,12 +2,14 @@
 # -*- coding: utf-8 -*-
 
 import flet as ft
-from src.client import DeepSeekClient
+from src.client import DeepSeekClient, RETRIEVED_CONTEXT_PRIORITY
 from src.file_manager import FileManager
 from src.settings_manager import SettingsManager
 from src.chat_view import ChatView
 from src.history_manager import HistoryManager  # 新增导入
 from src.concurrent_manager.conversation_manager import ConversationTab
+from src.ui_scheduler import get_ui_scheduler
+from src.workspace_index import WorkspaceRetriever
 from pathlib import Path
 
 APP_ROOT = Path(__file__).resolve().parent.parent.parent
@@ -29,16 +31,25 @@ class DeepSeekApp:
 
     def main(self, page: ft.Page):
         self.page = page
+        self.ui = get_ui_scheduler(page)  # 所有组件共享的 UI 更新调度器
         self._setup_page()
 
         # 在这里初始化需要 page 对象的管理器
-        self.file_manager = FileManager(main_page=page)
+        self.file_manager = FileManager(main_page=page, on_attach_file=self.chat_view.attach_file)
+        # 工作区检索：启用时每次发送前从文件管理的根目录检索相关片段（已附加的文件除外）
+        workspace_index = self.file_manager.file_explorer.workspace_index
+        self.client.add_context_provider(WorkspaceRetriever(
+            workspace_index, lambda: self.client.workspace_retrieval,
+            exclude=lambda: self.chat_view.attachments.paths), RETRIEVED_CONTEXT_PRIORITY)
+        if self.client.workspace_retrieval:
+            workspace_index.start()
         self.settings_manager.set_page(page)
         self.settings_manager.set_chat_view_ref(self.chat_view)  # 新增：设置聊天视图引用
         self.history_manager.set_page(page)  # 设置页面对象
 
         # 延迟初始化对话标签页，确保有 page 对象
         self.conversation_tab = ConversationTab(page)
+        page.on_close = self._on_close
 
         self.create_ui()
 
@@ -48,6 +59,11 @@ class DeepSeekApp:
         self.load_settings()
         self.file_manager.refresh_files(page)
 
+    def _on_close(self, e):
+        self.conversation_tab.close()
+        # 未保存的编辑、文件树快照和路径索引在去抖期间只在内存中，关闭前写入磁盘
+        self.file_manager.close()
+
     def _setup_page(self):
         self.page.title = "DeepSeek Chat"
         self.page.theme_mode = "dark"
@@ -77,8 +93,8 @@ class DeepSeekApp:
         self.current_tab = tab_index
         if self.tabs_control:
             self.tabs_control.selected_index = tab_index
-            if hasattr(self, 'page'):
-                self.page.update()
+            if hasattr(self, 'ui'):
+                self.ui.mark_dirty(self.tabs_control)
 
     def _on_tab_change(self, e):
         self.current_tab = e.control.selected_index
@@ -112,6 +128,14 @@ class DeepSeekApp:
         )
 
     def _on_keyboard_event(self, e: ft.KeyboardEvent):
+        # 文件管理页 Ctrl+P 打开快速打开面板，Ctrl+Shift+F 打开在文件中查找
+        if self.current_tab == 3 and self.file_manager and e.ctrl:
+            if e.key.upper() == "P":
+                self.file_manager.show_quick_open()
+                return
+            if e.shift and e.key.upper() == "F":
+                self.file_manager.show_search_panel()
+                return
         self.chat_view.handle_keyboard_event(e)
 
     def delete_conversation(self, filepath):
@@ -1,6 +1,9 @@
 import flet as ft
 import uuid
+from pathlib import Path
 from .client import DeepSeekClient
+from .file_context import FileAttachments
+from .ui_scheduler import get_ui_scheduler
 
 
 class ChatView:
@@ -12,7 +15,11 @@ class ChatView:
         self.current_conversation_name = "新的对话"
         self.chat_container = None
         self.page = None
+        self.ui = None
         self.current_message_id = None
+        # 附加到对话的文件，发送时由客户端按 token 预算选取相关片段
+        self.attachments = FileAttachments()
+        self.client.add_context_provider(self.attachments)
         self._create_controls()
 
     def _create_controls(self):
@@ -58,6 +65,8 @@ class ChatView:
                                              overlay_color="#334155"), height=32
         )
 
+        self.attachment_row = ft.Row([], spacing=6, wrap=True, visible=False)
+
         self.input_field.on_submit = lambda e: self.send_message()
         self.send_stop_button.on_click = lambda e: self.send_message()
         self.new_chat_button.on_click = lambda e: self.new_conversation()
@@ -72,24 +81,32 @@ class ChatView:
         self._update_input_hint()
         if self.input_field:
             self.input_field.hint_text = self.current_hint_text
-            if self.page:
-                self.input_field.update()
+            self._mark_dirty(self.input_field)
+
+    def _mark_dirty(self, *controls):
+        """标记需要刷新的控件，由 UI 调度器统一发送"""
+        if self.ui:
+            self.ui.mark_dirty(*controls)
 
     def create_chat_tab(self, page: ft.Page):
         """创建聊天标签页"""
         self.page = page
+        self.ui = get_ui_scheduler(page)
         self.chat_container = ft.Container(content=self.chat_display, expand=True, bgcolor="#0f172a", padding=0,
                                            margin=0, visible=False)
 
         input_container = ft.Container(
-            content=ft.Row([
-                ft.Container(
-                    content=self.input_field, expand=True, border_radius=12,
-                    border=ft.border.all(1, "rgba(99, 102, 241, 0.3)"),
-                    shadow=ft.BoxShadow(spread_radius=1, blur_radius=8, color="rgba(0, 0, 0, 0.3)",
-                                        offset=ft.Offset(0, 2), blur_style=ft.ShadowBlurStyle.OUTER)
-                ), self.send_stop_button
-            ], spacing=12),
+            content=ft.Column([
+                self.attachment_row,
+                ft.Row([
+                    ft.Container(
+                        content=self.input_field, expand=True, border_radius=12,
+                        border=ft.border.all(1, "rgba(99, 102, 241, 0.3)"),
+                        shadow=ft.BoxShadow(spread_radius=1, blur_radius=8, color="rgba(0, 0, 0, 0.3)",
+                                            offset=ft.Offset(0, 2), blur_style=ft.ShadowBlurStyle.OUTER)
+                    ), self.send_stop_button
+                ], spacing=12),
+            ], spacing=8, tight=True),
             padding=12, bgcolor="rgba(30, 41, 59, 0.9)", border_radius=0, margin=0
         )
 
@@ -176,7 +193,7 @@ class ChatView:
             self.current_responses[message_id] = ""  # 初始化该消息的响应内容
 
         self.chat_display.controls.append(message_card)
-        self.page.update()
+        self._mark_dirty(self.chat_display, self.welcome_container, self.chat_container, self.title_bar_container)
 
     def update_streaming_message(self, content: str, message_id: str = None):
         """更新流式输出的消息"""
@@ -196,7 +213,7 @@ class ChatView:
                 content_container = message.content.controls[0]
                 if isinstance(content_container.content, ft.Markdown):
                     content_container.content.value = self.current_responses[target_message_id] + "▌"
-                    self.page.update()
+                    self._mark_dirty(content_container.content)
                 break
 
     def complete_streaming_message(self, content: str = None, message_id: str = None):
@@ -219,7 +236,7 @@ class ChatView:
                 content_container = message.content.controls[0]
                 if isinstance(content_container.content, ft.Markdown):
                     content_container.content.value = final_content
-                    self.page.update()
+                    self._mark_dirty(content_container.content)
                 break
 
         # 清理该消息的响应数据
@@ -241,7 +258,7 @@ class ChatView:
             return
 
         self.input_field.value = ""
-        self.page.update()
+        self._mark_dirty(self.input_field)
 
         # 添加用户消息
         self.add_message("user", message)
@@ -256,7 +273,7 @@ class ChatView:
         self.send_stop_button.text = "停止"
         self.send_stop_button.on_click = lambda e: self.stop_generation()
         self.send_stop_button.bgcolor = "#dc2626"
-        self.page.update()
+        self._mark_dirty(self.send_stop_button)
 
         # 传递消息ID给回调函数
         def response_callback(content: str, msg_type: str):
@@ -281,14 +298,13 @@ class ChatView:
         elif msg_type == "start":
             # 流式输出开始，不需要特别处理
             pass
-        self.page.update()
 
     def _reset_send_button(self):
         """重置发送按钮状态"""
         self.send_stop_button.text = "发送"
         self.send_stop_button.on_click = lambda e: self.send_message()
         self.send_stop_button.bgcolor = "#6366f1"
-        self.page.update()
+        self._mark_dirty(self.send_stop_button)
 
     def stop_generation(self):
         """停止生成"""
@@ -301,12 +317,41 @@ class ChatView:
             self.complete_streaming_message(message_id=message_id)
 
         self.current_message_id = None
-        self.page.update()
+
+    def attach_file(self, path) -> bool:
+        """附加文件到对话（之后每次发送都会附带），已附加时返回 False"""
+        if not self.attachments.attach(path):
+            return False
+        self._render_attachments()
+        return True
+
+    def detach_file(self, path):
+        self.attachments.detach(path)
+        self._render_attachments()
+
+    def _render_attachments(self):
+        self.attachment_row.controls = [
+            ft.Container(
+                content=ft.Row([
+                    ft.Icon(ft.Icons.ATTACH_FILE, size=14, color="#a5b4fc"),
+                    ft.Text(Path(path).name, size=12, color="#e2e8f0", tooltip=path),
+                    ft.IconButton(ft.Icons.CLOSE, icon_size=12, icon_color="#94a3b8", tooltip="移除附件",
+                                  on_click=lambda e, path=path: self.detach_file(path),
+                                  style=ft.ButtonStyle(padding=0)),
+                ], spacing=4, tight=True),
+                padding=ft.padding.only(left=8, right=2), bgcolor="#312e81", border_radius=12, height=28,
+            )
+            for path in self.attachments.paths
+        ]
+        self.attachment_row.visible = bool(self.attachment_row.controls)
+        self._mark_dirty(self.attachment_row)
 
     def new_conversation(self):
         """新建对话"""
         self.chat_display.controls.clear()
         self.client.new_conversation()
+        self.attachments.clear()
+        self._render_attachments()
         self.welcome_container.visible = True
         if self.chat_container:
             self.chat_container.visible = False
@@ -315,14 +360,14 @@ class ChatView:
         self.conversation_title.value = self.current_conversation_name
         self.current_message_id = None
         self.current_responses.clear()  # 清空所有响应数据
-        self.page.update()
+        self._mark_dirty(self.chat_display, self.welcome_container, self.chat_container, self.title_bar_container,
+                         self.conversation_title)
 
     def handle_title_update_callback(self, new_title: str):
         """处理对话标题更新回调"""
         self.current_conversation_name = new_title
         self.conversation_title.value = self.current_conversation_name
-        self.conversation_title.update()
-        self.page.update()
+        self._mark_dirty(self.conversation_title)
 
     def load_conversation(self, history):
         """加载对话历史"""
@@ -342,11 +387,10 @@ class ChatView:
             if self.chat_container:
                 self.chat_container.visible = False
             self.title_bar_container.visible = False
-        self.page.update()
+        self._mark_dirty(self.chat_display, self.welcome_container, self.chat_container, self.title_bar_container)
 
     def update_conversation_name(self, name: str):
         """更新对话名称"""
         self.current_conversation_name = name
         self.conversation_title.value = self.current_conversation_name
-        self.conversation_title.update()
-        self.page.update()
\ No newline at end of file
+        self._mark_dirty(self.conversation_title)
\ No newline at end of file
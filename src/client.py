@@ -3,6 +3,15 @@
 
 import requests, json, datetime, threading, re, time, queue
 from pathlib import Path
+from .conversation_memory import ConversationMemory
+from .file_context import estimate_tokens
+
+# 模型的上下文窗口（token），附加上下文只能使用系统提示、历史、问题和回复预留之外的部分
+MODEL_CONTEXT_TOKENS = 65536
+# token 估算误差的安全余量
+CONTEXT_SAFETY_MARGIN = 1024
+# 自动检索的上下文（历史对话、工作区片段）的优先级：排在用户显式附加的文件（默认 0）之后，只使用剩余的预算
+RETRIEVED_CONTEXT_PRIORITY = 10
 
 
 class DeepSeekClient:
@@ -18,6 +27,10 @@ class DeepSeekClient:
         self.presence_penalty = 0.0
         self.system_content = "你是一个有用的AI助手"
         self.auto_save = self.streaming = self.auto_scroll = self.markdown_render = True
+        # 发送前自动从当前工作区检索相关代码片段（需要建立索引，默认关闭）
+        self.workspace_retrieval = False
+        # 发送前从已保存的历史对话中检索相关问答（本地索引，默认关闭）
+        self.conversation_memory = False
         self.theme = "dark"
         self.font_size = 14
         self.send_shortcut = "Enter"
@@ -29,12 +42,23 @@ class DeepSeekClient:
         self.current_streaming = False
         self.current_processing_thread = None
         self.stop_requested = False  # 新增：专门的停止请求标志
+        # 上下文提供者: provider(prompt, budget_tokens) -> str | None，发送前按优先级依次调用，结果作为系统消息附加
+        self.context_providers = []
+        self._context_priorities = {}  # id(provider) -> 优先级
 
         self.config_file = Path("./deepseek_config.json")
         self.conversations_dir = Path("./conversations")
         self.current_conversation_file = None
         self.conversations_dir.mkdir(exist_ok=True)
+        # 历史对话记忆：启用后随对话保存增量更新，当前对话本身不重复注入
+        self.memory = ConversationMemory(self.conversations_dir, is_enabled=lambda: self.conversation_memory,
+                                         current_file=lambda: self.current_conversation_file)
+        self.add_context_provider(self.memory, RETRIEVED_CONTEXT_PRIORITY)
+        # 对话列表元数据缓存: 文件路径 -> (mtime_ns, size, 元数据)，未变化的文件无需重新解析
+        self._conversation_meta_cache = {}
         self.load_config()
+        if self.conversation_memory:
+            self.memory.start()
 
     def load_config(self):
         if self.config_file.exists():
@@ -53,7 +77,8 @@ class DeepSeekClient:
                                     setattr(self, key, float(value))
                                 except:
                                     pass
-                            elif key in ['auto_save', 'streaming', 'auto_scroll', 'markdown_render']:
+                            elif key in ['auto_save', 'streaming', 'auto_scroll', 'markdown_render',
+                                         'workspace_retrieval', 'conversation_memory']:
                                 setattr(self, key, bool(value))
                             else:
                                 setattr(self, key, value)
@@ -76,6 +101,8 @@ class DeepSeekClient:
                 'streaming': self.streaming,
                 'auto_scroll': self.auto_scroll,
                 'markdown_render': self.markdown_render,
+                'workspace_retrieval': self.workspace_retrieval,
+                'conversation_memory': self.conversation_memory,
                 'theme': self.theme,
                 'font_size': self.font_size,
                 'send_shortcut': self.send_shortcut
@@ -189,7 +216,8 @@ class DeepSeekClient:
             with open(filepath, 'w', encoding='utf-8') as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
 
-            self._rename_conversation_file(filepath, new_summary)
+            new_filepath = self._rename_conversation_file(filepath, new_summary)
+            self.memory.rename_file(filepath, new_filepath, data["metadata"]["name"])
 
             if ui_update_callback:
                 ui_update_callback(data["metadata"]["name"])
@@ -237,6 +265,8 @@ class DeepSeekClient:
         try:
             with open(self.current_conversation_file, 'w', encoding='utf-8') as f:
                 json.dump(conversation_data, f, ensure_ascii=False, indent=2)
+            self.memory.update_file(self.current_conversation_file, self.history,
+                                    conversation_data["metadata"]["name"])
         except Exception as e:
             print(f"保存对话失败: {e}")
 
@@ -290,6 +320,41 @@ class DeepSeekClient:
         self.current_processing_thread = threading.Thread(target=process_messages, daemon=True)
         self.current_processing_thread.start()
 
+    def add_context_provider(self, provider, priority: int = 0):
+        """priority 小的先调用、先占用 token 预算；相同时按注册顺序"""
+        if provider in self.context_providers:
+            return
+        self._context_priorities[id(provider)] = priority
+        index = len(self.context_providers)
+        while index and self._context_priorities[id(self.context_providers[index - 1])] > priority:
+            index -= 1
+        self.context_providers.insert(index, provider)
+
+    def remove_context_provider(self, provider):
+        if provider in self.context_providers:
+            self.context_providers.remove(provider)
+            self._context_priorities.pop(id(provider), None)
+
+    def _collect_context(self, prompt, messages):
+        """依次调用上下文提供者，每个提供者只能使用前面剩下的 token 预算"""
+        if not self.context_providers:
+            return None
+        used = sum(estimate_tokens(message["content"]) for message in messages) + estimate_tokens(prompt)
+        budget = MODEL_CONTEXT_TOKENS - self.max_tokens - CONTEXT_SAFETY_MARGIN - used
+        parts = []
+        for provider in list(self.context_providers):
+            if budget <= 0 or self.stop_requested:
+                break
+            try:
+                text = provider(prompt, budget)
+            except Exception as e:
+                print(f"上下文提供者执行失败: {e}")
+                continue
+            if text:
+                parts.append(text)
+                budget -= estimate_tokens(text)
+        return "\n\n".join(parts) or None
+
     def _process_single_message(self, prompt, callback=None, title_update_callback=None):
         """处理单个消息的流式响应"""
         # 检查是否应该停止
@@ -302,6 +367,10 @@ class DeepSeekClient:
         # 构建消息历史
         messages = [{"role": "system", "content": self.system_content}]
         messages.extend([{"role": role, "content": content} for role, content in self.history])
+        # 附加上下文只随本次请求发送，不写入历史
+        context = self._collect_context(prompt, messages)
+        if context:
+            messages.append({"role": "system", "content": context})
         messages.append({"role": "user", "content": prompt})
 
         request_body = {
@@ -462,6 +531,7 @@ class DeepSeekClient:
             filepath = Path(filename)
             if filepath.exists():
                 filepath.unlink()
+                self.memory.remove_file(filepath)
                 return True
         except Exception as e:
             print(f"删除对话失败: {e}")
@@ -469,12 +539,19 @@ class DeepSeekClient:
 
     def get_conversation_list(self):
         conversations = []
+        meta_cache = {}
         for file in self.conversations_dir.glob("*.json"):
             try:
-                with open(file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                stat = file.stat()
+                cache_key = str(file)
+                cached = self._conversation_meta_cache.get(cache_key)
+                if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                    entry = cached[2]
+                else:
+                    with open(file, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
                     metadata = data.get("metadata", {})
-                    conversations.append({
+                    entry = {
                         "filename": file.name,
                         "path": file,
                         "name": metadata.get("name", "未命名对话"),
@@ -482,11 +559,16 @@ class DeepSeekClient:
                         "updated_at": metadata.get("updated_at", ""),
                         "message_count": len(data.get("history", [])),
                         "preview": self.get_conversation_preview(data.get("history", []))
-                    })
+                    }
+                meta_cache[cache_key] = (stat.st_mtime_ns, stat.st_size, entry)
+                conversations.append(dict(entry))
             except Exception as e:
                 print(f"读取对话文件失败 {file}: {e}")
                 continue
 
+        # 只保留仍然存在的文件
+        self._conversation_meta_cache = meta_cache
+
         try:
             conversations.sort(key=lambda x: x["updated_at"], reverse=True)
         except:
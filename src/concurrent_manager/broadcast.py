@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+# 广播时同时进行的最大请求数
+BROADCAST_MAX_WORKERS = 4
+
+
+class BroadcastTiming:
+    """单个广播目标的耗时统计：TTFT 和总耗时从工作线程实际开始请求时计时，排队时间单独记录"""
+
+    def __init__(self, target_id: str, label: str):
+        self.target_id = target_id
+        self.label = label
+        self.queued: Optional[float] = None  # 在线程池中排队等待的时间（秒）
+        self.ttft: Optional[float] = None  # 首个 token 到达耗时（秒）
+        self.total: Optional[float] = None  # 完成耗时（秒）
+        self.status = "pending"  # pending / complete / error / skipped
+        self.error = ""
+        self.started_at: Optional[float] = None  # 请求实际开始的时刻（perf_counter）
+
+    def to_dict(self) -> dict:
+        return {key: getattr(self, key) for key in ['target_id', 'label', 'queued', 'ttft', 'total', 'status',
+                                                    'error']}
+
+
+class _TimedExecutor:
+    """包装线程池：任务真正开始执行时记录开始时刻，使耗时统计不包含排队时间"""
+
+    def __init__(self, executor: ThreadPoolExecutor, timing: BroadcastTiming, submitted_at: float):
+        self._executor = executor
+        self._timing = timing
+        self._submitted_at = submitted_at
+
+    def submit(self, fn: Callable, *args, **kwargs):
+        def run():
+            self._timing.started_at = time.perf_counter()
+            self._timing.queued = self._timing.started_at - self._submitted_at
+            return fn(*args, **kwargs)
+
+        return self._executor.submit(run)
+
+
+class PromptBroadcaster:
+    """将同一提示词并发发送给多个对话，通过有界线程池执行并统计每个目标的耗时"""
+
+    def __init__(self, max_workers: int = BROADCAST_MAX_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="broadcast")
+        self.last_report: List[BroadcastTiming] = []
+        self.last_wall_time: Optional[float] = None
+
+    def broadcast(self, targets: Dict[str, str], start_target: Callable, on_finished: Callable = None):
+        """
+        targets: target_id -> 显示名称
+        start_target(target_id, on_event, executor) 负责把请求提交到 executor，成功返回 True
+        （executor 只提供 submit，任务开始执行时自动记录开始时刻）
+        on_finished(timings, wall_time) 在所有目标结束后调用
+        """
+        started_at = time.perf_counter()
+        timings = {target_id: BroadcastTiming(target_id, label) for target_id, label in targets.items()}
+        remaining = [len(timings)]
+        lock = threading.Lock()
+
+        def finish_one(timing: BroadcastTiming):
+            with lock:
+                remaining[0] -= 1
+                done = remaining[0] == 0
+            if done:
+                self.last_report = list(timings.values())
+                self.last_wall_time = time.perf_counter() - started_at
+                if on_finished:
+                    on_finished(self.last_report, self.last_wall_time)
+
+        for target_id, timing in timings.items():
+            def on_event(content: str, msg_type: str, timing=timing):
+                # 请求尚未开始就结束（如提交失败）时从广播开始计时
+                elapsed = time.perf_counter() - (timing.started_at or started_at)
+                if msg_type == "stream" and timing.ttft is None:
+                    timing.ttft = elapsed
+                elif msg_type in ("complete", "error"):
+                    timing.total = elapsed
+                    timing.status = msg_type
+                    if msg_type == "error":
+                        timing.error = content
+                    finish_one(timing)
+
+            executor = _TimedExecutor(self.executor, timing, time.perf_counter())
+            if not start_target(target_id, on_event, executor):
+                # 目标不存在或已有请求在进行中
+                timing.status = "skipped"
+                finish_one(timing)
+
+        return timings
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
@@ -9,7 +9,13 @@ import time
 import requests
 from pathlib import Path
 from datetime import datetime
+from collections import OrderedDict
 from typing import Dict, List, Optional, Callable
+from ..ui_scheduler import get_ui_scheduler
+from .broadcast import PromptBroadcaster
+
+# 缓存已渲染聊天视图的最近使用对话数量
+CHAT_VIEW_CACHE_SIZE = 5
 
 
 class GlobalConfig:
@@ -110,6 +116,12 @@ class DeepSeekAPI:
         self.global_config = global_config
 
     def send_message(self, messages: List[dict], conversation_config: ConversationConfig, callback: Callable):
+        """在后台线程中发送请求"""
+        threading.Thread(target=self.stream_completion, args=(messages, conversation_config, callback),
+                         daemon=True).start()
+
+    def stream_completion(self, messages: List[dict], conversation_config: ConversationConfig, callback: Callable):
+        """阻塞式流式请求，供线程池等调用方直接使用"""
         if not self.global_config.api_key:
             callback("请先在API配置中设置API Key", "error")
             return
@@ -125,43 +137,87 @@ class DeepSeekAPI:
             "stream": True
         }
 
-        def api_call():
-            try:
-                response = requests.post(url, headers=headers, json=payload, stream=True, timeout=30)
-                if response.status_code != 200:
-                    callback(f"API请求失败: {response.status_code} - {response.text}", "error")
-                    return
-
-                full_response = ""
-                for line in response.iter_lines():
-                    if line:
-                        line = line.decode('utf-8')
-                        if line.startswith('data: '):
-                            data = line[6:]
-                            if data == '[DONE]':
-                                break
-                            try:
-                                json_data = json.loads(data)
-                                if 'choices' in json_data and json_data['choices']:
-                                    delta = json_data['choices'][0].get('delta', {})
-                                    if 'content' in delta:
-                                        content = delta['content']
-                                        full_response += content
-                                        # 修复：传递累积的完整响应内容，而不是单个片段
-                                        callback(full_response, "stream")
-                            except json.JSONDecodeError:
-                                continue
-
-                callback(full_response, "complete")
-
-            except requests.exceptions.Timeout:
-                callback("请求超时，请稍后重试", "error")
-            except requests.exceptions.ConnectionError:
-                callback("网络连接错误，请检查网络连接", "error")
-            except Exception as e:
-                callback(f"发生错误: {str(e)}", "error")
-
-        threading.Thread(target=api_call, daemon=True).start()
+        try:
+            response = requests.post(url, headers=headers, json=payload, stream=True, timeout=30)
+            if response.status_code != 200:
+                callback(f"API请求失败: {response.status_code} - {response.text}", "error")
+                return
+
+            full_response = ""
+            for line in response.iter_lines():
+                if line:
+                    line = line.decode('utf-8')
+                    if line.startswith('data: '):
+                        data = line[6:]
+                        if data == '[DONE]':
+                            break
+                        try:
+                            json_data = json.loads(data)
+                            if 'choices' in json_data and json_data['choices']:
+                                delta = json_data['choices'][0].get('delta', {})
+                                if 'content' in delta:
+                                    content = delta['content']
+                                    full_response += content
+                                    # 修复：传递累积的完整响应内容，而不是单个片段
+                                    callback(full_response, "stream")
+                        except json.JSONDecodeError:
+                            continue
+
+            callback(full_response, "complete")
+
+        except requests.exceptions.Timeout:
+            callback("请求超时，请稍后重试", "error")
+        except requests.exceptions.ConnectionError:
+            callback("网络连接错误，请检查网络连接", "error")
+        except Exception as e:
+            callback(f"发生错误: {str(e)}", "error")
+
+
+class ConversationStream:
+    """单个对话的流式响应缓冲区，对话不在前台时仍在后台持续接收内容"""
+
+    def __init__(self, conversation_id: str):
+        self.conversation_id = conversation_id
+        self.content = ""
+        self.status = "streaming"  # streaming / complete / error
+        self.error = ""
+        self.started_at = time.time()
+        self._listener: Optional[Callable] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_active(self) -> bool:
+        return self.status == "streaming"
+
+    @property
+    def has_listener(self) -> bool:
+        return self._listener is not None
+
+    def attach(self, listener: Callable):
+        """挂载前台视图，并回放已缓冲的内容；已结束的流回放最终的完成/错误状态"""
+        with self._lock:
+            self._listener = listener
+            if self.status == "complete":
+                listener(self.content, "complete")
+            elif self.status == "error":
+                listener(self.error, "error")
+            elif self.content:
+                listener(self.content, "stream")
+
+    def detach(self):
+        with self._lock:
+            self._listener = None
+
+    def feed(self, content: str, msg_type: str):
+        with self._lock:
+            if msg_type in ("stream", "complete"):
+                self.content = content
+            if msg_type in ("complete", "error"):
+                self.status = msg_type
+            if msg_type == "error":
+                self.error = content
+            if self._listener:
+                self._listener(content, msg_type)
 
 
 class ConversationChatView:
@@ -170,6 +226,8 @@ class ConversationChatView:
         self.current_response = ""
         self.is_streaming = False
         self.page = None
+        self.ui = None
+        self.container = None  # create_chat_tab() 生成的根容器，供缓存复用
 
         self.chat_display = ft.ListView(expand=True, spacing=5, auto_scroll=True)
         self.input_field = ft.TextField(
@@ -187,12 +245,17 @@ class ConversationChatView:
 
         self.input_field.value = ""
         self._add_message_display("user", message)
-        self.is_streaming, self.send_button.disabled, self.send_button.text = True, True, "发送中..."
-        if self.page:
-            self.page.update()
+        self.set_busy(True)
+        self._mark_dirty(self.input_field)
 
         self.on_send_message(message, self._handle_response)
 
+    def set_busy(self, busy: bool):
+        """切换发送按钮的忙碌状态"""
+        self.is_streaming, self.send_button.disabled = busy, busy
+        self.send_button.text = "发送中..." if busy else "发送"
+        self._mark_dirty(self.send_button)
+
     def _handle_response(self, content: str, msg_type: str):
         if msg_type == "stream":
             # 修复：累积显示流式内容
@@ -203,18 +266,14 @@ class ConversationChatView:
             if self._is_last_message_ai():
                 self.chat_display.controls.pop()
             self._add_message_display("assistant", content)
-            self.current_response, self.is_streaming = "", False
-            self.send_button.disabled, self.send_button.text = False, "发送"
-            if self.page:
-                self.page.update()
+            self.current_response = ""
+            self.set_busy(False)
         elif msg_type == "error":
             if self._is_last_message_ai():
                 self.chat_display.controls.pop()
             self._add_message_display("system", f"错误: {content}")
-            self.current_response, self.is_streaming = "", False
-            self.send_button.disabled, self.send_button.text = False, "发送"
-            if self.page:
-                self.page.update()
+            self.current_response = ""
+            self.set_busy(False)
 
     def _is_last_message_ai(self):
         return (self.chat_display.controls and
@@ -233,9 +292,7 @@ class ConversationChatView:
         row_alignment = ft.MainAxisAlignment.END if role == "user" else ft.MainAxisAlignment.START
         message_row = ft.Row([message_card], alignment=row_alignment)
         self.chat_display.controls.append(message_row)
-
-        if self.page:
-            self.chat_display.update()
+        self._mark_dirty(self.chat_display)
 
     def _update_streaming_message(self):
         if self._is_last_message_ai():
@@ -246,15 +303,17 @@ class ConversationChatView:
             # 创建新的流式消息
             self._add_message_display("assistant", self.current_response + "▌")
 
-        if self.page:
-            self.chat_display.update()
+        self._mark_dirty(self.chat_display)
+
+    def _mark_dirty(self, *controls):
+        if self.ui:
+            self.ui.mark_dirty(*controls)
 
     def load_history(self, history: List[dict]):
         self.chat_display.controls.clear()
         for msg in history:
             self._add_message_display(msg["role"], msg["content"])
-        if self.page:
-            self.chat_display.update()
+        self._mark_dirty(self.chat_display)
 
     def create_chat_tab(self) -> ft.Container:
         return ft.Container(
@@ -299,8 +358,10 @@ class ConversationSettings:
         self.temperature_field.value = config.temperature
         self.max_tokens_field.value = str(config.max_tokens)
         self.top_p_field.value = config.top_p
-        if self.name_field.page:
-            self.name_field.page.update()
+        ui = get_ui_scheduler(self.name_field.page)
+        if ui:
+            ui.mark_dirty(self.name_field, self.model_field, self.system_prompt_field, self.temperature_field,
+                          self.max_tokens_field, self.top_p_field)
 
     def _on_config_change(self, e):
         # 延迟触发配置更新，避免在用户输入时频繁保存
@@ -368,14 +429,16 @@ class APIConfigTab:
         else:
             self.status_text.value, self.status_text.color = "配置保存失败！", "#ef4444"
 
-        if self.api_key_field.page:
-            self.status_text.update()
+        ui = get_ui_scheduler(self.api_key_field.page)
+        if ui:
+            ui.mark_dirty(self.status_text)
 
     def load_config(self):
         self.api_key_field.value = self.global_config.api_key
         self.api_base_url_field.value = self.global_config.api_base_url
-        if self.api_key_field.page:
-            self.api_key_field.page.update()
+        ui = get_ui_scheduler(self.api_key_field.page)
+        if ui:
+            ui.mark_dirty(self.api_key_field, self.api_base_url_field)
 
     def create_tab(self) -> ft.Container:
         return ft.Container(
@@ -450,20 +513,31 @@ class ConversationManager:
 class ConversationTab:
     def __init__(self, page: ft.Page):
         self.page = page
+        self.ui = get_ui_scheduler(page)
         self.global_config = GlobalConfig()
         self.conversation_manager = ConversationManager(self.global_config)
+        # 侧边栏条目: conv_id -> (signature, control)
+        self._sidebar_items: Dict[str, tuple] = {}
+        # 最近使用对话的已渲染聊天视图（LRU）
+        self._chat_views: "OrderedDict[str, ConversationChatView]" = OrderedDict()
+        self._displayed_conversation_id = None
+        # 正在进行的流式响应: conv_id -> ConversationStream
+        self._streams: Dict[str, ConversationStream] = {}
+        # 在后台完成、尚未查看的对话
+        self._unread_conversations = set()
+        self.broadcaster = PromptBroadcaster()
         self._create_controls()
 
     def _create_controls(self):
         self.conversation_list = ft.Column(spacing=5, expand=True, scroll=ft.ScrollMode.ADAPTIVE)
-        self.chat_view = ConversationChatView(self._send_message)
+        self.chat_tab_container = ft.Container(expand=True, bgcolor="#111827")
         self.settings_view = ConversationSettings(self._on_config_update, self._clear_history)
         self.api_config_tab = APIConfigTab(self.global_config)
 
         self.tabs = ft.Tabs(
             selected_index=0, expand=True, on_change=self._on_tab_change,
             tabs=[
-                ft.Tab(text="聊天", content=self.chat_view.create_chat_tab()),
+                ft.Tab(text="聊天", content=self.chat_tab_container),
                 ft.Tab(text="对话设置", content=self.settings_view.create_settings_tab()),
                 ft.Tab(text="API配置", content=self.api_config_tab.create_tab())
             ]
@@ -472,8 +546,16 @@ class ConversationTab:
         self.new_conversation_btn = ft.ElevatedButton(
             "新建对话", on_click=lambda e: self._create_new_conversation(),
             style=ft.ButtonStyle(color="#ffffff", bgcolor="#10b981"), icon=ft.Icons.ADD)
+        self.broadcast_btn = ft.ElevatedButton(
+            "广播", on_click=lambda e: self._show_broadcast_dialog(), tooltip="将同一提示词并发发送到多个对话",
+            style=ft.ButtonStyle(color="#ffffff", bgcolor="#8b5cf6"), icon=ft.Icons.CAMPAIGN)
         self.current_conversation_title = ft.Text("当前对话: 无", size=16, weight="bold", color="#e5e7eb")
 
+    @property
+    def chat_view(self) -> Optional[ConversationChatView]:
+        """当前显示的聊天视图"""
+        return self._chat_views.get(self._displayed_conversation_id)
+
     def _on_tab_change(self, e):
         if e.control.selected_index == 1:
             self._update_settings()
@@ -482,12 +564,9 @@ class ConversationTab:
 
     def _create_new_conversation(self):
         new_id = self.conversation_manager.create_conversation()
-        self._refresh_ui()
         self._switch_to_conversation(new_id, switch_tab=True)
 
     def initialize_ui(self):
-        if not self.chat_view.page:
-            self.chat_view.page = self.page
         self._refresh_ui()
 
     def _refresh_ui(self):
@@ -497,42 +576,118 @@ class ConversationTab:
         self._update_current_title()
         self._update_chat_display()
         self._update_settings()
-        self.page.update()
 
     def _update_conversation_list(self):
-        self.conversation_list.controls.clear()
+        """按对话 ID 增量更新侧边栏，只重建/修改变化的条目"""
+        new_controls, items, changed = [], {}, []
         for conv in self.conversation_manager.get_conversation_list():
-            btn_color = "#3b82f6" if conv['is_active'] else "#4b5563"
-            conv_button = ft.Container(
-                content=ft.Row([
-                    ft.Text(f"{conv['name']} ({conv['message_count']}条)", color="#ffffff",
-                            expand=True, size=12, max_lines=1, overflow=ft.TextOverflow.ELLIPSIS),
-                    ft.IconButton(icon=ft.Icons.DELETE_OUTLINE, icon_color="#ef4444", tooltip="删除对话",
-                                  visible=not conv['is_active'],
-                                  on_click=lambda e, cid=conv['id']: self._delete_conversation(cid))
-                ], spacing=5, alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
-                padding=8, margin=ft.margin.only(bottom=5), bgcolor=btn_color, border_radius=6,
-                on_click=lambda e, cid=conv['id']: self._switch_to_conversation(cid),
-                alignment=ft.alignment.center_left, ink=True
-            )
-            self.conversation_list.controls.append(conv_button)
-        if self.page:
-            self.conversation_list.update()
+            conv['is_streaming'] = conv['id'] in self._streams
+            conv['is_unread'] = conv['id'] in self._unread_conversations
+            signature = (conv['name'], conv['message_count'], conv['is_active'], conv['is_streaming'],
+                         conv['is_unread'])
+            cached = self._sidebar_items.get(conv['id'])
+            if cached is None:
+                control = self._create_conversation_item(conv)
+            else:
+                old_signature, control = cached
+                if old_signature != signature:
+                    self._apply_conversation_item(control, conv)
+                    changed.append(control)
+            items[conv['id']] = (signature, control)
+            new_controls.append(control)
+
+        self._sidebar_items = items
+        if [id(c) for c in new_controls] != [id(c) for c in self.conversation_list.controls]:
+            self.conversation_list.controls = new_controls
+            self.ui.mark_dirty(self.conversation_list)
+        elif changed:
+            self.ui.mark_dirty(*changed)
+
+    def _create_conversation_item(self, conv: dict) -> ft.Container:
+        label = ft.Text(color="#ffffff", expand=True, size=12, max_lines=1, overflow=ft.TextOverflow.ELLIPSIS)
+        # 活动指示: 后台生成中显示进度环，后台完成未查看显示圆点
+        streaming_ring = ft.ProgressRing(width=12, height=12, stroke_width=2, color="#fbbf24", tooltip="生成中")
+        unread_dot = ft.Icon(ft.Icons.CIRCLE, size=8, color="#10b981", tooltip="有新回复")
+        delete_button = ft.IconButton(icon=ft.Icons.DELETE_OUTLINE, icon_color="#ef4444", tooltip="删除对话",
+                                      on_click=lambda e, cid=conv['id']: self._delete_conversation(cid))
+        item = ft.Container(
+            content=ft.Row([label, streaming_ring, unread_dot, delete_button], spacing=5,
+                           alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+            padding=8, margin=ft.margin.only(bottom=5), border_radius=6,
+            on_click=lambda e, cid=conv['id']: self._switch_to_conversation(cid),
+            alignment=ft.alignment.center_left, ink=True,
+            data={"label": label, "streaming_ring": streaming_ring, "unread_dot": unread_dot,
+                  "delete_button": delete_button}
+        )
+        self._apply_conversation_item(item, conv)
+        return item
+
+    @staticmethod
+    def _apply_conversation_item(item: ft.Container, conv: dict):
+        item.bgcolor = "#3b82f6" if conv['is_active'] else "#4b5563"
+        item.data["label"].value = f"{conv['name']} ({conv['message_count']}条)"
+        item.data["streaming_ring"].visible = conv.get('is_streaming', False)
+        item.data["unread_dot"].visible = conv.get('is_unread', False)
+        # 生成中的对话不允许删除
+        item.data["delete_button"].visible = not conv['is_active'] and not conv.get('is_streaming', False)
 
     def _update_current_title(self):
         active_conv = self.conversation_manager.get_active_conversation()
         self.current_conversation_title.value = f"当前对话: {active_conv.config.name}" if active_conv else "当前对话: 无"
-        if self.page:
-            self.current_conversation_title.update()
+        self.ui.mark_dirty(self.current_conversation_title)
+
+    def _get_chat_view(self, conversation_id: str) -> ConversationChatView:
+        """获取对话的聊天视图，命中缓存时无需重新加载历史"""
+        view = self._chat_views.get(conversation_id)
+        if view is not None:
+            self._chat_views.move_to_end(conversation_id)
+            return view
+
+        view = ConversationChatView(lambda message, callback, cid=conversation_id:
+                                    self._send_message(cid, message, callback))
+        view.page, view.ui = self.page, self.ui
+        view.container = view.create_chat_tab()
+        conversation = self.conversation_manager.conversations.get(conversation_id)
+        view.load_history(conversation.history if conversation else [])
+        self._chat_views[conversation_id] = view
+        self._evict_chat_views()
+        return view
+
+    def _evict_chat_views(self):
+        """超出缓存容量时淘汰最久未使用的视图（流式内容保存在缓冲区，不受影响）"""
+        for conv_id in list(self._chat_views):
+            if len(self._chat_views) <= CHAT_VIEW_CACHE_SIZE:
+                break
+            if conv_id == self.conversation_manager.active_conversation_id:
+                continue
+            del self._chat_views[conv_id]
 
     def _update_chat_display(self):
-        active_conv = self.conversation_manager.get_active_conversation()
-        if active_conv:
-            self.chat_view.load_history(active_conv.history)
+        active_id = self.conversation_manager.active_conversation_id
+        if active_id == self._displayed_conversation_id and self.chat_tab_container.content is not None:
+            return
+
+        # 前台视图切走后，其流式响应继续在后台缓冲
+        previous_stream = self._streams.get(self._displayed_conversation_id)
+        if previous_stream:
+            previous_stream.detach()
+
+        self._displayed_conversation_id = active_id
+        self._unread_conversations.discard(active_id)
+        if active_id and active_id in self.conversation_manager.conversations:
+            view = self._get_chat_view(active_id)
+            self.chat_tab_container.content = view.container
+            stream = self._streams.get(active_id)
+            if stream and stream.is_active:
+                view.set_busy(True)
+                stream.attach(view._handle_response)
+            elif view.is_streaming:
+                # 离开期间已在后台完成，从历史记录恢复最终内容
+                view.load_history(self.conversation_manager.conversations[active_id].history)
+                view.set_busy(False)
         else:
-            self.chat_view.chat_display.controls.clear()
-            if self.page:
-                self.chat_view.chat_display.update()
+            self.chat_tab_container.content = None
+        self.ui.mark_dirty(self.chat_tab_container)
 
     def _update_settings(self):
         active_conv = self.conversation_manager.get_active_conversation()
@@ -544,8 +699,7 @@ class ConversationTab:
         self._refresh_ui()
         if switch_tab:
             self.tabs.selected_index = 0
-            if self.page:
-                self.page.update()
+            self.ui.mark_dirty(self.tabs)
 
     def _delete_conversation(self, conversation_id: str):
         conv_to_delete = self.conversation_manager.conversations.get(conversation_id)
@@ -553,6 +707,7 @@ class ConversationTab:
 
         def confirm_delete(e):
             self.conversation_manager.delete_conversation(conversation_id)
+            self._chat_views.pop(conversation_id, None)
             self._refresh_ui()
             self.page.close(dialog)
 
@@ -575,13 +730,14 @@ class ConversationTab:
 
         def confirm_clear(e):
             active_conv.clear_history()
-            self._update_chat_display()
+            if self.chat_view:
+                self.chat_view.load_history(active_conv.history)
             self._update_conversation_list()
             self.page.close(dialog)
             self.page.snack_bar = ft.SnackBar(ft.Text("历史记录已清空", color=ft.colors.WHITE),
                                               bgcolor=ft.colors.GREEN_700)
             self.page.snack_bar.open = True
-            self.page.update()
+            self.ui.request_page_update()
 
         dialog = ft.AlertDialog(
             title=ft.Text("确认清除", color="#e5e7eb"),
@@ -595,32 +751,156 @@ class ConversationTab:
         )
         self.page.open(dialog)
 
-    def _send_message(self, message: str, callback: Callable):
-        active_conv = self.conversation_manager.get_active_conversation()
-        if not active_conv:
-            return
+    def _send_message(self, conversation_id: str, message: str, callback: Callable):
+        listener = callback if conversation_id == self._displayed_conversation_id else None
+        stream = self._start_stream(conversation_id, message, listener=listener)
+        if stream is None and listener:
+            callback("该对话已有请求正在进行，请稍后再试", "error")
+
+    def _can_start_stream(self, conversation_id: str) -> bool:
+        return conversation_id in self.conversation_manager.conversations and conversation_id not in self._streams
+
+    def _start_stream(self, conversation_id: str, message: str, listener: Optional[Callable] = None,
+                      on_event: Optional[Callable] = None, executor=None) -> Optional[ConversationStream]:
+        """
+        向指定对话发送消息，响应写入该对话自己的流缓冲区。
+        listener 在提交请求之前挂载，同步返回的错误（如未设置 API Key）或极快的首个响应也不会丢失。
+        """
+        if not self._can_start_stream(conversation_id):
+            return None
+        conversation = self.conversation_manager.conversations[conversation_id]
+
+        stream = ConversationStream(conversation_id)
+        self._streams[conversation_id] = stream
+        if listener:
+            stream.attach(listener)
 
         # 添加用户消息到历史
-        active_conv.add_message("user", message)
+        conversation.add_message("user", message)
+        self._update_conversation_list()
 
         # 构建消息列表
         messages = []
-        if active_conv.config.system_content:
-            messages.append({"role": "system", "content": active_conv.config.system_content})
+        if conversation.config.system_content:
+            messages.append({"role": "system", "content": conversation.config.system_content})
 
         # 添加对话历史
-        for msg in active_conv.history:
+        for msg in conversation.history:
             messages.append({"role": msg["role"], "content": msg["content"]})
 
         def handle_api_response(content: str, msg_type: str):
             if msg_type == "complete":
                 # 在API完成时添加助手消息到历史记录
-                active_conv.add_message("assistant", content)
-                self._update_conversation_list()
-            callback(content, msg_type)
+                conversation.add_message("assistant", content)
+            stream.feed(content, msg_type)
+            if on_event:
+                on_event(content, msg_type)
+            if msg_type in ("complete", "error"):
+                self._finish_stream(stream)
+
+        # 调用API（广播时提交到有界线程池）
+        if executor is not None:
+            executor.submit(self.conversation_manager.api.stream_completion, messages, conversation.config,
+                            handle_api_response)
+        else:
+            self.conversation_manager.api.send_message(messages, conversation.config, handle_api_response)
+        return stream
+
+    def _show_broadcast_dialog(self):
+        """选择目标对话并广播同一提示词"""
+        prompt_field = ft.TextField(label="提示词", multiline=True, min_lines=3, max_lines=6,
+                                    border_color="#4b5563", focused_border_color="#3b82f6")
+        checkboxes = []
+        for conv in self.conversation_manager.get_conversation_list():
+            conversation = self.conversation_manager.conversations[conv['id']]
+            checkboxes.append(ft.Checkbox(label=f"{conv['name']} [{conversation.config.model}]",
+                                          value=conv['is_active'], data=conv['id'],
+                                          disabled=conv['id'] in self._streams))
+
+        def confirm(e):
+            prompt = (prompt_field.value or "").strip()
+            target_ids = [cb.data for cb in checkboxes if cb.value and not cb.disabled]
+            if not prompt or not target_ids:
+                return
+            self.page.close(dialog)
+            self._broadcast(prompt, target_ids)
+
+        dialog = ft.AlertDialog(
+            title=ft.Text("广播提示词", color="#e5e7eb"),
+            content=ft.Column([
+                prompt_field,
+                ft.Text("发送到以下对话（并发执行）:", color="#d1d5db", size=12),
+                ft.Column(checkboxes, spacing=0, scroll=ft.ScrollMode.ADAPTIVE, height=240)
+            ], tight=True, width=420, spacing=10),
+            bgcolor="#1f2937",
+            actions=[
+                ft.TextButton("取消", on_click=lambda e: self.page.close(dialog)),
+                ft.TextButton("发送", on_click=confirm, style=ft.ButtonStyle(color="#8b5cf6"))
+            ],
+            actions_alignment=ft.MainAxisAlignment.END
+        )
+        self.page.open(dialog)
 
-        # 调用API
-        self.conversation_manager.api.send_message(messages, active_conv.config, handle_api_response)
+    def _broadcast(self, prompt: str, target_ids: List[str]):
+        targets = {}
+        for conv_id in target_ids:
+            conversation = self.conversation_manager.conversations.get(conv_id)
+            if conversation:
+                targets[conv_id] = f"{conversation.config.name} [{conversation.config.model}]"
+
+        def start_target(conv_id, on_event, executor):
+            if not self._can_start_stream(conv_id):
+                return False
+            # 先准备好视图并确定监听者，再提交请求，避免提前到达的错误或首个片段丢失
+            listener = None
+            if conv_id == self._displayed_conversation_id and self.chat_view:
+                view = self.chat_view
+                view._add_message_display("user", prompt)
+                view.set_busy(True)
+                listener = view._handle_response
+            else:
+                # 后台对话的缓存视图缺少这条用户消息，切换时从历史记录重建
+                self._chat_views.pop(conv_id, None)
+            stream = self._start_stream(conv_id, prompt, listener=listener, on_event=on_event, executor=executor)
+            return stream is not None
+
+        self.broadcaster.broadcast(targets, start_target, self._show_broadcast_report)
+
+    def _show_broadcast_report(self, timings, wall_time: float):
+        """展示每个目标的首 token 时间 (TTFT) 和总耗时"""
+        status_map = {"complete": "✅", "error": "❌", "skipped": "⏭", "pending": "…"}
+
+        def fmt(seconds):
+            return f"{seconds:.2f}s" if seconds is not None else "-"
+
+        rows = [ft.Text(f"总耗时（墙钟）: {wall_time:.2f}s", color="#e5e7eb", weight="bold")]
+        for timing in timings:
+            rows.append(ft.Text(
+                f"{status_map.get(timing.status, '')} {timing.label}  排队 {fmt(timing.queued)}  "
+                f"TTFT {fmt(timing.ttft)}  总计 {fmt(timing.total)}",
+                color="#ef4444" if timing.status == "error" else "#d1d5db", size=12,
+                tooltip=timing.error or None))
+
+        dialog = ft.AlertDialog(
+            title=ft.Text("广播结果", color="#e5e7eb"),
+            content=ft.Column(rows, tight=True, spacing=6, scroll=ft.ScrollMode.ADAPTIVE),
+            bgcolor="#1f2937",
+            actions=[ft.TextButton("关闭", on_click=lambda e: self.page.close(dialog))],
+            actions_alignment=ft.MainAxisAlignment.END
+        )
+        self.page.open(dialog)
+
+    def _finish_stream(self, stream: ConversationStream):
+        """流式响应结束：更新侧边栏指示，并让后台完成的对话在下次打开时重新加载"""
+        conversation_id = stream.conversation_id
+        if self._streams.get(conversation_id) is stream:
+            del self._streams[conversation_id]
+        if not stream.has_listener:
+            # 缓存的视图停留在中间状态，丢弃后从历史记录重建
+            if conversation_id != self._displayed_conversation_id:
+                self._chat_views.pop(conversation_id, None)
+                self._unread_conversations.add(conversation_id)
+        self._update_conversation_list()
 
     def _on_config_update(self):
         active_conv = self.conversation_manager.get_active_conversation()
@@ -628,14 +908,23 @@ class ConversationTab:
             updated_config = self.settings_view.get_updated_config(active_conv.config)
             active_conv.config = updated_config
             active_conv.save()
-            self._refresh_ui()
+            # 配置变更只影响标题和侧边栏条目，无需重新加载聊天内容
+            self._update_conversation_list()
+            self._update_current_title()
+
+    def close(self):
+        """会话关闭时释放广播线程池"""
+        self.broadcaster.shutdown()
+
+    def __del__(self):
+        self.close()
 
     def create_tab(self) -> ft.Container:
         return ft.Container(
             content=ft.Row([
                 ft.Container(
                     content=ft.Column([
-                        self.new_conversation_btn,
+                        ft.Row([self.new_conversation_btn, self.broadcast_btn], spacing=8),
                         ft.Container(content=self.conversation_list, expand=True, padding=10, bgcolor="#1f2937",
                                      border_radius=8)
                     ], spacing=10), width=300, padding=10, bgcolor="#111827"),
@@ -656,6 +945,7 @@ def main(page: ft.Page):
     page.window.height = 800
 
     conversation_tab = ConversationTab(page)
+    page.on_close = lambda e: conversation_tab.close()
     page.add(conversation_tab.create_tab())
     conversation_tab.initialize_ui()
 
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import mmap
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from .text_encoding import ENCODING_SAMPLE_SIZE, detect_encoding
+
+# 搜索线程数（文件读取和 re/bytes 查找大部分时间不在 Python 层）
+SEARCH_MAX_WORKERS = 8
+# 同时提交给线程池的文件数上限，避免一次排入整个工作区
+SEARCH_MAX_IN_FLIGHT = SEARCH_MAX_WORKERS * 4
+# 超过该大小的文件使用 mmap，不整体读入内存
+SEARCH_MMAP_THRESHOLD = 1024 * 1024
+# 在原始字节上查找的编码：ASCII 字节只表示 ASCII 字符，多字节序列不会被误认为其他字符
+BYTE_SEARCH_ENCODINGS = ("utf-8", "latin-1")
+# 其他编码（UTF-16/32、GBK 等）的文件需要整体解码，超过该大小时跳过
+SEARCH_MAX_DECODE_SIZE = 16 * 1024 * 1024
+# 单个文件最多记录的匹配数、整个搜索最多记录的匹配数
+SEARCH_MAX_MATCHES_PER_FILE = 200
+SEARCH_MAX_RESULTS = 5000
+# 结果行最多显示的字符数
+SEARCH_MAX_LINE_CHARS = 300
+# 结果按批回调的最小间隔（秒），第一批找到后立即回调
+SEARCH_BATCH_INTERVAL = 0.15
+
+
+class FileSearcher:
+    """
+    单次搜索的匹配器。UTF-8 / Latin-1 文件按编码把查询编译为 bytes 正则并缓存，
+    直接在原始字节（或 mmap）上查找，只解码命中的行；
+    GBK 的尾字节可能落在 ASCII 范围内（如 "\x81A"），在字节上查找会产生误匹配，这类文件解码后按行查找。
+    查询是无效的正则表达式时构造函数抛出 re.error。
+    """
+
+    def __init__(self, query: str, case_sensitive: bool = False, use_regex: bool = False):
+        self.query = query
+        self.flags = re.MULTILINE | (0 if case_sensitive else re.IGNORECASE)
+        self.source = query if use_regex else re.escape(query)
+        self.text_pattern = re.compile(self.source, self.flags)
+        self._byte_patterns = {}  # encoding -> 编译后的 bytes 正则，无法编码时为 None
+        self._lock = threading.Lock()
+
+    def byte_pattern(self, encoding: str):
+        with self._lock:
+            if encoding not in self._byte_patterns:
+                try:
+                    # 正则元字符都是 ASCII，在 UTF-8 / Latin-1 中编码不变
+                    self._byte_patterns[encoding] = re.compile(self.source.encode(encoding), self.flags)
+                except (UnicodeEncodeError, re.error):
+                    self._byte_patterns[encoding] = None
+            return self._byte_patterns[encoding]
+
+    def search_file(self, path: str, cancelled=None):
+        """返回 (path, [(行号, 行文本, 列起点, 列终点), ...])；二进制、无匹配或读取失败时返回 None"""
+        try:
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if not size:
+                    return None
+                encoding = detect_encoding(f.read(ENCODING_SAMPLE_SIZE))
+                if encoding is None:
+                    return None
+                if encoding == "utf-8-sig":
+                    encoding = "utf-8"
+                if encoding not in BYTE_SEARCH_ENCODINGS:
+                    if size > SEARCH_MAX_DECODE_SIZE:
+                        return None
+                    f.seek(0)
+                    return self._search_text(path, f.read().decode(encoding, errors="replace"), cancelled)
+                pattern = self.byte_pattern(encoding)
+                if pattern is None:
+                    return None
+                if size > SEARCH_MMAP_THRESHOLD:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                        return self._search_bytes(path, data, pattern, encoding, cancelled)
+                f.seek(0)
+                return self._search_bytes(path, f.read(), pattern, encoding, cancelled)
+        except (OSError, ValueError):
+            return None
+
+    def _search_bytes(self, path, data, pattern, encoding, cancelled):
+        matches, line_number, counted_to = [], 1, 0
+        for match in pattern.finditer(data):
+            start = match.start()
+            line_start = data.rfind(b"\n", 0, start) + 1
+            if line_start < counted_to:
+                # 同一行的后续匹配
+                continue
+            line_end = data.find(b"\n", start)
+            if line_end == -1:
+                line_end = len(data)
+            # mmap 没有 count 方法，按段切片计数（每段只经过一次）
+            line_number += data[counted_to:line_start].count(b"\n")
+            counted_to = line_end + 1 if line_end < len(data) else line_end
+            # 超长行只解码匹配附近的字节
+            window_start = max(line_start, start - SEARCH_MAX_LINE_CHARS)
+            window_end = min(line_end, match.end() + SEARCH_MAX_LINE_CHARS * 4)
+            prefix = data[window_start:start].decode(encoding, errors="replace")
+            text = data[window_start:window_end].decode(encoding, errors="replace").rstrip("\r")
+            matched = match.group().decode(encoding, errors="replace")
+            matches.append(self._make_match(line_number, text, len(prefix), len(prefix) + len(matched)))
+            line_number += 1
+            if len(matches) >= SEARCH_MAX_MATCHES_PER_FILE or (cancelled and cancelled()):
+                break
+        return (path, matches) if matches else None
+
+    def _search_text(self, path, text, cancelled):
+        matches = []
+        for line_number, line in enumerate(text.split("\n"), 1):
+            match = self.text_pattern.search(line)
+            if match:
+                matches.append(self._make_match(line_number, line.rstrip("\r"), match.start(), match.end()))
+                if len(matches) >= SEARCH_MAX_MATCHES_PER_FILE or (cancelled and cancelled()):
+                    break
+        return (path, matches) if matches else None
+
+    @staticmethod
+    def _make_match(line_number: int, text: str, start: int, end: int):
+        # 长行只保留匹配附近的片段
+        if len(text) > SEARCH_MAX_LINE_CHARS:
+            offset = max(0, min(start - SEARCH_MAX_LINE_CHARS // 3, len(text) - SEARCH_MAX_LINE_CHARS))
+            text = text[offset:offset + SEARCH_MAX_LINE_CHARS]
+            start, end = start - offset, min(end - offset, SEARCH_MAX_LINE_CHARS)
+        return line_number, text, start, end
+
+
+def iter_workspace_files(root, ignore_rules=None, cancelled=None):
+    """边遍历边产生 root 下未被忽略的文件路径（广度优先，浅层文件先出现）"""
+    directories = [str(root)]
+    while directories:
+        next_level = []
+        for directory in directories:
+            if cancelled and cancelled():
+                return
+            matcher = ignore_rules.child_matcher(directory) if ignore_rules is not None else None
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        if matcher is not None and matcher(entry.name, is_dir):
+                            continue
+                        if is_dir:
+                            next_level.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            yield entry.path
+            except OSError:
+                continue
+        directories = next_level
+
+
+class ContentSearch:
+    """
+    工作区内容搜索。由一个协调线程按顺序取文件、提交给线程池，
+    并把结果按批回调；新的搜索或 cancel() 会使正在进行的搜索失效。
+    """
+
+    def __init__(self, max_workers: int = SEARCH_MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="content-search")
+        self._lock = threading.Lock()
+        self.generation = 0
+
+    def start(self, searcher: FileSearcher, files, on_results, on_done=None) -> int:
+        """
+        开始搜索 files（路径可迭代对象，可以是边遍历边产生的生成器）。
+        on_results([(path, matches), ...]) 按批回调；on_done(stats) 在完成或达到上限时回调，取消时不回调。
+        """
+        with self._lock:
+            self.generation += 1
+            generation = self.generation
+        threading.Thread(target=self._run, args=(generation, searcher, files, on_results, on_done),
+                         name="content-search-coordinator", daemon=True).start()
+        return generation
+
+    def cancel(self):
+        with self._lock:
+            self.generation += 1
+
+    def is_cancelled(self, generation: int) -> bool:
+        return self.generation != generation
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False)
+
+    def _run(self, generation, searcher, files, on_results, on_done):
+        cancelled = lambda: self.generation != generation
+        started = time.monotonic()
+        stats = {"files_searched": 0, "files_matched": 0, "matches": 0, "truncated": False, "first_hit": None}
+        files = iter(files)
+        in_flight, pending = set(), []
+        exhausted, last_flush = False, 0.0
+        try:
+            while not cancelled():
+                while not exhausted and len(in_flight) < SEARCH_MAX_IN_FLIGHT:
+                    path = next(files, None)
+                    if path is None:
+                        exhausted = True
+                        break
+                    in_flight.add(self._executor.submit(searcher.search_file, path, cancelled))
+                if not in_flight:
+                    break
+                done, in_flight = wait(in_flight, timeout=SEARCH_BATCH_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stats["files_searched"] += 1
+                    result = future.result()
+                    if result:
+                        pending.append(result)
+                        stats["files_matched"] += 1
+                        stats["matches"] += len(result[1])
+                now = time.monotonic()
+                if pending and not cancelled() and (stats["first_hit"] is None or now - last_flush >= SEARCH_BATCH_INTERVAL):
+                    if stats["first_hit"] is None:
+                        stats["first_hit"] = now - started
+                    on_results(pending)
+                    pending, last_flush = [], now
+                if stats["matches"] >= SEARCH_MAX_RESULTS:
+                    stats["truncated"] = True
+                    break
+        finally:
+            for future in in_flight:
+                future.cancel()
+        if cancelled():
+            return
+        if pending:
+            on_results(pending)
+        stats["elapsed"] = time.monotonic() - started
+        if on_done:
+            on_done(stats)
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import heapq
+import json
+import math
+import os
+import threading
+import zlib
+from collections import Counter
+from pathlib import Path
+from .file_context import estimate_tokens, extract_terms
+
+# 历史对话记忆最多占用的 token 数
+MEMORY_MAX_TOKENS = 4000
+# 每个注入的问答最多占用的 token 数（超出时截断回答）
+MEMORY_EXCHANGE_MAX_TOKENS = 1200
+# 注入时问题最多保留的字符数
+MEMORY_QUESTION_MAX_CHARS = 500
+# 最多注入的问答数
+MEMORY_TOP_EXCHANGES = 4
+# BM25 参数
+MEMORY_BM25_K1, MEMORY_BM25_B = 1.2, 0.75
+# 哈希向量的维度（特征经 crc32 哈希到固定数量的桶，不需要词表）
+MEMORY_VECTOR_DIM = 1 << 18
+# 哈希向量余弦相似度在综合得分中的权重
+MEMORY_VECTOR_WEIGHT = 0.3
+# 出现在超过该比例问答中的哈希桶不参与相似度计算（问答数较少时不生效）
+MEMORY_VECTOR_MAX_DF_RATIO = 0.5
+# 相关性门槛：问题中被命中的词项（按 idf 加权）比例，或哈希向量余弦相似度，至少满足其一
+MEMORY_MIN_COVERAGE = 0.4
+MEMORY_MIN_SIMILARITY = 0.3
+# 对话中常见、几乎不区分内容的词
+_STOPWORDS = frozenset("""
+the a an of to in is are was were be it its on at by for and or not this that with as from you your we i me my
+can could would should will do does did how what why which when where please thanks thank
+""".split())
+
+
+def _terms(text: str):
+    return [term for term in extract_terms(text) if term not in _STOPWORDS]
+
+
+def _hashed_vector(terms):
+    """哈希向量：短词原样、长英文词拆为字符三元组后哈希分桶，权重 1+log(tf) 并做 L2 归一化"""
+    features = Counter()
+    for term in terms:
+        if term.isascii() and len(term) > 4:
+            padded = f" {term} "
+            features.update(padded[i:i + 3] for i in range(len(padded) - 2))
+        else:
+            features[term] += 1
+    vector = Counter()
+    for feature, count in features.items():
+        vector[zlib.crc32(feature.encode("utf-8")) % MEMORY_VECTOR_DIM] += 1 + math.log(count)
+    norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+    return {bucket: weight / norm for bucket, weight in vector.items()}
+
+
+class _Exchange:
+    """历史对话中的一组问答"""
+
+    __slots__ = ("path", "name", "question", "answer", "terms", "length", "vector")
+
+    def __init__(self, path: str, name: str, question: str, answer: str, use_vectors: bool):
+        self.path = path
+        self.name = name
+        self.question = question
+        self.answer = answer
+        question_terms, answer_terms = _terms(question), _terms(answer)
+        # 问题中的词项更能代表这组问答的主题，计两次
+        self.terms = Counter(question_terms * 2 + answer_terms)
+        self.length = sum(self.terms.values())
+        self.vector = _hashed_vector(question_terms + answer_terms) if use_vectors else None
+
+
+class ConversationMemory:
+    """
+    历史对话记忆：把 conversations/ 中已保存对话的问答建立本地索引（BM25 + 可选的哈希向量相似度，无需联网），
+    作为 DeepSeekClient 的上下文提供者，在 token 预算内注入与当前问题最相关的历史问答。
+    首次启用时在后台加载全部对话，之后随对话的保存、重命名和删除增量更新。
+    """
+
+    def __init__(self, conversations_dir: Path, is_enabled=None, current_file=None, use_vectors: bool = True,
+                 max_tokens: int = MEMORY_MAX_TOKENS):
+        self.conversations_dir = Path(conversations_dir)
+        self.is_enabled = is_enabled  # is_enabled() -> bool，对应设置中的开关
+        self.current_file = current_file  # current_file() -> 当前对话文件，其内容已在历史中，不重复注入
+        self.use_vectors = use_vectors
+        self.max_tokens = max_tokens
+        self.started = False
+        self.is_ready = False
+        self._lock = threading.Lock()
+        self._exchanges = {}  # id -> _Exchange
+        self._files = {}  # 文件路径 -> (mtime_ns, [id, ...])
+        self._postings = {}  # 词项 -> {id: tf}
+        self._vector_postings = {}  # 哈希桶 -> {id: weight}
+        self._total_length = 0
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._exchanges)
+
+    # ---------------- 加载与增量更新 ----------------
+
+    def start(self):
+        """首次启用时在后台加载已保存的全部对话；已启动时不做任何事"""
+        if self.started:
+            return
+        self.started = True
+        threading.Thread(target=self._load_all, name="conversation-memory-load", daemon=True).start()
+
+    def _load_all(self):
+        for path in sorted(self.conversations_dir.glob("*.json")):
+            try:
+                mtime_ns = path.stat().st_mtime_ns
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                name = data.get("metadata", {}).get("name", path.stem)
+                self._replace_file(str(path), data.get("history", []), name, mtime_ns)
+            except (OSError, ValueError, AttributeError) as e:
+                print(f"加载历史对话记忆失败 {path}: {e}")
+        self.is_ready = True
+
+    def update_file(self, path, history, name: str = None):
+        """对话保存后调用：用最新的历史替换该文件的问答"""
+        if not self.started:
+            return
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return
+        with self._lock:
+            entry = self._files.get(str(path))
+            if name is None and entry and entry[1]:
+                name = self._exchanges[entry[1][0]].name
+        self._replace_file(str(path), list(history), name or Path(path).stem, mtime_ns)
+
+    def rename_file(self, old_path, new_path, name: str = None):
+        with self._lock:
+            entry = self._files.pop(str(old_path), None)
+            if entry is None:
+                return
+            self._files[str(new_path)] = entry
+            for exchange_id in entry[1]:
+                exchange = self._exchanges[exchange_id]
+                exchange.path = str(new_path)
+                if name:
+                    exchange.name = name
+
+    def remove_file(self, path):
+        with self._lock:
+            self._remove_file(str(path))
+
+    def _replace_file(self, path: str, history, name: str, mtime_ns: int):
+        pairs = list(self._pairs(history))
+        with self._lock:
+            entry = self._files.get(path)
+            existing = [self._exchanges[exchange_id] for exchange_id in entry[1]] if entry else []
+        # 对话只会在末尾追加问答：保留未变化的前缀，只为新增的问答分词
+        keep = 0
+        while keep < min(len(existing), len(pairs)) and \
+                (existing[keep].question, existing[keep].answer) == pairs[keep]:
+            keep += 1
+        exchanges = [_Exchange(path, name, question, answer, self.use_vectors) for question, answer in pairs[keep:]]
+        with self._lock:
+            current = self._files.get(path)
+            # 后台加载读到的旧版本不能覆盖保存时写入的新版本
+            if current is not None and current[0] > mtime_ns:
+                return
+            if current is not entry:
+                # 分词期间该文件被其他线程更新，放弃前缀复用
+                keep = 0
+                exchanges = [_Exchange(path, name, question, answer, self.use_vectors) for question, answer in pairs]
+            ids = current[1][:keep] if current else []
+            for exchange_id in ids:
+                self._exchanges[exchange_id].name = name
+            self._remove_ids(current[1][keep:] if current else [])
+            for exchange in exchanges:
+                exchange_id = self._next_id
+                self._next_id += 1
+                ids.append(exchange_id)
+                self._exchanges[exchange_id] = exchange
+                self._total_length += exchange.length
+                for term, tf in exchange.terms.items():
+                    self._postings.setdefault(term, {})[exchange_id] = tf
+                for bucket, weight in (exchange.vector or {}).items():
+                    self._vector_postings.setdefault(bucket, {})[exchange_id] = weight
+            self._files[path] = (mtime_ns, ids)
+
+    def _remove_file(self, path: str):
+        entry = self._files.pop(path, None)
+        if entry is not None:
+            self._remove_ids(entry[1])
+
+    def _remove_ids(self, exchange_ids):
+        for exchange_id in exchange_ids:
+            exchange = self._exchanges.pop(exchange_id)
+            self._total_length -= exchange.length
+            for term in exchange.terms:
+                self._discard(self._postings, term, exchange_id)
+            for bucket in exchange.vector or ():
+                self._discard(self._vector_postings, bucket, exchange_id)
+
+    @staticmethod
+    def _discard(postings, key, exchange_id):
+        entries = postings.get(key)
+        if entries is not None:
+            entries.pop(exchange_id, None)
+            if not entries:
+                del postings[key]
+
+    @staticmethod
+    def _pairs(history):
+        """把 [(role, content), ...] 配对为 (问题, 回答)"""
+        question = None
+        for role, content in history:
+            if role == "user":
+                question = content
+            elif role == "assistant" and question is not None:
+                yield question, content
+                question = None
+
+    # ---------------- 查询 ----------------
+
+    def search(self, query: str, limit: int = MEMORY_TOP_EXCHANGES, exclude_file=None):
+        """返回 [(得分, _Exchange)]，按相关度降序，只包含超过相关性门槛的问答"""
+        query_terms = set(_terms(query))
+        if not query_terms:
+            return []
+        exclude_file = str(exclude_file) if exclude_file else None
+        with self._lock:
+            total = len(self._exchanges)
+            if not total:
+                return []
+            average = self._total_length / total
+            idf = {}
+            for term in query_terms:
+                frequency = len(self._postings.get(term, ()))
+                idf[term] = math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            idf_total = sum(idf.values()) or 1.0
+            lexical, matched = {}, {}
+            for term, weight in idf.items():
+                for exchange_id, tf in self._postings.get(term, {}).items():
+                    length = self._exchanges[exchange_id].length
+                    score = weight * tf * (MEMORY_BM25_K1 + 1) / (
+                            tf + MEMORY_BM25_K1 * (1 - MEMORY_BM25_B + MEMORY_BM25_B * length / average))
+                    lexical[exchange_id] = lexical.get(exchange_id, 0.0) + score
+                    matched[exchange_id] = matched.get(exchange_id, 0.0) + weight
+            similarity = {}
+            if self.use_vectors:
+                max_frequency = total * MEMORY_VECTOR_MAX_DF_RATIO if total >= 20 else total
+                for bucket, weight in _hashed_vector(list(query_terms)).items():
+                    entries = self._vector_postings.get(bucket, {})
+                    if len(entries) > max_frequency:
+                        continue
+                    for exchange_id, value in entries.items():
+                        similarity[exchange_id] = similarity.get(exchange_id, 0.0) + weight * value
+            best_lexical = max(lexical.values(), default=0.0) or 1.0
+            scored = []
+            for exchange_id in lexical.keys() | similarity.keys():
+                exchange = self._exchanges[exchange_id]
+                if exchange.path == exclude_file:
+                    continue
+                coverage = matched.get(exchange_id, 0.0) / idf_total
+                cosine = similarity.get(exchange_id, 0.0)
+                if coverage < MEMORY_MIN_COVERAGE and cosine < MEMORY_MIN_SIMILARITY:
+                    continue
+                score = (1 - MEMORY_VECTOR_WEIGHT) * lexical.get(exchange_id, 0.0) / best_lexical \
+                    + MEMORY_VECTOR_WEIGHT * cosine
+                scored.append((score, exchange_id, exchange))
+        return [(score, exchange) for score, _, exchange in heapq.nlargest(limit, scored)]
+
+    def __call__(self, prompt: str, budget: int):
+        """上下文提供者接口：未启用或没有相关的历史问答时返回 None"""
+        if self.is_enabled is not None and not self.is_enabled():
+            return None
+        self.start()
+        current = self.current_file() if self.current_file else None
+        results = self.search(prompt, exclude_file=current)
+        if not results:
+            return None
+        budget = min(budget, self.max_tokens) - 40
+        parts, used = [], 0
+        for _, exchange in results:
+            text = self._format_exchange(exchange, min(MEMORY_EXCHANGE_MAX_TOKENS, budget - used))
+            if text is None:
+                break
+            parts.append(text)
+            used += estimate_tokens(text)
+        if not parts:
+            return None
+        return "\n\n".join(["以下是之前的对话中与当前问题相关的问答（仅供参考，可能已过时）："] + parts)
+
+    @staticmethod
+    def _format_exchange(exchange: _Exchange, budget: int):
+        question = exchange.question
+        if len(question) > MEMORY_QUESTION_MAX_CHARS:
+            question = question[:MEMORY_QUESTION_MAX_CHARS] + " …"
+        header = f"### 来自对话《{exchange.name}》\n用户：{question}\n助手："
+        remaining = budget - estimate_tokens(header)
+        if remaining < 50:
+            return None
+        answer = exchange.answer
+        if estimate_tokens(answer) > remaining:
+            # 中文字符约 0.6 token，按最坏情况估算可保留的字符数
+            answer = answer[:int(remaining / 0.6)].rstrip() + " …（已截断）"
+        return header + answer
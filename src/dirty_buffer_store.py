@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import datetime
+import hashlib
+import json
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from .ui_scheduler import IdleDebouncer
+
+# 未保存缓冲区的默认交换/恢复目录
+DEFAULT_SWAP_DIR = Path("./.editor_swap")
+# 内存中最多保留的缓冲区字节数和数量，超出后把最久未使用的缓冲区移到交换目录
+DIRTY_BUFFER_MEMORY_LIMIT = 32 * 1024 * 1024
+DIRTY_BUFFER_MAX_ENTRIES = 20
+# 编辑停止多久后把内存中的缓冲区写入恢复文件（秒）
+DIRTY_BUFFER_SYNC_DELAY = 2.0
+
+
+class DirtyBufferStore:
+    """
+    未保存文件内容的有界存储，用法类似 dict（键为文件路径字符串，值为文本）。
+    最近使用的缓冲区留在内存中（LRU），其余只保存在交换目录；
+    内存中的缓冲区在编辑空闲时同步到交换目录，崩溃后下次启动可以恢复。
+    """
+
+    def __init__(self, swap_dir: Path = DEFAULT_SWAP_DIR, memory_limit: int = DIRTY_BUFFER_MEMORY_LIMIT,
+                 max_entries: int = DIRTY_BUFFER_MAX_ENTRIES, sync_delay: float = DIRTY_BUFFER_SYNC_DELAY):
+        self.swap_dir = Path(swap_dir)
+        self.memory_limit = memory_limit
+        self.max_entries = max_entries
+        self._lock = threading.RLock()
+        self._memory = OrderedDict()  # key -> content，按最近使用排序
+        self._memory_bytes = 0
+        self._unsynced = set()  # 内存中尚未写入交换目录的键
+        self._spilled = {}  # key -> 交换文件路径（内容只在磁盘上）
+        self._sync_debouncer = IdleDebouncer(self.sync, sync_delay, "dirty-buffer-sync")
+
+    # ---------------- dict 风格接口 ----------------
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._memory or key in self._spilled
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._memory) + len(self._spilled)
+
+    def keys(self):
+        with self._lock:
+            return list(self._memory) + list(self._spilled)
+
+    def __getitem__(self, key) -> str:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+            swap_file = self._spilled.get(key)
+            if swap_file is None:
+                raise KeyError(key)
+            content = self._read_swap(swap_file)["content"]
+            # 重新调入内存，交换文件仍然有效
+            del self._spilled[key]
+            self._store(key, content)
+            self._evict()
+            return content
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except (KeyError, OSError, ValueError):
+            return default
+
+    def __setitem__(self, key, content: str):
+        with self._lock:
+            self._spilled.pop(key, None)
+            self._store(key, content)
+            self._unsynced.add(key)
+            self._evict()
+        self._sync_debouncer.poke()
+
+    def __delitem__(self, key):
+        with self._lock:
+            if key not in self:
+                raise KeyError(key)
+            self._discard(key)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self:
+                return default
+            content = self.get(key, default)
+            self._discard(key)
+            return content
+
+    def clear(self):
+        with self._lock:
+            for key in self.keys():
+                self._discard(key)
+
+    # ---------------- 统计与恢复 ----------------
+
+    def memory_used(self) -> int:
+        """内存中缓冲区占用的字节数"""
+        with self._lock:
+            return self._memory_bytes
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_memory": len(self._memory),
+                "spilled": len(self._spilled),
+                "memory_used": self._memory_bytes,
+                "unsynced": len(self._unsynced),
+            }
+
+    def recover(self):
+        """读取交换目录中上次遗留的缓冲区（内容按需加载），返回恢复的键列表"""
+        recovered = []
+        if not self.swap_dir.exists():
+            return recovered
+        with self._lock:
+            for swap_file in self.swap_dir.glob("*.json"):
+                try:
+                    key = self._read_swap(swap_file)["path"]
+                except (OSError, ValueError, KeyError):
+                    continue
+                if key not in self:
+                    self._spilled[key] = swap_file
+                    recovered.append(key)
+        return recovered
+
+    def sync(self):
+        """把内存中尚未同步的缓冲区写入交换目录"""
+        # 持锁写入，避免与保存后的删除交错而留下过期的恢复文件
+        with self._lock:
+            for key in [key for key in self._unsynced if key in self._memory]:
+                try:
+                    self._write_swap(key, self._memory[key])
+                    self._unsynced.discard(key)
+                except OSError as e:
+                    print(f"写入恢复文件失败 {key}: {e}")
+
+    def close(self):
+        self.sync()
+        self._sync_debouncer.stop()
+
+    # ---------------- 内部实现 ----------------
+
+    @staticmethod
+    def _size_of(content: str) -> int:
+        return sys.getsizeof(content)
+
+    def _store(self, key, content: str):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= self._size_of(old)
+        self._memory[key] = content
+        self._memory_bytes += self._size_of(content)
+
+    def _evict(self):
+        """超出内存预算时把最久未使用的缓冲区移到交换目录（至少保留最近一个）"""
+        while len(self._memory) > 1 and (
+                self._memory_bytes > self.memory_limit or len(self._memory) > self.max_entries):
+            key, content = self._memory.popitem(last=False)
+            self._memory_bytes -= self._size_of(content)
+            swap_file = self._swap_path(key)
+            if key in self._unsynced or not swap_file.exists():
+                try:
+                    self._write_swap(key, content)
+                except OSError as e:
+                    # 无法写入交换目录时保留在内存中，避免丢失修改
+                    print(f"写入交换文件失败 {key}: {e}")
+                    self._memory[key] = content
+                    self._memory.move_to_end(key, last=False)
+                    self._memory_bytes += self._size_of(content)
+                    return
+            self._unsynced.discard(key)
+            self._spilled[key] = swap_file
+
+    def _discard(self, key):
+        content = self._memory.pop(key, None)
+        if content is not None:
+            self._memory_bytes -= self._size_of(content)
+        self._unsynced.discard(key)
+        swap_file = self._spilled.pop(key, None) or self._swap_path(key)
+        try:
+            swap_file.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"删除交换文件失败 {swap_file}: {e}")
+
+    def _swap_path(self, key) -> Path:
+        digest = hashlib.sha1(str(key).encode("utf-8")).hexdigest()
+        return self.swap_dir / f"{digest}.json"
+
+    def _write_swap(self, key, content: str):
+        self.swap_dir.mkdir(parents=True, exist_ok=True)
+        swap_file = self._swap_path(key)
+        temp_file = swap_file.with_suffix(".tmp")
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump({"path": key, "content": content, "saved_at": datetime.datetime.now().isoformat()},
+                      f, ensure_ascii=False)
+        temp_file.replace(swap_file)
+
+    @staticmethod
+    def _read_swap(swap_file: Path) -> dict:
+        with open(swap_file, "r", encoding="utf-8") as f:
+            return json.load(f)
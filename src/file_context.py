@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from pathlib import Path
+from .text_encoding import BinaryFileError, read_text_file
+
+# 每个片段的目标行数；达到后在下一个空行或顶格行处切分
+CHUNK_TARGET_LINES = 60
+# 每个片段的最大行数 / 最大字符数（超长行会被截断）
+CHUNK_MAX_LINES = 120
+CHUNK_MAX_CHARS = 6000
+# 附件可读取的最大文件大小
+ATTACH_MAX_FILE_SIZE = 8 * 1024 * 1024
+# 附件内容最多占用的 token 数（即使剩余预算更多，也给对话历史留出空间）
+ATTACH_MAX_TOKENS = 24000
+# 片段缓存保留的文件数
+CHUNK_CACHE_MAX_FILES = 64
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]+")
+_CAMEL_PART = re.compile(r"[A-Z]?[a-z0-9]+|[A-Z]+(?![a-z])")
+_CJK_RUN = re.compile(r"[\u4e00-\u9fff]+")
+_LANGUAGES = {".py": "python", ".js": "javascript", ".ts": "typescript", ".json": "json", ".md": "markdown",
+              ".html": "html", ".css": "css", ".java": "java", ".c": "c", ".cpp": "cpp", ".h": "c",
+              ".go": "go", ".rs": "rust", ".sh": "bash", ".yaml": "yaml", ".yml": "yaml", ".sql": "sql"}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算 token 数（按 DeepSeek 的经验值：英文字符约 0.3 个 token，中文字符约 0.6 个 token）。
+    只用于预算控制，不需要与服务端的分词结果完全一致。
+    """
+    if not text:
+        return 0
+    ascii_count = len(text.encode("ascii", "ignore"))
+    return (3 * ascii_count + 6 * (len(text) - ascii_count) + 9) // 10
+
+
+def extract_terms(text: str):
+    """提取用于相关度计算的词项：标识符（拆分驼峰/下划线）和中文二元组"""
+    terms = []
+    for identifier in _IDENTIFIER.findall(text):
+        lowered = identifier.lower()
+        terms.append(lowered)
+        parts = [part.lower() for piece in identifier.split("_") for part in _CAMEL_PART.findall(piece)]
+        if len(parts) > 1:
+            terms.extend(part for part in parts if len(part) > 1)
+    for run in _CJK_RUN.findall(text):
+        terms.extend(run[i:i + 2] for i in range(max(len(run) - 1, 1)))
+    return terms
+
+
+class FileChunk:
+    """文件中连续若干行组成的片段"""
+
+    __slots__ = ("path", "start_line", "end_line", "text", "tokens", "terms")
+
+    def __init__(self, path: str, start_line: int, end_line: int, text: str):
+        self.path = path
+        self.start_line = start_line  # 1 起，包含
+        self.end_line = end_line  # 包含
+        self.text = text
+        self.tokens = estimate_tokens(text)
+        self.terms = Counter(extract_terms(text))
+
+
+def _is_boundary(line: str) -> bool:
+    """空行或顶格行（通常是新的定义）适合作为片段边界"""
+    return not line.strip() or not line[0].isspace()
+
+
+def chunk_text(path: str, text: str):
+    """按行切分为片段，尽量在空行或顶格行处切开"""
+    lines = text.split("\n")
+    chunks, start = [], 0
+    while start < len(lines):
+        end, chars = start, 0
+        while end < len(lines):
+            count = end - start
+            if count >= CHUNK_MAX_LINES or chars >= CHUNK_MAX_CHARS or \
+                    (count >= CHUNK_TARGET_LINES and _is_boundary(lines[end])):
+                break
+            if len(lines[end]) > CHUNK_MAX_CHARS:
+                lines[end] = lines[end][:CHUNK_MAX_CHARS] + " …（行过长，已截断）"
+            chars += len(lines[end]) + 1
+            end += 1
+        text = "\n".join(lines[start:end])
+        if text.strip():
+            chunks.append(FileChunk(path, start + 1, end, text))
+        start = end
+    return chunks
+
+
+class ChunkCache:
+    """文件片段缓存，按 (修改时间, 大小) 校验；文件未变化时不重新读取、切分和计数"""
+
+    def __init__(self, max_files: int = CHUNK_CACHE_MAX_FILES):
+        self.max_files = max_files
+        self._entries = OrderedDict()  # path -> (mtime_ns, size, chunks)
+        self._lock = threading.Lock()
+
+    def get_chunks(self, path):
+        """返回文件的片段列表；文件不存在、过大或为二进制时抛出 OSError / BinaryFileError"""
+        path = str(path)
+        stat = os.stat(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+                self._entries.move_to_end(path)
+                return entry[2]
+        if stat.st_size > ATTACH_MAX_FILE_SIZE:
+            raise OSError(f"文件过大（超过 {ATTACH_MAX_FILE_SIZE // (1024 * 1024)}MB）")
+        text, _ = read_text_file(Path(path))
+        chunks = chunk_text(path, text)
+        with self._lock:
+            self._entries[path] = (stat.st_mtime_ns, stat.st_size, chunks)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_files:
+                self._entries.popitem(last=False)
+        return chunks
+
+
+class FileAttachments:
+    """
+    附加到对话的文件，作为 DeepSeekClient 的上下文提供者：
+    每次发送时在 token 预算内选取与问题最相关的片段，全部放得下时附加整个文件。
+    """
+
+    def __init__(self, cache: ChunkCache = None, max_tokens: int = ATTACH_MAX_TOKENS):
+        self.cache = cache or ChunkCache()
+        self.max_tokens = max_tokens
+        self._paths = []
+        self._lock = threading.Lock()
+
+    def attach(self, path) -> bool:
+        """添加文件，已添加时返回 False"""
+        path = str(Path(path).resolve())
+        with self._lock:
+            if path in self._paths:
+                return False
+            self._paths.append(path)
+            return True
+
+    def detach(self, path):
+        with self._lock:
+            path = str(Path(path).resolve())
+            if path in self._paths:
+                self._paths.remove(path)
+
+    def clear(self):
+        with self._lock:
+            self._paths = []
+
+    @property
+    def paths(self):
+        with self._lock:
+            return list(self._paths)
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def __call__(self, prompt: str, budget: int):
+        """上下文提供者接口：返回要附加的文本，没有附件时返回 None"""
+        paths = self.paths
+        if not paths:
+            return None
+        budget = min(budget, self.max_tokens)
+        chunks, errors = [], []
+        for path in paths:
+            try:
+                chunks.extend(self.cache.get_chunks(path))
+            except (OSError, BinaryFileError, ValueError) as e:
+                errors.append(f"- {os.path.basename(path)}：无法读取（{e}）")
+        selected = self._select(chunks, prompt, budget)
+        return self._format(chunks, selected, errors)
+
+    @staticmethod
+    def _chunk_cost(chunk: FileChunk) -> int:
+        # 每个片段额外的标题（含路径）和代码块标记
+        return chunk.tokens + estimate_tokens(chunk.path) + 12
+
+    def _select(self, chunks, prompt: str, budget: int):
+        # 开头说明和省略提示
+        budget -= 40
+        if sum(self._chunk_cost(chunk) for chunk in chunks) <= budget:
+            return set(range(len(chunks)))
+        query = set(extract_terms(prompt))
+        document_frequency = Counter(term for chunk in chunks for term in query if term in chunk.terms)
+        total = len(chunks)
+
+        def score(index):
+            chunk = chunks[index]
+            value = sum((1 + math.log(chunk.terms[term])) * math.log(1 + total / document_frequency[term])
+                        for term in query if term in chunk.terms)
+            # 文件开头通常是导入和模块说明，相关度相同时优先
+            return value + (0.5 if chunk.start_line == 1 else 0.0)
+
+        selected, used = set(), 0
+        for index in sorted(range(total), key=lambda i: (-score(i), i)):
+            cost = self._chunk_cost(chunks[index])
+            if used + cost <= budget:
+                selected.add(index)
+                used += cost
+        return selected
+
+    @staticmethod
+    def _format(chunks, selected, errors):
+        blocks, omitted = [], 0
+        previous = None
+        for index, chunk in enumerate(chunks):
+            if index not in selected:
+                omitted += 1
+                previous = None
+                continue
+            # 同一文件中相邻的已选片段合并为一个代码块
+            if previous is not None and previous[0] == chunk.path and previous[2] + 1 == chunk.start_line:
+                previous[2] = chunk.end_line
+                previous[3].append(chunk.text)
+                continue
+            previous = [chunk.path, chunk.start_line, chunk.end_line, [chunk.text]]
+            blocks.append(previous)
+        parts = ["以下是用户附加的文件内容" + ("（篇幅有限，只包含与问题最相关的片段）：" if omitted else "：")]
+        for path, start, end, texts in blocks:
+            language = _LANGUAGES.get(os.path.splitext(path)[1].lower(), "")
+            parts.append(f"### {path}（第 {start}-{end} 行）\n```{language}\n" + "\n".join(texts) + "\n```")
+        if omitted:
+            parts.append(f"（另有 {omitted} 个片段因篇幅省略）")
+        parts.extend(errors)
+        if not blocks and not errors:
+            return None
+        return "\n\n".join(parts)
@@ -5,6 +5,25 @@
 import flet as ft
 from pathlib import Path
 import os
+import threading
+from collections import OrderedDict
+from .ui_scheduler import get_ui_scheduler, IdleDebouncer
+from .mapped_file import MappedTextFile
+from .text_encoding import read_text_file, sniff_file_encoding, BinaryFileError
+from .dirty_buffer_store import DirtyBufferStore
+from .text_buffer import TextBuffer, TextSnapshot
+
+# 超过此大小的文件不载入编辑器，查看器改用分页模式
+LARGE_FILE_THRESHOLD = 1024 * 1024
+# 分页查看大文件时每页显示的行数
+LARGE_FILE_PAGE_LINES = 200
+# 实时预览：编辑停止多久后刷新（秒）
+PREVIEW_IDLE_DELAY = 0.3
+# 实时预览按块渲染，每块的目标行数；块超过两倍时重新拆分
+PREVIEW_CHUNK_LINES = 300
+# 查看器渲染缓存最多保留的文件数 / 文件总大小
+VIEWER_CACHE_MAX_FILES = 16
+VIEWER_CACHE_MAX_BYTES = 8 * 1024 * 1024
 
 
 # =========================================================================
@@ -37,6 +56,47 @@ class SyntaxHighlighter:
         return language_map.get(ext, 'Text')
 
 
+class ViewerRenderCache:
+    """
+    查看器渲染结果的 LRU 缓存：(路径, 修改时间, 大小) -> (编码, 分块的行和 Markdown 文本)。
+    重新打开未变化的文件时只需 stat，不再读取、解码和拼接 Markdown；每个路径只保留最新版本。
+    """
+
+    def __init__(self, max_files: int = VIEWER_CACHE_MAX_FILES, max_bytes: int = VIEWER_CACHE_MAX_BYTES):
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # path -> (mtime_ns, size, encoding, chunks)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, path: Path, stat):
+        """命中时返回 (encoding, chunks)，chunks 为 [(lines, markdown), ...]"""
+        key = str(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != stat.st_mtime_ns or entry[1] != stat.st_size:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2], entry[3]
+
+    def put(self, path: Path, stat, encoding: str, chunks):
+        if stat.st_size > self.max_bytes:
+            return
+        key = str(path)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old[1]
+            self._entries[key] = (stat.st_mtime_ns, stat.st_size, encoding, chunks)
+            self._total_bytes += stat.st_size
+            while len(self._entries) > self.max_files or self._total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= evicted[1]
+
+
 # ====================================================================
 # 基础面板 - 负责公共 UI 逻辑 (BaseFilePanel)
 # ====================================================================
@@ -46,6 +106,7 @@ class BaseFilePanel:
 
     def __init__(self, main_page):
         self.main_page = main_page
+        self.ui = get_ui_scheduler(main_page)
         self.current_file_path = ft.Text("未选择文件", size=11, color="#9ca3af")
         self.current_file = None
         self.encoding = "utf-8"
@@ -66,7 +127,7 @@ class BaseFilePanel:
 
     def _read_file_content(self, filepath: Path):
         """
-        尝试使用多种编码读取文件内容，增加文件大小限制判断。
+        读取文件内容：只读取一次，在内存中检测编码后解码，增加文件大小限制判断。
         """
         if not filepath.exists():
             self.encoding = "Error: Not Found"
@@ -76,29 +137,21 @@ class BaseFilePanel:
             self.encoding = "Error: Directory"
             return None
 
-        if os.path.getsize(filepath) > 1024 * 1024 * 1:
+        if os.path.getsize(filepath) > LARGE_FILE_THRESHOLD:
             self.encoding = "Error: Too Large (>1MB)"
             return None
 
-        self.encoding = "utf-8"
-
-        for encoding in ['utf-8', 'gbk', 'latin-1']:
-            try:
-                with open(filepath, 'r', encoding=encoding) as f:
-                    content = f.read()
-                self.encoding = encoding
-                return content
-            except UnicodeDecodeError:
-                continue
-            except Exception:
-                self.encoding = "Error: Read Failed"
-                return None
-
-        self.encoding = "Error: Unsupported Encoding"
+        try:
+            content, self.encoding = read_text_file(filepath)
+            return content
+        except BinaryFileError:
+            self.encoding = "Error: Unsupported Encoding"
+        except Exception:
+            self.encoding = "Error: Read Failed"
         return None
 
-    def _create_base_layout(self, content):
-        """创建基础布局模板 - 移除了标题栏"""
+    def _create_base_layout(self, content, actions=None):
+        """创建基础布局模板 - 移除了标题栏；actions 为状态栏末尾的附加按钮"""
         return ft.Container(
             content=ft.Column([
                 # 代码块头部/状态栏
@@ -124,6 +177,7 @@ class BaseFilePanel:
                             ft.Icon(ft.Icons.LANGUAGE, size=14, color="#9ca3af"),
                             self.encoding_info,
                         ], spacing=4),
+                        *(actions or []),
                     ]),
                     padding=ft.padding.symmetric(horizontal=15, vertical=6),
                     bgcolor="#252526",
@@ -150,7 +204,7 @@ class BaseFilePanel:
             duration=2000,
         )
         self.main_page.snack_bar = snackbar
-        self.main_page.update()
+        self.ui.request_page_update()
 
 
 # ====================================================================
@@ -160,9 +214,23 @@ class BaseFilePanel:
 class FileViewer(BaseFilePanel):
     """只读文件查看器，使用 Markdown 进行代码高亮和实时预览"""
 
-    def __init__(self, main_page):
+    def __init__(self, main_page, on_attach=None):
         super().__init__(main_page)
-        self._last_content = ""  # 添加内容跟踪，避免重复更新
+        self.on_attach = on_attach  # on_attach(Path)：把当前文件附加到对话
+        # 预览按块渲染：每块 {"lines": [...], "markdown": ft.Markdown}，编辑时只重绘变化的块
+        self._chunks = []
+        self._preview_path = None
+        self._preview_lock = threading.Lock()
+        # 实时预览：记录最新版本，编辑停止后才渲染；版本号相同则跳过
+        self._pending_preview = None  # (version, content, file_path)，content 为 str 或 TextSnapshot
+        self._rendered_version = None
+        self._rendered_snapshot = None  # 上次渲染的编辑器快照，用于只取变化的行
+        self._preview_debouncer = IdleDebouncer(self._flush_realtime_update, PREVIEW_IDLE_DELAY, "preview-debouncer")
+        # 已打开文件的渲染结果，来回切换文件时复用
+        self.render_cache = ViewerRenderCache()
+        # 大文件分页模式
+        self.large_file = None
+        self.page_start = self._page_line_count = 0
 
         self.file_content_markdown = ft.Markdown(
             value="请在左侧文件列表中选择一个文件查看。",
@@ -171,12 +239,36 @@ class FileViewer(BaseFilePanel):
             selectable=True,
             expand=True,
         )
+        self.page_info = ft.Text("", size=11, color="#9ca3af")
+        self.goto_line_field = ft.TextField(hint_text="跳转到行", width=110, height=30, text_size=11,
+                                            content_padding=5, border_color="#4b5563", on_submit=self._on_goto_line)
+        self.large_file_bar = ft.Container(
+            content=ft.Row([
+                ft.IconButton(ft.Icons.FIRST_PAGE, icon_size=16, tooltip="第一页",
+                              on_click=lambda e: self._show_page(0)),
+                ft.IconButton(ft.Icons.NAVIGATE_BEFORE, icon_size=16, tooltip="上一页",
+                              on_click=lambda e: self._show_page(self.page_start - LARGE_FILE_PAGE_LINES)),
+                ft.IconButton(ft.Icons.NAVIGATE_NEXT, icon_size=16, tooltip="下一页",
+                              on_click=lambda e: self._show_page(self.page_start + LARGE_FILE_PAGE_LINES)),
+                self.page_info,
+                ft.Container(expand=True),
+                self.goto_line_field,
+            ], spacing=2),
+            padding=ft.padding.symmetric(horizontal=10),
+            bgcolor="#252526",
+            visible=False,
+        )
+        self.preview_list = ft.ListView(
+            controls=[self.file_content_markdown],
+            expand=True,
+            spacing=0,
+            padding=ft.padding.all(15)
+        )
         self.content_container = ft.Container(
-            content=ft.ListView(
-                controls=[self.file_content_markdown],
-                expand=True,
-                padding=ft.padding.all(15)
-            ),
+            content=ft.Column([
+                self.large_file_bar,
+                self.preview_list,
+            ], expand=True, spacing=0),
             expand=True,
             bgcolor="#1e1e1e",
             border_radius=ft.border_radius.only(bottom_left=6, bottom_right=6),
@@ -184,35 +276,245 @@ class FileViewer(BaseFilePanel):
 
     def create_component(self):
         """创建组件"""
-        return self._create_base_layout(content=self.content_container)
+        actions = []
+        if self.on_attach:
+            actions.append(ft.IconButton(ft.Icons.ATTACH_FILE, icon_size=14, icon_color="#a5b4fc", tooltip="添加到对话",
+                                         on_click=self._attach_current_file, style=ft.ButtonStyle(padding=0)))
+        return self._create_base_layout(content=self.content_container, actions=actions)
+
+    def _attach_current_file(self, e=None):
+        if self.current_file is None:
+            self.show_snackbar("请先选择一个文件", success=False)
+            return
+        self.on_attach(self.current_file)
 
-    def _update_ui(self, filepath: Path, content: str):
-        """通用 UI 更新逻辑"""
-        markdown_lang = SyntaxHighlighter.get_language_name(filepath)
-        display_lang = SyntaxHighlighter.get_display_name(filepath)
+    def _open_large_file(self, filepath: Path):
+        """以分页模式打开大文件：mmap 映射，后台建立行索引，只渲染当前页"""
+        self._close_large_file()
+        try:
+            encoding = sniff_file_encoding(filepath)
+            if encoding is None:
+                raise BinaryFileError("无法以文本形式解码此文件，可能是二进制文件")
+            if encoding.startswith(("utf-16", "utf-32")):
+                # 按 b"\n" 切分行的索引不适用于多字节宽字符编码
+                raise ValueError(f"分页模式暂不支持 {encoding.upper()} 编码")
+            self.large_file = MappedTextFile(filepath, encoding=encoding, on_progress=self._on_index_progress)
+        except Exception as e:
+            self.encoding = "Error: Read Failed"
+            self.large_file = None
+            self._set_single_block(f"```text\n读取文件时发生错误: {e}\n```\n")
+            return
+        self.encoding = self.large_file.encoding
+        self.large_file.start_indexing()
+        self.large_file_bar.visible = True
+        self.current_file_path.value = filepath.name
+        self.language_tag.value = SyntaxHighlighter.get_display_name(filepath)
+        self.encoding_info.value = self.encoding.upper()
+        self._show_page(0)
+        self.ui.mark_dirty(self.large_file_bar, self.current_file_path, self.language_tag, self.encoding_info)
+
+    def _close_large_file(self):
+        if self.large_file:
+            self.large_file.close()
+            self.large_file = None
+        if self.large_file_bar.visible:
+            self.large_file_bar.visible = False
+            self.ui.mark_dirty(self.large_file_bar)
+
+    def _show_page(self, start: int):
+        """渲染从 start 行开始的一页"""
+        large_file = self.large_file
+        if not large_file:
+            return
+        available = large_file.indexed_lines
+        start = max(0, min(start, max(available - 1, 0)))
+        lines = large_file.get_lines(start, LARGE_FILE_PAGE_LINES)
+        self.page_start, self._page_line_count = start, len(lines)
+        width = len(str(start + len(lines)))
+        numbered = "\n".join(f"{start + i + 1:>{width}} │ {line}" for i, line in enumerate(lines))
+        markdown_lang = SyntaxHighlighter.get_language_name(large_file.path)
+        self._set_single_block(f"```{markdown_lang}\n{numbered}\n```\n")
+        self._update_page_info()
+
+    def _update_page_info(self):
+        large_file = self.large_file
+        total = large_file.indexed_lines
+        suffix = "" if large_file.is_complete else "（索引中…）"
+        end = min(self.page_start + LARGE_FILE_PAGE_LINES, total)
+        self.page_info.value = f"第 {self.page_start + 1 if total else 0}-{end} 行 / 共 {total} 行{suffix}"
+        self.ui.mark_dirty(self.page_info)
+
+    def _on_index_progress(self, large_file):
+        if large_file is not self.large_file:
+            return
+        # 当前页在索引推进前不满一页时补全
+        if self._page_line_count < LARGE_FILE_PAGE_LINES and \
+                large_file.indexed_lines > self.page_start + self._page_line_count:
+            self._show_page(self.page_start)
+        else:
+            self._update_page_info()
+
+    def _on_goto_line(self, e):
+        if not self.large_file:
+            return
+        try:
+            line = int(self.goto_line_field.value.strip())
+        except ValueError:
+            self.show_snackbar("请输入有效的行号", success=False)
+            return
+        self.goto_line(line)
+
+    def goto_line(self, line: int):
+        """分页模式下跳转到第 line 行（1 起）所在的页；普通文件整篇显示，无需跳转"""
+        if not self.large_file:
+            return
+        if line > self.large_file.indexed_lines and not self.large_file.is_complete:
+            self.show_snackbar("行索引尚未建立到该位置，请稍后再试", success=False)
+            return
+        self._show_page(line - 1)
 
-        markdown_content = f"```{markdown_lang}\n{content}\n```\n"
-        self.file_content_markdown.value = markdown_content
+    def _update_ui(self, filepath: Path, chunks):
+        """通用 UI 更新逻辑，chunks 为 _build_chunks 的结果"""
+        display_lang = SyntaxHighlighter.get_display_name(filepath)
+        with self._preview_lock:
+            self._show_chunks(filepath, chunks)
         self.current_file_path.value = filepath.name
         self.language_tag.value = display_lang
         self.encoding_info.value = self.encoding.upper()
 
-    def set_content_for_realtime_update(self, content: str, file_path: Path):
+    def _new_markdown(self):
+        return ft.Markdown(
+            value="",
+            extension_set=ft.MarkdownExtensionSet.GITHUB_WEB,
+            code_theme="atom-one-dark",
+            selectable=True,
+        )
+
+    @staticmethod
+    def _chunk_markdown(filepath: Path, lines):
+        return f"```{SyntaxHighlighter.get_language_name(filepath)}\n" + "\n".join(lines) + "\n```\n"
+
+    def _set_single_block(self, markdown_content: str):
+        """只显示一个 Markdown 块（错误信息、大文件分页等）"""
+        with self._preview_lock:
+            self._chunks, self._preview_path, self._rendered_snapshot = [], None, None
+            self.file_content_markdown.value = markdown_content
+            self._set_preview_controls([self.file_content_markdown])
+            self.ui.mark_dirty(self.file_content_markdown)
+
+    def _set_preview_controls(self, controls):
+        if [id(c) for c in controls] != [id(c) for c in self.preview_list.controls]:
+            self.preview_list.controls = controls
+            self.ui.mark_dirty(self.preview_list)
+
+    def _build_chunks(self, filepath: Path, lines):
+        """把全部行按块拆分并生成 Markdown 文本: [(lines, markdown), ...]"""
+        pieces = [lines[start:start + PREVIEW_CHUNK_LINES] for start in range(0, max(len(lines), 1), PREVIEW_CHUNK_LINES)]
+        return [(piece, self._chunk_markdown(filepath, piece)) for piece in pieces]
+
+    def _render_full(self, filepath: Path, lines):
+        """按块重新渲染全部内容，尽量复用已有的 Markdown 控件"""
+        self._show_chunks(filepath, self._build_chunks(filepath, lines))
+
+    def _show_chunks(self, filepath: Path, built):
+        old_controls = [chunk["markdown"] for chunk in self._chunks] or [self.file_content_markdown]
+        chunks = []
+        for index, (chunk_lines, value) in enumerate(built):
+            markdown = old_controls[index] if index < len(old_controls) else self._new_markdown()
+            if markdown.value != value:
+                markdown.value = value
+                self.ui.mark_dirty(markdown)
+            chunks.append({"lines": chunk_lines, "markdown": markdown})
+        self._chunks, self._preview_path, self._rendered_snapshot = chunks, filepath, None
+        self._set_preview_controls([chunk["markdown"] for chunk in chunks])
+
+    def _render_diff(self, filepath: Path, new_lines):
+        """只重新渲染与上次内容相比发生变化的行所在的块"""
+        old_lines = [line for chunk in self._chunks for line in chunk["lines"]]
+        # 公共前缀/后缀（按行）确定变化范围
+        limit = min(len(old_lines), len(new_lines))
+        prefix = 0
+        while prefix < limit and old_lines[prefix] == new_lines[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old_lines[-1 - suffix] == new_lines[-1 - suffix]:
+            suffix += 1
+        if prefix == len(old_lines) == len(new_lines):
+            return
+        self._replace_lines(filepath, prefix, len(old_lines) - suffix, new_lines[prefix:len(new_lines) - suffix])
+
+    def _replace_lines(self, filepath: Path, start: int, old_end: int, replacement):
+        """把已渲染内容的 [start, old_end) 行替换为 replacement，只重绘受影响的块"""
+        # 找到覆盖旧变化范围 [start, old_end) 的块
+        first = last = None
+        offset = 0
+        for index, chunk in enumerate(self._chunks):
+            chunk_end = offset + len(chunk["lines"])
+            if first is None and (start < chunk_end or index == len(self._chunks) - 1):
+                first, first_offset = index, offset
+            if first is not None and (old_end <= chunk_end or index == len(self._chunks) - 1):
+                last = index
+                break
+            offset = chunk_end
+
+        # 受影响的块合并后替换变化的行，过大时重新拆分
+        affected = [line for chunk in self._chunks[first:last + 1] for line in chunk["lines"]]
+        merged = affected[:start - first_offset] + list(replacement) + affected[old_end - first_offset:]
+        pieces = [merged[i:i + PREVIEW_CHUNK_LINES] for i in range(0, len(merged), PREVIEW_CHUNK_LINES)] \
+            if len(merged) > PREVIEW_CHUNK_LINES * 2 else [merged]
+        replaced = self._chunks[first:last + 1]
+        new_chunks = []
+        for index, piece_lines in enumerate(pieces):
+            if not piece_lines and len(self._chunks) - len(replaced) > 0:
+                continue
+            markdown = replaced[index]["markdown"] if index < len(replaced) else self._new_markdown()
+            markdown.value = self._chunk_markdown(filepath, piece_lines)
+            new_chunks.append({"lines": piece_lines, "markdown": markdown})
+            self.ui.mark_dirty(markdown)
+        self._chunks[first:last + 1] = new_chunks
+        self._set_preview_controls([chunk["markdown"] for chunk in self._chunks])
+
+    def set_content_for_realtime_update(self, content, file_path: Path, version: int = None):
         """
-        用于接收来自 FileEditor 的实时内容更新。
-        添加重复内容检查避免不必要的更新。
+        用于接收来自 FileEditor 的实时内容更新，content 为文本或 TextSnapshot。
+        只记录最新版本，编辑停止 PREVIEW_IDLE_DELAY 秒后再渲染变化的部分。
         """
-        if not file_path or content == self._last_content:
+        if not file_path or self.large_file:
             return
-
-        self._last_content = content
-        self._update_ui(file_path, content)
-
-        try:
-            self.file_content_markdown.update()
-            self.language_tag.update()
-        except AssertionError:
-            pass
+        if version is None:
+            version = (self._pending_preview[0] + 1) if self._pending_preview else 0
+        self._pending_preview = (version, content, file_path)
+        self._preview_debouncer.poke()
+
+    def _flush_realtime_update(self):
+        pending = self._pending_preview
+        if pending is None or self.large_file:
+            return
+        version, content, file_path = pending
+        if version == self._rendered_version:
+            return
+        file_path = Path(file_path)
+        with self._preview_lock:
+            same_file = bool(self._chunks) and self._preview_path == file_path
+            changes = None
+            if same_file and isinstance(content, TextSnapshot):
+                changes = content.changed_lines_since(self._rendered_snapshot)
+                if changes and changes[1] > sum(len(chunk["lines"]) for chunk in self._chunks):
+                    changes = None
+            text = content.text if isinstance(content, TextSnapshot) else content
+            if changes is not None:
+                # 快照给出了变化的行范围，只取出这些行，无需拆分整个文本
+                first, old_end, new_end = changes
+                if old_end > first or new_end > first:
+                    self._replace_lines(file_path, first, old_end, content.get_lines(first, new_end - first))
+            elif same_file:
+                self._render_diff(file_path, text.split("\n"))
+            else:
+                self._render_full(file_path, text.split("\n"))
+            self._rendered_version = version
+            self._rendered_snapshot = content if isinstance(content, TextSnapshot) else None
+        self.language_tag.value = SyntaxHighlighter.get_display_name(file_path)
+        self.ui.mark_dirty(self.language_tag)
 
     def open_file(self, file_info):
         """
@@ -220,6 +522,22 @@ class FileViewer(BaseFilePanel):
         """
         filepath = Path(file_info["path"])
         self.current_file = filepath
+        try:
+            stat = filepath.stat()
+            is_large = filepath.is_file() and stat.st_size > LARGE_FILE_THRESHOLD
+        except OSError:
+            stat, is_large = None, False
+        if is_large:
+            self._open_large_file(filepath)
+            return
+        self._close_large_file()
+        # 文件未变化（修改时间和大小相同）时直接使用上次的渲染结果，不读取文件
+        cached = self.render_cache.get(filepath, stat) if stat is not None else None
+        if cached is not None:
+            self.encoding, chunks = cached
+            self._update_ui(filepath, chunks)
+            self.ui.mark_dirty(self.current_file_path, self.language_tag, self.encoding_info)
+            return
         content = self._read_file_content(filepath)
 
         if content is None:
@@ -236,20 +554,14 @@ class FileViewer(BaseFilePanel):
             self.current_file_path.value = f"加载失败: {file_name}"
             self.language_tag.value = "ERROR"
             self.encoding_info.value = self.encoding.upper()
-            markdown_content = f"```text\n{error_message}\n```\n"
-            self.file_content_markdown.value = markdown_content
-            self._last_content = markdown_content
+            self._set_single_block(f"```text\n{error_message}\n```\n")
         else:
-            self._update_ui(filepath, content)
-            self._last_content = content
+            chunks = self._build_chunks(filepath, content.split("\n"))
+            if stat is not None:
+                self.render_cache.put(filepath, stat, self.encoding, chunks)
+            self._update_ui(filepath, chunks)
 
-        try:
-            self.current_file_path.update()
-            self.language_tag.update()
-            self.encoding_info.update()
-            self.file_content_markdown.update()
-        except AssertionError:
-            pass
+        self.ui.mark_dirty(self.current_file_path, self.language_tag, self.encoding_info)
 
     def save_current_file(self, e=None):
         """只读模式下不实现保存"""
@@ -265,15 +577,18 @@ class FileEditor(BaseFilePanel):
 
     def __init__(self, main_page, on_content_change=None):
         super().__init__(main_page)
-        self.is_dirty = False
         self.on_content_change = on_content_change
 
+        # 编辑内容保存在片段表缓冲区中，修改状态、缓存和预览都基于它
+        self.buffer = TextBuffer()
         # 修复：使用线性事件处理确保每次变化只处理一次
-        self._last_processed_content = ""  # 上次处理的内容
         self._update_in_progress = False  # 防止重入
+        # 内容版本号，每次变化递增，供预览判断是否需要重新渲染
+        self.content_version = 0
 
-        # 只缓存修改过的文件
-        self.dirty_files_cache = {}
+        # 只缓存修改过的文件：内存中有界 LRU，其余转存到交换目录，崩溃后可恢复
+        self.dirty_files_cache = DirtyBufferStore()
+        self.recovered_files = self.dirty_files_cache.recover()
         # 当前文件路径
         self.current_cache_key = None
 
@@ -301,6 +616,10 @@ class FileEditor(BaseFilePanel):
             border_radius=ft.border_radius.only(bottom_left=6, bottom_right=6),
         )
 
+    @property
+    def is_dirty(self) -> bool:
+        return self.buffer.is_modified
+
     def create_component(self):
         """创建组件 - 使用 TextField 内容容器"""
         return self._create_base_layout(content=self.content_container)
@@ -314,31 +633,26 @@ class FileEditor(BaseFilePanel):
         if self._update_in_progress:
             return
 
-        current_content = self.input_editor.value
-
-        # 如果内容没有实际变化，忽略
-        if current_content == self._last_processed_content:
-            return
-
         try:
             self._update_in_progress = True
 
-            # 更新状态
-            self.is_dirty = True
-            self._last_processed_content = current_content
+            # 控件只提供完整文本，由缓冲区推导出实际的编辑；内容没有实际变化时忽略
+            if not self.buffer.set_text(self.input_editor.value):
+                return
+            self.content_version += 1
 
-            # 更新缓存
+            # 更新缓存（缓冲区持有的文本与控件是同一个字符串对象，不额外复制）
             if self.current_cache_key:
-                self.dirty_files_cache[self.current_cache_key] = current_content
+                self.dirty_files_cache[self.current_cache_key] = self.buffer.text
 
             # 更新 UI 状态
             file_name = Path(self.current_file).name if self.current_file else "新文件"
             self.current_file_path.value = f"{file_name}{' •' if self.is_dirty else ''}"
-            self.current_file_path.update()
+            self.ui.mark_dirty(self.current_file_path)
 
             # 触发实时内容同步回调
             if self.on_content_change and self.current_file:
-                self.on_content_change(current_content, Path(self.current_file))
+                self.on_content_change(self.buffer.snapshot(), Path(self.current_file))
 
         finally:
             self._update_in_progress = False
@@ -358,15 +672,15 @@ class FileEditor(BaseFilePanel):
             # 保存当前文件的编辑状态到缓存（只有修改过的文件）
             if self.current_file and self.is_dirty:
                 current_cache_key = self._get_cache_key(Path(self.current_file))
-                self.dirty_files_cache[current_cache_key] = self.input_editor.value
+                self.dirty_files_cache[current_cache_key] = self.buffer.text
 
             # 重置事件处理状态
-            self._last_processed_content = ""
             self._update_in_progress = False
 
             # 设置新文件
             self.current_file = filepath
             self.current_cache_key = cache_key
+            self.content_version += 1
 
             # 检查是否有缓存的修改版本
             if cache_key in self.dirty_files_cache:
@@ -374,15 +688,14 @@ class FileEditor(BaseFilePanel):
                 cached_content = self.dirty_files_cache[cache_key]
                 self.input_editor.value = cached_content
                 self.input_editor.disabled = False
-                self.is_dirty = True
+                self.buffer.reset(cached_content, modified=True)
                 self.current_file_path.value = f"{filepath.name} •"
                 self.language_tag.value = SyntaxHighlighter.get_display_name(filepath)
                 self.encoding_info.value = "MODIFIED"
-                self._last_processed_content = cached_content
 
                 # 触发同步
                 if self.on_content_change:
-                    self.on_content_change(cached_content, filepath)
+                    self.on_content_change(self.buffer.snapshot(), filepath)
 
             else:
                 # 从文件系统加载原始版本
@@ -405,30 +718,33 @@ class FileEditor(BaseFilePanel):
                     self.current_file_path.value = f"加载失败: {file_name}"
                     self.language_tag.value = "ERROR"
                     self.encoding_info.value = self.encoding.upper()
-                    self._last_processed_content = error_message
+                    self.buffer.reset(error_message)
                 else:
                     # 成功加载原始文件
                     display_lang = SyntaxHighlighter.get_display_name(filepath)
                     self.input_editor.value = content
                     self.input_editor.disabled = False
-                    self.is_dirty = False
+                    self.buffer.reset(content)
                     self.current_file_path.value = filepath.name
                     self.language_tag.value = display_lang
                     self.encoding_info.value = self.encoding.upper()
-                    self._last_processed_content = content
 
                     # 触发同步
                     if self.on_content_change:
-                        self.on_content_change(content, filepath)
+                        self.on_content_change(self.buffer.snapshot(), filepath)
 
-            self.main_page.update()
+            self._mark_panel_dirty()
 
         except Exception as e:
             self.input_editor.value = f"加载文件时发生意外错误: {e}"
             self.input_editor.disabled = True
             self.current_file_path.value = "意外错误"
-            self._last_processed_content = self.input_editor.value
-            self.main_page.update()
+            self.buffer.reset(self.input_editor.value)
+            self._mark_panel_dirty()
+
+    def _mark_panel_dirty(self):
+        """标记编辑器及状态栏控件需要刷新"""
+        self.ui.mark_dirty(self.input_editor, self.current_file_path, self.language_tag, self.encoding_info)
 
     def save_current_file(self, e=None):
         """保存当前编辑的文件到磁盘"""
@@ -441,7 +757,7 @@ class FileEditor(BaseFilePanel):
             return
 
         try:
-            content = self.input_editor.value or ""
+            content = self.buffer.text
             with open(self.current_file, 'w', encoding='utf-8') as f:
                 f.write(content)
 
@@ -450,14 +766,13 @@ class FileEditor(BaseFilePanel):
             if cache_key in self.dirty_files_cache:
                 del self.dirty_files_cache[cache_key]
 
-            self.is_dirty = False
+            self.buffer.mark_saved()
             self.encoding = 'utf-8'
             self.current_file_path.value = Path(self.current_file).name
             self.encoding_info.value = 'UTF-8'
-            self._last_processed_content = content  # 更新最后内容
 
             self.show_snackbar("✅ 保存成功", success=True)
-            self.current_file_path.update()
+            self.ui.mark_dirty(self.current_file_path, self.encoding_info)
 
         except Exception as e:
             self.show_snackbar(f"❌ 保存失败: {str(e)}", success=False)
@@ -470,6 +785,10 @@ class FileEditor(BaseFilePanel):
         """获取缓存的文件数量"""
         return len(self.dirty_files_cache)
 
+    def get_cache_memory_used(self):
+        """获取未保存缓冲区占用的内存字节数"""
+        return self.dirty_files_cache.memory_used()
+
 
 # 确保别名指向正确的类
 SimpleFileEditor = FileEditor
\ No newline at end of file
@@ -2,13 +2,17 @@
 # -*- coding: utf-8 -*-
 
 import flet as ft
-import datetime
 from pathlib import Path
 import threading
-import shutil
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
-import time
+import os
+from .ui_scheduler import get_ui_scheduler, IdleDebouncer
+from .file_tree_model import FileTreeModel
+from .file_monitor import DirectoryWatcher, EventCoalescer
+from .ignore_rules import IgnoreRules, IGNORE_FILE_NAMES
+from .path_index import PathIndex
+from .workspace_index import WorkspaceIndex
+from .tree_snapshot import TreeSnapshotStore
+from .file_operations import FileOperationQueue, unique_destination
 
 # 常量定义
 COLOR_BG_HOVER, COLOR_TEXT_NORMAL, COLOR_ICON_NORMAL = "#374151", "#e5e7eb", "#9ca3af"
@@ -17,21 +21,18 @@ DIR_BG_COLORS = [ft.Colors.with_opacity(0.05, ft.Colors.BLUE_GREY_500),
                  ft.Colors.with_opacity(0.15, ft.Colors.BLUE_GREY_500)]
 LARGE_ICON_SIZE, LARGE_BUTTON_ICON_SIZE, RENAME_BUTTON_ICON_SIZE = 16, 16, 24
 TEXT_SIZE_NORMAL, TEXT_SIZE_SMALL = 12, 10
-
-
-class FileChangeHandler(FileSystemEventHandler):
-    def __init__(self, file_explorer): self.file_explorer = file_explorer
-
-    def on_any_event(self, event):
-        if not (
-                self.file_explorer.current_operation or self.file_explorer.renaming_path or self.file_explorer.switching_dir):
-            self.file_explorer.schedule_refresh()
+# 虚拟化文件树：固定行高、可视区域外额外创建的行数、滚动事件间隔（毫秒）、初始视口高度
+TREE_ROW_HEIGHT, TREE_OVERSCAN_ROWS, TREE_SCROLL_INTERVAL, DEFAULT_VIEWPORT_HEIGHT = 32, 20, 50, 900
+# 文件树或展开状态变化后空闲多久保存快照（秒）
+SNAPSHOT_SAVE_DELAY = 2.0
 
 
 class FileExplorer:
-    def __init__(self, main_page, on_file_select=None, root_path: Path = None):  # 👈 1. 接受 root_path 参数
-        self.main_page, self.on_file_select = main_page, on_file_select
-        self.file_explorer_list = ft.Column(expand=True, spacing=0)
+    def __init__(self, main_page, on_file_select=None, root_path: Path = None, on_attach=None):  # 👈 1. 接受 root_path 参数
+        self.main_page, self.on_file_select, self.on_attach = main_page, on_file_select, on_attach
+        self.ui = get_ui_scheduler(main_page)
+        self.file_explorer_list = ft.ListView(expand=True, spacing=0, on_scroll=self._on_tree_scroll,
+                                              scroll_interval=TREE_SCROLL_INTERVAL)
         # 状态初始化
         # 确定 current_directory
         self.current_directory = root_path.resolve() if root_path else Path(".").resolve()
@@ -39,8 +40,35 @@ class FileExplorer:
         # 初始化展开目录列表，确保起始目录是展开的
         self.expanded_dirs = {str(self.current_directory)}  # 👈 3. 使用确定的根目录
 
-        self.auto_refresh_timer = None
-        self.observer, self.file_structure_cache = None, {}
+        self.observer = None
+        # 忽略规则（.gitignore 语义），同时作用于监听、扫描和文件树
+        self.ignore_rules = IgnoreRules(self.current_directory)
+        # 内存文件树模型，由文件系统事件增量更新
+        self.tree_model = FileTreeModel(self.current_directory, ignore_rules=self.ignore_rules)
+        # 整个根目录的文件路径索引（快速打开），后台建立并由同一批文件系统事件维护
+        self.path_index = PathIndex(self.current_directory, self.ignore_rules)
+        self.path_index.start()
+        # 工作区代码检索索引（BM25），在对话中启用检索时才开始建立，由同一批文件系统事件维护
+        self.workspace_index = WorkspaceIndex(self.current_directory, self.ignore_rules)
+        # 文件树快照：启动时先按上次的快照渲染，后台校验后只应用差异
+        self.snapshot_store = TreeSnapshotStore()
+        self._snapshot_debouncer = IdleDebouncer(self.save_snapshot, SNAPSHOT_SAVE_DELAY, "explorer-snapshot-save")
+        # 复制/移动/删除在后台队列中执行，完成后把结果作为一次增量应用到文件树
+        self.file_ops = FileOperationQueue(on_progress=self._on_file_op_progress,
+                                           on_complete=self._on_file_op_complete)
+        self.clipboard = None  # ("copy" | "cut", Path)
+        # 文件系统事件合并队列，按批次增量应用到文件树模型
+        self.event_queue = EventCoalescer(self._apply_event_batch, self._rescan_directories)
+        # 已渲染行缓存: row_key -> (signature, control)，未变化的行直接复用
+        self._row_cache, self._render_lock = {}, threading.Lock()
+        # 悬停高亮：事件只记录最新状态，每帧合并应用；计数器用于观察悬停产生的事件数和实际发送的行更新数
+        self._hover_targets, self._hover_lock = {}, threading.Lock()
+        self.hover_events = self.hover_updates = 0
+        self._modified_keys, self._remove_keys, self._renaming_key = set(), set(), None
+        # 虚拟化渲染：完整的行描述列表，只为可视窗口内的行创建控件
+        self._row_specs, self._window = [], (0, 0)
+        self._scroll_offset, self._viewport_height = 0.0, DEFAULT_VIEWPORT_HEIGHT
+        self._top_spacer, self._bottom_spacer = ft.Container(height=0), ft.Container(height=0)
         self.config_mode, self.items_to_remove, self.renaming_path = False, {}, None
         self.current_operation, self.switching_dir, self.target_parent_directory = None, False, None
         self.modified_files = set()  # self.current_directory 已设置，此处移除重复赋值
@@ -58,6 +86,19 @@ class FileExplorer:
             content=ft.Row([self.new_input_field, self.confirm_button, self.cancel_button], spacing=2),
             padding=8, bgcolor="#1a1f2e", border_radius=4, margin=ft.margin.only(bottom=5), visible=False
         )
+        self.file_op_label = ft.Text("", size=TEXT_SIZE_SMALL, color=COLOR_TEXT_NORMAL, expand=True, no_wrap=True)
+        self.file_op_progress = ft.ProgressBar(value=0, height=4, color="#3b82f6", bgcolor="#374151")
+        self.file_op_bar = ft.Container(
+            content=ft.Column([
+                ft.Row([self.file_op_label,
+                        self._create_icon_button(ft.Icons.CLOSE, self.cancel_file_operations, "取消文件操作", "#ef4444")],
+                       spacing=2),
+                self.file_op_progress,
+            ], spacing=2),
+            padding=ft.padding.symmetric(horizontal=8, vertical=4), bgcolor="#1a1f2e", border_radius=4,
+            margin=ft.margin.only(bottom=5), visible=False
+        )
+        self._restore_snapshot()
         self.start_file_monitoring()
 
     def _create_text_field(self, hint_text, on_submit):
@@ -77,6 +118,11 @@ class FileExplorer:
             self.modified_files.discard(file_path)
         self.refresh_files()
 
+    def mark_files_modified(self, file_paths):
+        """批量标记文件为已修改（例如恢复的未保存缓冲区）"""
+        self.modified_files.update(Path(file_path).resolve() for file_path in file_paths)
+        self.refresh_files()
+
     def is_file_modified(self, file_path):
         return Path(file_path).resolve() in self.modified_files
 
@@ -91,8 +137,8 @@ class FileExplorer:
         )
         return ft.Container(
             content=ft.Column([
-                top_bar_content, self.new_operation_container,
-                ft.Container(content=ft.ListView([self.file_explorer_list], expand=True, spacing=0), expand=True,
+                top_bar_content, self.new_operation_container, self.file_op_bar,
+                ft.Container(content=self.file_explorer_list, expand=True,
                              padding=ft.padding.only(left=5, right=5, top=0, bottom=5), bgcolor="#1f2937",
                              border_radius=ft.BorderRadius(top_left=0, top_right=0, bottom_left=6, bottom_right=6))
             ], spacing=0), expand=True, bgcolor="#111827", padding=5
@@ -102,7 +148,7 @@ class FileExplorer:
         is_op_active = any([self.current_operation, self.renaming_path, self.items_to_remove, self.switching_dir])
         if self.current_operation: self.hide_input_fields(); self.target_parent_directory = None
         if self.renaming_path or self.items_to_remove or self.switching_dir:
-            self.renaming_path, self.items_to_clear, self.switching_dir = None, {}, False
+            self.renaming_path, self.items_to_remove, self.switching_dir = None, {}, False
         if is_op_active: self.show_snackbar("操作已取消"); self.refresh_files()
         return is_op_active
 
@@ -141,9 +187,17 @@ class FileExplorer:
         self.refresh_files()
 
     def _set_current_directory(self, new_path: Path):
+        self.save_snapshot()
         self.current_directory = new_path.resolve();
         self.expanded_dirs = {str(self.current_directory)};
-        self.file_structure_cache = {}
+        self.ignore_rules = IgnoreRules(self.current_directory)
+        self.event_queue.clear()
+        self.tree_model.reset(self.current_directory, self.ignore_rules)
+        self.path_index.reset(self.current_directory, self.ignore_rules)
+        self.workspace_index.reset(self.current_directory, self.ignore_rules)
+        self._row_cache = {}
+        self._restore_snapshot()
+        self.start_file_monitoring()
 
     def start_create_op(self, directory: Path, field_type: str):
         if self.renaming_path or self.items_to_remove or self.switching_dir: self.cancel_all_operations()
@@ -158,8 +212,8 @@ class FileExplorer:
         for control in [self.new_input_field, self.confirm_button, self.cancel_button, self.new_operation_container]:
             control.visible = True
         self.new_input_field.value = "";
-        self.new_input_field.focus();
-        self.main_page.update()
+        self.ui.mark_dirty(self.new_operation_container)
+        self.new_input_field.focus()
 
     def _get_target_display_name(self):
         try:
@@ -172,6 +226,7 @@ class FileExplorer:
         for control in [self.new_input_field, self.confirm_button, self.cancel_button, self.new_operation_container]:
             control.visible = False
         self.current_operation, self.new_input_field.value, self.target_parent_directory = None, "", None
+        self.ui.mark_dirty(self.new_operation_container)
 
     def confirm_create(self, e):
         name = self.new_input_field.value.strip()
@@ -179,40 +234,34 @@ class FileExplorer:
         if self.target_parent_directory is None: self.show_snackbar(
             "创建失败：目标目录丢失"); self.hide_input_fields(); self.refresh_files(); return
         try:
-            if self.current_operation == 'file':
-                (self.target_parent_directory / name).touch()
+            is_file, new_path = self.current_operation == 'file', self.target_parent_directory / name
+            if is_file:
+                new_path.touch()
             else:
-                (self.target_parent_directory / name).mkdir(exist_ok=True)
+                new_path.mkdir(exist_ok=True)
             self.hide_input_fields();
-            self.show_snackbar(f"{'文件' if self.current_operation == 'file' else '文件夹'}创建成功: {name}")
-            self.file_structure_cache = {};
+            self.show_snackbar(f"{'文件' if is_file else '文件夹'}创建成功: {name}")
+            self.tree_model.apply_event("created", str(new_path), is_directory=not is_file)
             self.refresh_files()
         except Exception as ex:
             self.show_snackbar(f"创建失败: {str(ex)}")
 
-    def create_directory_item(self, dir_name, dir_data, parent_indent, current_depth, is_virtual_root=False):
-        dir_path_str = str(dir_data["path"])
+    def create_directory_item(self, node, indent, bg_color, is_virtual_root=False):
+        """创建目录标题行（目录内容作为独立的行渲染）"""
+        dir_path_str = node.key
         is_expanded = dir_path_str in self.expanded_dirs or is_virtual_root
 
-        if dir_data["path"] == self.renaming_path:
-            return self.create_rename_input_row({"path": dir_data["path"], "name": dir_name, "is_dir": True},
-                                                parent_indent)
-
-        if self.switching_dir and is_virtual_root:
-            return self._create_switch_directory_input()
-
         # 显示内容设置
         if is_virtual_root:
             display_name = f"当前目录: {self.current_directory.name}" if self.current_directory.name != "" else f"当前根目录: {self.current_directory.resolve()}"
             dir_color = COLOR_DIR_NORMAL
         else:
-            display_name, dir_color = dir_name, self.get_folder_color(dir_name)
+            display_name, dir_color = node.name, self.get_folder_color(node.name)
 
-        bg_color = DIR_BG_COLORS[min(current_depth, len(DIR_BG_COLORS) - 1)]
-        buttons = self._create_directory_buttons(dir_data, is_virtual_root)
+        buttons = self._create_directory_buttons(node.to_info(), is_virtual_root)
 
         dir_title_row = ft.Row([
-            ft.Container(width=parent_indent),
+            ft.Container(width=indent),
             ft.Icon(
                 name=ft.Icons.KEYBOARD_ARROW_DOWN if is_expanded and not is_virtual_root else ft.Icons.KEYBOARD_ARROW_RIGHT,
                 color=dir_color, size=LARGE_ICON_SIZE, visible=not is_virtual_root),
@@ -221,20 +270,17 @@ class FileExplorer:
             ft.Text(display_name, size=TEXT_SIZE_NORMAL, color=dir_color, weight="bold", expand=True), *buttons
         ], spacing=2)
 
-        dir_title = ft.Container(content=dir_title_row, bgcolor=None, padding=ft.padding.only(top=2, bottom=2, right=5),
-                                 on_click=lambda e: self.toggle_directory(
-                                     dir_path_str) if not is_virtual_root else None,
-                                 data={"default_bg": None}, on_hover=self._on_hover_change, border_radius=3)
-
-        dir_content_column = ft.Column(spacing=0)
-        if is_expanded or is_virtual_root:
-            self._render_directory_contents(dir_data, dir_content_column, parent_indent, current_depth)
+        return ft.Container(content=dir_title_row, bgcolor=bg_color, padding=ft.padding.only(top=2, bottom=2, right=5),
+                            on_click=lambda e: self.toggle_directory(dir_path_str) if not is_virtual_root else None,
+                            data={"default_bg": bg_color}, on_hover=self._on_hover_change, border_radius=3)
 
-        return ft.Container(content=ft.Column([dir_title, dir_content_column], spacing=0), bgcolor=bg_color,
-                            margin=ft.margin.only(bottom=5) if is_virtual_root else None, border_radius=5)
     def _create_directory_buttons(self, dir_data, is_virtual_root):
         buttons = []
         if self.config_mode:
+            if self.clipboard:
+                buttons.append(self._create_icon_button(ft.Icons.CONTENT_PASTE,
+                                                        lambda e, path=dir_data["path"]: self.paste_into(path),
+                                                        f"粘贴 '{self.clipboard[1].name}' 到此处", "#10b981"))
             if is_virtual_root:
                 buttons.append(
                     self._create_icon_button(ft.Icons.COMPARE_ARROWS, self.start_switch_directory, "切换当前目录",
@@ -251,6 +297,10 @@ class FileExplorer:
                     self._create_icon_button(ft.Icons.EDIT_SQUARE, lambda e, path=dir_data["path"],
                                                                           name=dir_data["name"]: self.start_rename_mode(
                         path, name), "重命名"),
+                    self._create_icon_button(ft.Icons.CONTENT_COPY,
+                                             lambda e, path=dir_data["path"]: self.set_clipboard("copy", path), "复制"),
+                    self._create_icon_button(ft.Icons.CONTENT_CUT,
+                                             lambda e, path=dir_data["path"]: self.set_clipboard("cut", path), "剪切"),
                     self._create_icon_button(ft.Icons.REMOVE_CIRCLE_OUTLINE, lambda e, info={"path": dir_data["path"],
                                                                                              "name": dir_data[
                                                                                                  "name"]}: self.show_remove_confirmation(
@@ -264,12 +314,13 @@ class FileExplorer:
             self._create_icon_button(ft.Icons.CHECK, self.confirm_switch_directory, "确认切换", "#10b981",
                                      RENAME_BUTTON_ICON_SIZE),
             self._create_icon_button(ft.Icons.CLOSE, self.cancel_create, "取消", "#ef4444", RENAME_BUTTON_ICON_SIZE)
-        ], spacing=2), padding=ft.padding.all(5), bgcolor="#1f2937", border_radius=3, margin=ft.margin.only(bottom=5))
+        ], spacing=2), padding=ft.padding.symmetric(horizontal=5), bgcolor="#1f2937", border_radius=3)
 
     def toggle_config_mode(self, e):
         if self.cancel_all_operations(): return
         self.config_mode = not self.config_mode
         self.config_mode_button.icon_color = "#3b82f6" if self.config_mode else COLOR_ICON_NORMAL
+        self.ui.mark_dirty(self.config_mode_button)
         self.refresh_files()
 
     def start_rename_mode(self, original_path: Path, original_name: str):
@@ -302,17 +353,9 @@ class FileExplorer:
             "重命名路径丢失"); self.renaming_path = None; self.refresh_files(); return
         old_path, new_path = self.renaming_path, self.renaming_path.parent / new_name
         if new_path.exists(): self.show_snackbar(f"新名称已存在: {new_name}"); return
-        try:
-            old_path.rename(new_path)
-            if old_path.resolve() in self.modified_files:
-                self.modified_files.remove(old_path.resolve());
-                self.modified_files.add(new_path.resolve())
-            self.show_snackbar(f"重命名成功: {old_path.name} -> {new_name}");
-            self.renaming_path = None
-            self.file_structure_cache = {};
-            self.refresh_files()
-        except Exception as ex:
-            self.show_snackbar(f"重命名失败: {str(ex)}"); self.renaming_path = None; self.refresh_files()
+        self.renaming_path = None
+        self.file_ops.move(old_path, new_path)
+        self.refresh_files()
 
     def create_rename_input_row(self, file_info, indent):
         rename_input = ft.TextField(value=file_info["name"], height=30, text_size=TEXT_SIZE_NORMAL, content_padding=5,
@@ -327,10 +370,7 @@ class FileExplorer:
             self._create_icon_button(ft.Icons.CLOSE, self.cancel_create, "取消", "#ef4444", RENAME_BUTTON_ICON_SIZE)
         ], spacing=2), padding=ft.padding.only(top=1, bottom=1, right=5), bgcolor="#1f2937", border_radius=3)
 
-    def create_file_item(self, file_info, indent=10):
-        if file_info["path"] == self.renaming_path:
-            return self.create_rename_input_row(file_info, indent)
-
+    def create_file_item(self, file_info, indent=10, bg_color=None):
         # 修复这里：分别获取文件图标和颜色
         file_icon_data = self.get_file_icon(file_info["extension"])
         file_icon = file_icon_data[0]  # 图标名称
@@ -338,12 +378,20 @@ class FileExplorer:
         is_modified = self.is_file_modified(file_info["path"])
 
         config_buttons = []
+        if self.config_mode and self.on_attach:
+            config_buttons.append(self._create_icon_button(ft.Icons.ATTACH_FILE,
+                                                           lambda e, path=file_info["path"]: self.on_attach(path),
+                                                           "添加到对话", "#a5b4fc"))
         if self.config_mode:
             config_buttons.extend([
                 self._create_icon_button(ft.Icons.EDIT_SQUARE,
                                          lambda e, path=file_info["path"],
                                                 name=file_info["name"]: self.start_rename_mode(path, name),
                                          "重命名"),
+                self._create_icon_button(ft.Icons.CONTENT_COPY,
+                                         lambda e, path=file_info["path"]: self.set_clipboard("copy", path), "复制"),
+                self._create_icon_button(ft.Icons.CONTENT_CUT,
+                                         lambda e, path=file_info["path"]: self.set_clipboard("cut", path), "剪切"),
                 self._create_icon_button(ft.Icons.REMOVE_CIRCLE_OUTLINE,
                                          lambda e, info=file_info: self.show_remove_confirmation(info),
                                          "删除此文件", "#ef4444")
@@ -362,12 +410,12 @@ class FileExplorer:
             *config_buttons
         ], spacing=2)
 
-        return ft.Container(content=file_row, bgcolor=None, padding=ft.padding.only(top=1, bottom=1, right=5),
-                            on_click=lambda e: self.on_file_selected(file_info), data={"default_bg": None},
+        return ft.Container(content=file_row, bgcolor=bg_color, padding=ft.padding.only(top=1, bottom=1, right=5),
+                            on_click=lambda e: self.on_file_selected(file_info), data={"default_bg": bg_color},
                             on_hover=self._on_hover_change, border_radius=3)
-    def add_new_buttons_to_column(self, directory, indent, column):
-        if any([self.renaming_path, self.config_mode, self.switching_dir, self.current_operation]): return
-        column.controls.append(ft.Container(content=ft.Row([
+
+    def create_new_buttons_row(self, directory, indent, bg_color=None):
+        return ft.Container(content=ft.Row([
             ft.Container(width=indent),
             self._create_icon_button(ft.Icons.ADD, lambda e, d=directory: self.start_create_op(d, 'file'),
                                      f"在 '{directory.name}' 中新建文件", "#10b981"),
@@ -375,7 +423,7 @@ class FileExplorer:
                                      lambda e, d=directory: self.start_create_op(d, 'folder'),
                                      f"在 '{directory.name}' 中新建文件夹", "#f59e0b"),
             ft.Text("新建...", size=TEXT_SIZE_SMALL, color="#6b7280")
-        ], spacing=2), padding=ft.padding.only(top=1, bottom=1)))
+        ], spacing=2), padding=ft.padding.only(top=1, bottom=1), bgcolor=bg_color)
 
     def create_remove_confirmation(self, file_info, indent=10):
         return ft.Container(content=ft.Row([
@@ -385,109 +433,276 @@ class FileExplorer:
                                      RENAME_BUTTON_ICON_SIZE),
             self._create_icon_button(ft.Icons.CLOSE, lambda e: self.hide_remove_confirmation(file_info["path"]),
                                      "取消删除", "#ef4444", RENAME_BUTTON_ICON_SIZE)
-        ]), padding=8, bgcolor="#7f1d1d", border_radius=4, margin=ft.margin.only(bottom=2))
+        ]), padding=ft.padding.symmetric(horizontal=8), bgcolor="#7f1d1d", border_radius=4)
 
     def confirm_remove(self, file_info):
-        try:
-            filepath = file_info["path"]
-            if filepath.resolve() in self.modified_files: self.modified_files.remove(filepath.resolve())
-            if filepath.is_file():
-                filepath.unlink()
-            else:
-                shutil.rmtree(filepath)
-            self.show_snackbar(f"删除成功: {file_info['name']}");
-            self.hide_remove_confirmation(filepath)
-            self.file_structure_cache = {};
-            self.refresh_files()
-        except Exception as ex:
-            self.show_snackbar(f"删除失败: {str(ex)}"); self.hide_remove_confirmation(filepath)
+        filepath = file_info["path"]
+        self.file_ops.delete(filepath)
+        self.hide_remove_confirmation(filepath)
 
-    def _on_hover_change(self, e):
-        container = e.control
-        if e.data == "true":
-            container.data["default_bg"], container.bgcolor = container.bgcolor, COLOR_BG_HOVER
+    def set_clipboard(self, mode, path: Path):
+        self.clipboard = (mode, path)
+        self.show_snackbar(f"已{'复制' if mode == 'copy' else '剪切'}: {path.name}，在目标文件夹上点击粘贴")
+        self.refresh_files()
+
+    def paste_into(self, directory: Path):
+        if not self.clipboard: return
+        mode, source = self.clipboard
+        if mode == "copy":
+            self.file_ops.copy(source, unique_destination(directory / source.name))
+        else:
+            destination = directory / source.name
+            if destination == source: self.show_snackbar("源和目标相同"); return
+            if destination.exists(): self.show_snackbar(f"目标已存在: {source.name}"); return
+            self.clipboard = None
+            self.file_ops.move(source, destination)
+        self.refresh_files()
+
+    def cancel_file_operations(self, e=None):
+        self.file_ops.cancel_all()
+
+    def _on_file_op_progress(self, operation):
+        queued = len(self.file_ops.operations) - 1
+        suffix = f"（另有 {queued} 个排队）" if queued > 0 else ""
+        self.file_op_label.value = f"{operation.label} {operation.progress:.0%}{suffix}"
+        self.file_op_progress.value = operation.progress
+        self.file_op_bar.visible = True
+        self.ui.mark_dirty(self.file_op_bar)
+
+    def _on_file_op_complete(self, operation):
+        """操作结束：把结果作为一次增量应用到文件树和路径索引"""
+        if operation.status == "done":
+            self._move_modified_marks(operation.source, operation.destination if operation.kind == "move" else None,
+                                      keep=operation.kind == "copy")
+            self.show_snackbar(f"{operation.label} 完成")
+        elif operation.status == "cancelled":
+            self.show_snackbar(f"{operation.label} 已取消")
         else:
-            container.bgcolor = container.data.get("default_bg", None)
-        if self.main_page and hasattr(self.main_page, 'update'):
-            (self.main_page.page.run_thread if self.main_page.page else lambda f: f())(self.main_page.update)
+            self.show_snackbar(f"{operation.label} 失败: {operation.error}")
+        if operation.delta:
+            self._apply_event_batch(operation.delta)
+        if operation.rescan_dirs:
+            self._rescan_directories(operation.rescan_dirs)
+        if not self.file_ops.operations:
+            self.file_op_bar.visible = False
+            self.ui.mark_dirty(self.file_op_bar)
+        # 修改标记可能随路径变化，行特征值未变的行会复用原控件
+        self.refresh_files()
+
+    def _move_modified_marks(self, source: Path, destination: Path = None, keep: bool = False):
+        """源路径（含子路径）上的修改标记移到 destination 下；删除时丢弃，复制时保留"""
+        if keep: return
+        source = source.resolve()
+        for path in [p for p in self.modified_files if p == source or source in p.parents]:
+            self.modified_files.discard(path)
+            if destination is not None:
+                self.modified_files.add(destination.resolve() / path.relative_to(source))
+
+    def _on_hover_change(self, e):
+        """只记录行的最新悬停状态，在下一帧前统一应用；同一帧内进入又离开的行不会产生更新"""
+        with self._hover_lock:
+            self._hover_targets[id(e.control)] = (e.control, e.data == "true")
+            self.hover_events += 1
+        self.ui.run_before_frame("explorer-hover", self._apply_hover)
+
+    def _apply_hover(self):
+        with self._hover_lock:
+            targets, self._hover_targets = self._hover_targets, {}
+        changed = []
+        for container, hovered in targets.values():
+            # 默认背景在创建行时写入 data，不从当前（可能仍是悬停色的）背景推断
+            bgcolor = COLOR_BG_HOVER if hovered else container.data.get("default_bg")
+            if container.bgcolor != bgcolor:
+                container.bgcolor = bgcolor
+                changed.append(container)
+        if changed:
+            self.hover_updates += len(changed)
+            self.ui.mark_dirty(*changed)
 
     def start_file_monitoring(self):
         try:
-            if self.observer: self.observer.stop(); self.observer.join()
-            self.observer = Observer();
-            self.observer.schedule(FileChangeHandler(self), str(self.current_directory), recursive=True)
+            if self.observer: self.observer.stop()
+            self.observer = DirectoryWatcher(self.current_directory, self.on_fs_event, self.ignore_rules)
             self.observer.start()
         except Exception as e:
             print(f"文件监控启动失败: {e}")
 
-    def schedule_refresh(self):
-        if self.auto_refresh_timer: self.auto_refresh_timer.cancel()
-        self.auto_refresh_timer = threading.Timer(0.3, self.refresh_files);
-        self.auto_refresh_timer.start()
+    def on_fs_event(self, event_type, src_path, dest_path=None, is_directory=False):
+        """文件系统事件进入合并队列，由队列线程按批次应用"""
+        # 后台文件操作涉及的路径由操作完成时的增量统一更新
+        if self.file_ops.owns(src_path) and (dest_path is None or self.file_ops.owns(dest_path)):
+            return
+        self.event_queue.push(event_type, src_path, dest_path, is_directory)
+
+    def _apply_event_batch(self, events):
+        self.path_index.apply_events(events)
+        changed = set()
+        for event in events:
+            changed |= self.tree_model.apply_event(*event)
+        # 忽略规则变化后重新扫描已加载的目录
+        if any(os.path.basename(event[1]) in IGNORE_FILE_NAMES for event in events):
+            if self.tree_model.reload_loaded():
+                changed.add(str(self.current_directory))
+        # 事件未影响已加载的节点时无需重新渲染
+        if changed:
+            self.refresh_files()
+        # 检索索引需要读取文件内容，放在文件树更新之后
+        self.workspace_index.apply_events(events)
+
+    def _rescan_directories(self, directories):
+        """事件突发溢出时，重新扫描受影响的已加载目录"""
+        self.path_index.rescan_directories(directories)
+        self.workspace_index.rescan_directories(directories)
+        changed = False
+        for directory in directories:
+            node = self.tree_model.get(directory)
+            if node is not None and node.loaded:
+                changed |= self.tree_model.reload_directory(directory)
+        if changed:
+            self.refresh_files()
+
+    def _restore_snapshot(self):
+        """用当前根目录的快照填充文件树（不访问文件系统），并在后台校验"""
+        snapshot = self.snapshot_store.load(self.current_directory)
+        if snapshot is None:
+            return
+        directories, expanded = snapshot
+        generation = self.tree_model.generation
+        restored = self.tree_model.restore_directories(directories)
+        self.expanded_dirs.update(path for path in expanded if path in restored)
+        threading.Thread(target=self._validate_snapshot, args=(generation, restored),
+                         name="explorer-snapshot-validate", daemon=True).start()
+
+    def _validate_snapshot(self, generation, directories):
+        changed = self.tree_model.validate_directories(directories)
+        if changed and not self.tree_model.is_cancelled(generation):
+            self.refresh_files()
+
+    def save_snapshot(self):
+        """保存当前根目录的展开状态及展开目录的内容"""
+        generation = self.tree_model.generation
+        root, expanded = str(self.current_directory), set(self.expanded_dirs)
+        directories = self.tree_model.export_directories([root, *expanded])
+        # 导出期间切换了根目录
+        if self.tree_model.is_cancelled(generation) or not directories:
+            return
+        self.snapshot_store.save(root, directories, expanded)
 
     def refresh_files(self, page=None):
-        def update_ui():
-            self.file_explorer_list.controls.clear()
+        with self._render_lock:
+            generation = self.tree_model.generation
             try:
-                if not self.file_structure_cache or self.file_structure_cache[
-                    "path"].resolve() != self.current_directory.resolve():
-                    self.file_structure_cache = self.get_directory_structure(self.current_directory)
-                virtual_root_data = {"name": str(self.current_directory.name), "path": self.current_directory,
-                                     "files": self.file_structure_cache.get("files", []),
-                                     "subdirs": self.file_structure_cache.get("subdirs", {})}
-                self.file_explorer_list.controls.append(
-                    self.create_directory_item(dir_name=virtual_root_data["name"], dir_data=virtual_root_data,
-                                               parent_indent=0, current_depth=0, is_virtual_root=True))
+                # 先用线程池并行扫描所有尚未加载的展开目录
+                self.tree_model.load_directories([str(self.current_directory), *self.expanded_dirs])
+                row_specs = self._build_rows()
             except Exception as e:
-                self.file_explorer_list.controls.append(
-                    ft.Container(content=ft.Text(f"读取错误: {str(e)}", size=12, color="#ef4444"),
-                                 padding=20, alignment=ft.alignment.center))
-            self.main_page.update()
-
-        (self.main_page.page.run_thread if self.main_page.page else lambda f: f())(update_ui)
-
-    def get_directory_structure(self, directory):
-        directory, structure = directory.resolve(), {"name": directory.name, "path": directory, "files": [],
-                                                     "subdirs": {}}
-        try:
-            items = [item for item in directory.iterdir() if
-                     not item.name.startswith('.') and item.name != '__pycache__']
-            for item in items:
-                if item.is_file():
-                    stat = item.stat()
-                    structure["files"].append({"path": item.resolve(), "name": item.name, "size": stat.st_size,
-                                               "modified": datetime.datetime.fromtimestamp(stat.st_mtime),
-                                               "extension": item.suffix.lower(), "is_dir": False})
-                else:
-                    structure["subdirs"][item.name] = {"name": item.name, "path": item.resolve(), "files": [],
-                                                       "subdirs": {}, "is_dir": True}
-        except Exception as e:
-            print(f"读取目录错误 {directory}: {e}")
-        structure["files"].sort(key=lambda x: x["name"]);
-        structure["subdirs"] = dict(sorted(structure["subdirs"].items()))
-        return structure
-
-    def _render_directory_contents(self, dir_data, parent_column, current_indent, current_depth):
-        current_path, next_indent = dir_data["path"], current_indent + 10
-        should_render_content = (current_depth == 0) or (str(current_path) in self.expanded_dirs)
-        if should_render_content:
-            self.add_new_buttons_to_column(current_path, next_indent, parent_column)
-            for file_info in dir_data["files"]:
-                if file_info["path"] in self.items_to_remove:
-                    parent_column.controls.append(self.create_remove_confirmation(file_info, next_indent))
-                else:
-                    parent_column.controls.append(self.create_file_item(file_info, next_indent))
-            for subdir_name, subdir_data in dir_data["subdirs"].items():
-                if str(subdir_data["path"]) in self.expanded_dirs: subdir_data = self.get_directory_structure(
-                    subdir_data["path"])
-                subdir_path_resolved = subdir_data["path"].resolve()
-                if subdir_path_resolved in self.items_to_remove:
-                    parent_column.controls.append(
-                        self.create_remove_confirmation({"path": subdir_path_resolved, "name": subdir_name},
-                                                        next_indent))
-                else:
-                    parent_column.controls.append(
-                        self.create_directory_item(subdir_name, subdir_data, next_indent, current_depth + 1))
+                error_text = f"读取错误: {str(e)}"
+                row_specs = [(("error",), error_text, lambda: ft.Container(
+                    content=ft.Text(error_text, size=12, color="#ef4444"), alignment=ft.alignment.center))]
+            # 扫描期间根目录已切换，结果作废，由新的刷新负责渲染
+            if self.tree_model.is_cancelled(generation):
+                return
+            self._row_specs = row_specs
+            self._render_window()
+        self._snapshot_debouncer.poke()
+
+    def _render_window(self):
+        """只为可视区域附近的行创建控件，其余行由上下两个占位控件撑开滚动高度"""
+        specs = self._row_specs
+        first, last = self._visible_range()
+        first = max(0, first - TREE_OVERSCAN_ROWS)
+        last = min(len(specs), last + TREE_OVERSCAN_ROWS)
+
+        rows, row_cache = [], {}
+        for key, signature, factory in specs[first:last]:
+            # 特征值未变化时复用上次渲染的行控件
+            cached = self._row_cache.get(key)
+            if cached is not None and cached[0] == signature:
+                control = cached[1]
+            else:
+                control = factory()
+                control.key, control.height = "|".join(key), TREE_ROW_HEIGHT
+            row_cache[key] = (signature, control)
+            rows.append(control)
+        self._row_cache = row_cache
+        self._window = (first, last)
+
+        top_height, bottom_height = first * TREE_ROW_HEIGHT, (len(specs) - last) * TREE_ROW_HEIGHT
+        spacers_changed = (self._top_spacer.height, self._bottom_spacer.height) != (top_height, bottom_height)
+        self._top_spacer.height, self._bottom_spacer.height = top_height, bottom_height
+        controls = [self._top_spacer, *rows, self._bottom_spacer]
+        # 仅在行集合或占位高度变化时更新列表，未变化的行沿用原控件，不会被重新发送
+        if spacers_changed or [id(c) for c in controls] != [id(c) for c in self.file_explorer_list.controls]:
+            self.file_explorer_list.controls = controls
+            self.ui.mark_dirty(self.file_explorer_list)
+
+    def _visible_range(self):
+        first = int(self._scroll_offset // TREE_ROW_HEIGHT)
+        return first, first + int(self._viewport_height // TREE_ROW_HEIGHT) + 1
+
+    def _on_tree_scroll(self, e):
+        self._scroll_offset = max(0.0, e.pixels or 0.0)
+        if e.viewport_dimension:
+            self._viewport_height = e.viewport_dimension
+        first, last = self._visible_range()
+        window_first, window_last = self._window
+        # 可视区域仍在已创建的行范围内时无需重新渲染
+        if window_first <= first and (last <= window_last or window_last >= len(self._row_specs)):
+            return
+        with self._render_lock:
+            self._render_window()
+
+    def _build_rows(self):
+        """将文件树按展开状态展平为行描述列表: (row_key, signature, factory)"""
+        rows = []
+        self._modified_keys = {str(path) for path in self.modified_files}
+        self._remove_keys = {str(path) for path in self.items_to_remove}
+        self._renaming_key = str(self.renaming_path) if self.renaming_path else None
+        root = self.tree_model.load_directory(self.current_directory)
+        if root is None:
+            raise FileNotFoundError(str(self.current_directory))
+        if self.switching_dir:
+            rows.append((("switch",), None, self._create_switch_directory_input))
+        else:
+            has_parent = self.current_directory.parent.resolve() != self.current_directory
+            rows.append((("root", root.key), (self.config_mode, has_parent, self.clipboard),
+                         lambda: self.create_directory_item(root, 0, DIR_BG_COLORS[0], is_virtual_root=True)))
+        self._add_directory_rows(root, 10, 0, rows)
+        return rows
+
+    def _add_directory_rows(self, node, indent, depth, rows):
+        bg_color = DIR_BG_COLORS[min(depth, len(DIR_BG_COLORS) - 1)]
+        if not any([self.renaming_path, self.config_mode, self.switching_dir, self.current_operation]):
+            rows.append((("new", node.key), (indent, bg_color),
+                         lambda: self.create_new_buttons_row(node.path, indent, bg_color)))
+        files, dirs = self.tree_model.sorted_children(node)
+        for child in files:
+            self._add_entry_row(child, indent, bg_color, rows)
+        sub_bg_color = DIR_BG_COLORS[min(depth + 1, len(DIR_BG_COLORS) - 1)]
+        for child in dirs:
+            if self._add_entry_row(child, indent, sub_bg_color, rows):
+                loaded = self.tree_model.load_directory(child.key)
+                if loaded is not None:
+                    self._add_directory_rows(loaded, indent + 10, depth + 1, rows)
+
+    def _add_entry_row(self, node, indent, bg_color, rows):
+        """添加文件或目录行，返回该目录是否需要继续展开"""
+        key = node.key
+        if key in self._remove_keys:
+            rows.append((("remove", key), (node.name, indent),
+                         lambda: self.create_remove_confirmation(node.to_info(), indent)))
+        elif key == self._renaming_key:
+            rows.append((("rename", key), (node.name, indent),
+                         lambda: self.create_rename_input_row(node.to_info(), indent)))
+        elif node.is_dir:
+            expanded = key in self.expanded_dirs
+            rows.append((("dir", key), (node.name, indent, bg_color, expanded, self.config_mode, self.clipboard),
+                         lambda: self.create_directory_item(node, indent, bg_color)))
+            return expanded
+        else:
+            signature = (node.signature(), indent, bg_color, self.config_mode, key in self._modified_keys)
+            rows.append((("file", key), signature, lambda: self.create_file_item(node.to_info(), indent, bg_color)))
+        return False
 
     def format_size(self, size):
         for unit in ['B', 'K', 'M']:
@@ -624,12 +839,23 @@ class FileExplorer:
         return color_map.get(folder_name.lower(), COLOR_DIR_NORMAL)
 
     def show_snackbar(self, message):
-        def show():
-            self.main_page.snack_bar = ft.SnackBar(content=ft.Text(message))
-            self.main_page.snack_bar.open = True;
-            self.main_page.update()
-
-        (self.main_page.page.run_thread if self.main_page.page else lambda f: f())(show)
+        self.main_page.snack_bar = ft.SnackBar(content=ft.Text(message))
+        self.main_page.snack_bar.open = True
+        self.ui.request_page_update()
+
+    def close(self):
+        """应用关闭时调用：停止后台线程，并立即保存去抖中尚未写入的快照和路径索引"""
+        self._stop()
+        self.save_snapshot()
+        self.path_index.save()
+
+    def _stop(self):
+        if self.observer: self.observer.stop()
+        self.event_queue.stop()
+        self._snapshot_debouncer.stop()
+        self.file_ops.shutdown()
+        self.path_index.stop()
+        self.workspace_index.stop()
 
     def __del__(self):
-        if self.observer: self.observer.stop(); self.observer.join()
\ No newline at end of file
+        self._stop()
\ No newline at end of file
@@ -4,27 +4,53 @@
 import flet as ft
 from .file_explorer import FileExplorer
 from .file_editor import FileViewer, FileEditor as SimpleFileEditor
+from .file_tree_model import FileNode
+from .quick_open import QuickOpenPalette
+from .content_search import iter_workspace_files
+from .search_panel import SearchPanel
+import json
+import time
 from pathlib import Path
+from .ui_scheduler import FRAME_INTERVAL, get_ui_scheduler
+
+# 面板宽度的持久化文件（按占窗口宽度的比例保存，窗口大小变化后保持用户调整的比例）
+LAYOUT_FILE = Path("./.file_manager_layout.json")
+# 默认的文件浏览器 / 查看器宽度比例
+DEFAULT_EXPLORER_RATIO, DEFAULT_VIEWER_RATIO = 0.25, 0.35
+# 面板最小宽度
+MIN_PANE_WIDTH = 150
 
 
 class FileManager:
     """文件管理器 - 实现三面板（Explorer | Viewer | Editor）布局"""
 
-    def __init__(self, main_page: ft.Page):
+    def __init__(self, main_page: ft.Page, on_attach_file=None):
         self.main_page = main_page
+        self.ui = get_ui_scheduler(main_page)
+        self.on_attach_file = on_attach_file  # on_attach_file(Path) -> bool，附加到对话
 
         # 实例化组件
-        self.file_explorer = FileExplorer(main_page, on_file_select=self.on_file_selected)
-        self.file_viewer = FileViewer(main_page)
+        attach = self.attach_to_chat if on_attach_file else None
+        self.file_explorer = FileExplorer(main_page, on_file_select=self.on_file_selected, on_attach=attach)
+        self.file_viewer = FileViewer(main_page, on_attach=attach)
         self.file_editor = SimpleFileEditor(main_page, on_content_change=self.handle_editor_content_update)
+        # 标记上次会话遗留的未保存文件
+        if self.file_editor.recovered_files:
+            self.file_explorer.mark_files_modified(self.file_editor.recovered_files)
+        self.quick_open = QuickOpenPalette(main_page, self.file_explorer.path_index, self.open_path)
+        self.search_panel = SearchPanel(main_page, self._search_scope, self.open_path)
 
         # 状态管理
         self.explorer_visible = self.viewer_visible = self.editor_visible = True
-        initial_width = max(900, main_page.width)
-        self.explorer_width = max(150, initial_width * 0.25)
-        self.viewer_width = max(150, initial_width * 0.35)
+        self.explorer_ratio, self.viewer_ratio = self._load_layout()
+        initial_width = max(900, main_page.width or 0)
+        self.explorer_width = max(MIN_PANE_WIDTH, initial_width * self.explorer_ratio)
+        self.viewer_width = max(MIN_PANE_WIDTH, initial_width * self.viewer_ratio)
         self.is_dragging = False
         self.active_splitter = None
+        # 拖拽期间每帧最多向前端同步一次宽度，其余只更新本地值，结束时再提交最终宽度
+        self._drag_dirty = set()
+        self._last_drag_push = 0.0
         self._refresh_in_progress = False
 
         # 创建UI控件
@@ -45,11 +71,11 @@ class FileManager:
         """创建通用容器"""
         return ft.Container(content=content, padding=0, border_radius=0)
 
-    def handle_editor_content_update(self, content: str, file_path: Path):
-        """处理编辑器内容更新并同步到查看器"""
+    def handle_editor_content_update(self, snapshot, file_path: Path):
+        """处理编辑器内容更新（TextSnapshot）并同步到查看器"""
         if self.viewer_visible:
-            self.file_viewer.set_content_for_realtime_update(content, file_path)
-        if self.file_editor.is_dirty:
+            self.file_viewer.set_content_for_realtime_update(snapshot, file_path, self.file_editor.content_version)
+        if self.file_editor.is_dirty and not self.file_explorer.is_file_modified(file_path):
             self.file_explorer.set_file_modified(file_path, True)
 
     def _handle_page_resize(self, e: ft.ControlEvent):
@@ -57,10 +83,30 @@ class FileManager:
         if self.main_page.width > 0 and not self.is_dragging:
             total_width = self.main_page.width
             if total_width > 400:
-                self.explorer_width = max(150, total_width * 0.25)
-                self.viewer_width = max(150, total_width * 0.35)
+                self.explorer_width = max(MIN_PANE_WIDTH, total_width * self.explorer_ratio)
+                self.viewer_width = max(MIN_PANE_WIDTH, total_width * self.viewer_ratio)
             self.update_layout()
 
+    @staticmethod
+    def _load_layout():
+        """读取上次保存的面板宽度比例，没有或无效时使用默认值"""
+        try:
+            with open(LAYOUT_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            ratios = float(data["explorer_ratio"]), float(data["viewer_ratio"])
+            if all(0 < ratio < 1 for ratio in ratios) and sum(ratios) < 1:
+                return ratios
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return DEFAULT_EXPLORER_RATIO, DEFAULT_VIEWER_RATIO
+
+    def _save_layout(self):
+        try:
+            with open(LAYOUT_FILE, "w", encoding="utf-8") as f:
+                json.dump({"explorer_ratio": self.explorer_ratio, "viewer_ratio": self.viewer_ratio}, f)
+        except OSError as e:
+            print(f"保存面板宽度失败: {e}")
+
     def on_file_selected(self, file_info):
         """文件选择回调"""
         self.file_viewer.open_file(file_info)
@@ -69,6 +115,37 @@ class FileManager:
             self.explorer_visible = self.editor_visible = True
         self.update_layout()
 
+    def open_path(self, path: Path, line: int = None):
+        """按路径打开文件（快速打开、在文件中查找等入口），line 为要跳转到的行号（1 起）"""
+        try:
+            stat = path.stat()
+        except OSError:
+            self.file_explorer.show_snackbar(f"文件不存在: {path.name}")
+            return
+        self.on_file_selected(FileNode(path, False, stat.st_size, stat.st_mtime).to_info())
+        if line:
+            self.file_viewer.goto_line(line)
+
+    def attach_to_chat(self, path: Path):
+        """把文件附加到当前对话，发送消息时按 token 预算选取相关片段"""
+        if self.on_attach_file(Path(path)):
+            self.file_explorer.show_snackbar(f"已添加到对话: {Path(path).name}")
+        else:
+            self.file_explorer.show_snackbar(f"已在对话附件中: {Path(path).name}")
+
+    def show_quick_open(self, e=None):
+        self.quick_open.show()
+
+    def show_search_panel(self, e=None):
+        self.search_panel.show()
+
+    def _search_scope(self):
+        """返回 (根目录, 待搜索文件)：路径索引就绪时直接使用，否则边遍历边搜索"""
+        explorer = self.file_explorer
+        if explorer.path_index.is_ready:
+            return explorer.current_directory, explorer.path_index.file_paths()
+        return explorer.current_directory, iter_workspace_files(explorer.current_directory, explorer.ignore_rules)
+
     def _create_layout_controls(self):
         """创建布局控制按钮"""
         btn_style = ft.ButtonStyle(padding=ft.padding.all(6))
@@ -80,7 +157,11 @@ class FileManager:
             ft.IconButton(icon=ft.Icons.VISIBILITY, icon_size=18, tooltip="查看器 (只读)",
                           on_click=lambda e: self._toggle_panel('viewer_visible'), style=btn_style),
             ft.IconButton(icon=ft.Icons.EDIT, icon_size=18, tooltip="编辑器 (可编辑)",
-                          on_click=lambda e: self._toggle_panel('editor_visible'), style=btn_style)
+                          on_click=lambda e: self._toggle_panel('editor_visible'), style=btn_style),
+            ft.IconButton(icon=ft.Icons.SEARCH, icon_size=18, tooltip="快速打开 (Ctrl+P)",
+                          on_click=self.show_quick_open, style=btn_style),
+            ft.IconButton(icon=ft.Icons.FIND_IN_PAGE, icon_size=18, tooltip="在文件中查找 (Ctrl+Shift+F)",
+                          on_click=self.show_search_panel, style=btn_style)
         ]
         return ft.Row(buttons, spacing=2)
 
@@ -109,18 +190,17 @@ class FileManager:
                 (splitter_id == 2 and (not self.editor_visible or not (self.viewer_visible or self.explorer_visible))):
             return
 
+        # 拖拽光标由 GestureDetector.mouse_cursor 提供，这里只需刷新分割条本身
         self.is_dragging = True
         self.active_splitter = e.control
         self.active_splitter.content.bgcolor = "#3b82f6"
-        self.active_splitter.content.update()
-        self.main_page.cursor = ft.MouseCursor.RESIZE_LEFT_RIGHT
-        self.main_page.update()
+        self.ui.mark_dirty(self.active_splitter.content)
 
     def on_splitter_pan_update(self, e: ft.DragUpdateEvent):
-        """拖拽更新 - 调整面板宽度"""
+        """拖拽更新 - 调整面板宽度（本地值每个事件都更新，同步到前端按帧限频）"""
         if not self.is_dragging: return
 
-        splitter_id, delta, min_pane_width = e.control.data, e.delta_x, 150
+        splitter_id, delta, min_pane_width = e.control.data, e.delta_x, MIN_PANE_WIDTH
         total_available_width = self.main_page.width - 16
 
         if splitter_id == 1 and self.explorer_visible and self.viewer_visible:
@@ -128,7 +208,7 @@ class FileManager:
             if min_pane_width <= new_width < total_available_width - min_pane_width * 2 - 12:
                 self.explorer_width = new_width
                 self.explorer_container.width = new_width
-                self.explorer_container.update()
+                self._drag_dirty.add(self.explorer_container)
 
         elif splitter_id == 2:
             if self.viewer_visible:
@@ -137,22 +217,34 @@ class FileManager:
                 if min_pane_width <= new_width < total_available_width - left_width - 6 - min_pane_width:
                     self.viewer_width = new_width
                     self.viewer_container.width = new_width
-                    self.viewer_container.update()
+                    self._drag_dirty.add(self.viewer_container)
             elif self.explorer_visible and not self.viewer_visible:
                 new_width = self.explorer_width + delta
                 if min_pane_width <= new_width < total_available_width - 6 - min_pane_width:
                     self.explorer_width = new_width
                     self.explorer_container.width = new_width
-                    self.explorer_container.update()
+                    self._drag_dirty.add(self.explorer_container)
+
+        now = time.monotonic()
+        if self._drag_dirty and now - self._last_drag_push >= FRAME_INTERVAL:
+            self._last_drag_push = now
+            self._push_drag_widths()
+
+    def _push_drag_widths(self):
+        self.ui.mark_dirty(*self._drag_dirty)
+        self._drag_dirty.clear()
 
     def on_splitter_pan_end(self, e: ft.DragEndEvent):
-        """结束拖拽"""
+        """结束拖拽：提交最后一帧内尚未同步的宽度，并保存宽度比例"""
         self.is_dragging = False
         if self.active_splitter:
             self.active_splitter.content.bgcolor = "#4b5563"
-            self.active_splitter.content.update()
-        self.main_page.cursor = ft.MouseCursor.BASIC
-        self.main_page.update()
+            self.ui.mark_dirty(self.active_splitter.content)
+        self._push_drag_widths()
+        if self.main_page.width:
+            self.explorer_ratio = self.explorer_width / self.main_page.width
+            self.viewer_ratio = self.viewer_width / self.main_page.width
+            self._save_layout()
 
     def _update_control_states(self):
         """更新按钮和面板状态"""
@@ -221,12 +313,7 @@ class FileManager:
             ))
 
         self.content_row.controls = new_controls
-        try:
-            self.content_row.update()
-            self.layout_controls.update()
-            self.main_page.update()
-        except Exception:
-            pass
+        self.ui.mark_dirty(self.content_row, self.layout_controls)
 
     def create_main_container(self):
         """创建主容器"""
@@ -259,4 +346,9 @@ class FileManager:
         was_dirty = self.file_editor.is_dirty
         self.file_editor.save_current_file()
         if was_dirty and not self.file_editor.is_dirty and self.file_editor.current_file:
-            self.file_explorer.set_file_modified(self.file_editor.current_file, False)
\ No newline at end of file
+            self.file_explorer.set_file_modified(self.file_editor.current_file, False)
+
+    def close(self):
+        """应用关闭时调用：立即写入去抖中尚未同步的恢复文件、文件树快照和路径索引"""
+        self.file_editor.dirty_files_cache.close()
+        self.file_explorer.close()
\ No newline at end of file
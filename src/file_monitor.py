@@ -1,16 +1,285 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
+from .ignore_rules import IGNORE_FILE_NAMES
 
+# 最多监听的目录数量，避免耗尽系统的 inotify watch 配额
+MAX_WATCHED_DIRS = 8000
+# 事件合并队列：最多逐条记录的路径数，超过后改为按目录重新扫描
+COALESCE_MAX_PENDING = 2000
+# 事件静默多久后应用（秒）
+COALESCE_QUIET_PERIOD = 0.3
+# 持续有事件时最长推迟（秒）
+COALESCE_MAX_DELAY = 1.0
+# 两批之间的最小间隔（秒），限制刷新频率
+COALESCE_MIN_INTERVAL = 0.5
 
-class FileChangeHandler(FileSystemEventHandler):
-    """文件系统变化处理器"""
 
-    def __init__(self, file_explorer):
-        self.file_explorer = file_explorer
+class DirectoryWatcher(FileSystemEventHandler):
+    """
+    按目录（非递归）监听工作区，跳过被忽略的子树。
+    新建/删除/移动目录时同步增减监听，过滤后的事件以
+    on_event(event_type, src_path, dest_path, is_directory) 回调。
+    """
+
+    def __init__(self, root: Path, on_event, ignore_rules=None, max_watches: int = MAX_WATCHED_DIRS):
+        self.root = Path(root).resolve()
+        self.on_event = on_event
+        self.ignore_rules = ignore_rules
+        self.max_watches = max_watches
+        self.observer = None
+        self._watches = {}  # str(dir) -> ObservedWatch
+        self._lock = threading.Lock()
+        self._limit_reported = False
+
+    @property
+    def watch_count(self) -> int:
+        return len(self._watches)
+
+    def start(self):
+        self.observer = Observer()
+        self.observer.start()
+        # 大型工作区的首次遍历在后台进行
+        threading.Thread(target=self._watch_tree, args=(str(self.root),), daemon=True).start()
+
+    def stop(self):
+        if self.observer:
+            self.observer.stop()
+            self.observer.join()
+            self.observer = None
+        with self._lock:
+            self._watches.clear()
+
+    def _is_ignored(self, path: str, is_dir: bool) -> bool:
+        return bool(self.ignore_rules) and self.ignore_rules.is_ignored(path, is_dir)
+
+    def _watch_tree(self, top: str):
+        """为 top 及其未被忽略的子目录添加监听"""
+        stack = [top]
+        while stack:
+            directory = stack.pop()
+            if not self._add_watch(directory):
+                return
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False) and not self._is_ignored(entry.path, True):
+                                stack.append(entry.path)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+    def _add_watch(self, directory: str) -> bool:
+        """添加单个目录监听，达到上限时返回 False"""
+        observer = self.observer
+        if observer is None:
+            return False
+        with self._lock:
+            if directory in self._watches:
+                return True
+            if len(self._watches) >= self.max_watches:
+                if not self._limit_reported:
+                    self._limit_reported = True
+                    print(f"监听目录数已达上限 {self.max_watches}，其余目录将不会自动刷新")
+                return False
+            try:
+                self._watches[directory] = observer.schedule(self, directory, recursive=False)
+            except Exception as e:
+                print(f"监听目录失败 {directory}: {e}")
+        return True
+
+    def _remove_watches(self, top: str):
+        """移除 top 及其所有子目录的监听"""
+        observer = self.observer
+        prefix = top.rstrip("/\\") + os.sep
+        with self._lock:
+            for directory in [d for d in self._watches if d == top or d.startswith(prefix)]:
+                watch = self._watches.pop(directory)
+                if observer is not None:
+                    try:
+                        observer.unschedule(watch)
+                    except Exception:
+                        pass
 
     def on_any_event(self, event):
-        """监听所有文件系统事件"""
-        if not event.is_directory:
-            self.file_explorer.schedule_refresh()
\ No newline at end of file
+        event_type, src_path = event.event_type, event.src_path
+        dest_path = getattr(event, "dest_path", None) or None
+        is_directory = event.is_directory
+
+        # 忽略规则文件本身通常也被忽略，变化时清除规则缓存并照常通知
+        if self.ignore_rules and (os.path.basename(src_path) in IGNORE_FILE_NAMES or (
+                dest_path and os.path.basename(dest_path) in IGNORE_FILE_NAMES)):
+            self.ignore_rules.reload()
+            self.on_event(event_type, src_path, dest_path, is_directory)
+            return
+
+        src_ignored = self._is_ignored(src_path, is_directory)
+        if event_type == "moved":
+            dest_ignored = self._is_ignored(dest_path, is_directory)
+            if is_directory:
+                self._remove_watches(src_path)
+                if not dest_ignored:
+                    self._watch_tree(dest_path)
+            # 移入或移出忽略范围时按新建/删除处理
+            if src_ignored and dest_ignored:
+                return
+            if src_ignored:
+                event_type, src_path, dest_path = "created", dest_path, None
+            elif dest_ignored:
+                event_type, dest_path = "deleted", None
+        else:
+            if src_ignored:
+                return
+            if is_directory and event_type == "created":
+                self._watch_tree(src_path)
+            elif is_directory and event_type == "deleted":
+                self._remove_watches(src_path)
+
+        self.on_event(event_type, src_path, dest_path, is_directory)
+
+
+class EventCoalescer:
+    """
+    文件系统事件合并队列。
+    按路径去重并合并同一路径上的 新建/修改/删除 序列，由单个后台线程
+    在事件静默后按限定频率批量应用；短时间内事件过多时不再逐条记录，
+    改为记录受影响的目录，在下一批中重新扫描这些目录。
+    """
+
+    def __init__(self, apply_batch, rescan_directories, max_pending: int = COALESCE_MAX_PENDING,
+                 quiet_period: float = COALESCE_QUIET_PERIOD, max_delay: float = COALESCE_MAX_DELAY,
+                 min_interval: float = COALESCE_MIN_INTERVAL):
+        self.apply_batch = apply_batch  # apply_batch([(event_type, path, None, is_directory), ...])
+        self.rescan_directories = rescan_directories  # rescan_directories({str(dir), ...})
+        self.max_pending = max_pending
+        self.quiet_period = quiet_period
+        self.max_delay = max_delay
+        self.min_interval = min_interval
+
+        self._pending = OrderedDict()  # path -> [event_type, is_directory]
+        self._rescan_dirs = set()
+        self._first_event_at = None
+        self._last_event_at = None
+        self._last_batch_at = 0.0
+        self._condition = threading.Condition()
+        self._stopped = False
+
+        # 统计信息
+        self.events_received = 0
+        self.events_coalesced = 0
+        self.batches_applied = 0
+        self.overflows = 0
+
+        self._thread = threading.Thread(target=self._run, name="fs-event-coalescer", daemon=True)
+        self._thread.start()
+
+    def push(self, event_type: str, src_path: str, dest_path: str = None, is_directory: bool = False):
+        """加入一个事件；移动事件拆分为源路径删除和目标路径新建"""
+        if event_type == "moved":
+            changes = [("deleted", src_path)] + ([("created", dest_path)] if dest_path else [])
+        elif event_type in ("created", "deleted", "modified"):
+            changes = [(event_type, src_path)]
+        elif event_type == "closed":
+            changes = [("modified", src_path)]
+        else:
+            return
+
+        with self._condition:
+            now = time.monotonic()
+            for kind, path in changes:
+                self.events_received += 1
+                if self._rescan_dirs:
+                    self._add_rescan_dir(path)
+                    continue
+                self._merge(path, kind, is_directory)
+                if len(self._pending) > self.max_pending:
+                    self._overflow()
+            if self._first_event_at is None:
+                self._first_event_at = now
+            self._last_event_at = now
+            self._condition.notify()
+
+    def clear(self):
+        """丢弃所有挂起的事件（例如切换根目录时）"""
+        with self._condition:
+            self._pending.clear()
+            self._rescan_dirs.clear()
+            self._first_event_at = self._last_event_at = None
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def get_stats(self) -> dict:
+        with self._condition:
+            return {
+                "events_received": self.events_received,
+                "events_coalesced": self.events_coalesced,
+                "batches_applied": self.batches_applied,
+                "overflows": self.overflows,
+                "pending": len(self._pending) + len(self._rescan_dirs),
+            }
+
+    def _merge(self, path: str, kind: str, is_directory: bool):
+        previous = self._pending.pop(path, None)
+        if previous is not None:
+            self.events_coalesced += 1
+            previous_kind = previous[0]
+            if previous_kind == "created":
+                if kind == "deleted":
+                    # 新建后又删除，相当于什么都没发生
+                    return
+                kind = "created"
+            elif previous_kind == "deleted" and kind != "deleted":
+                # 删除后重新出现，按修改处理（类型可能改变）
+                kind = "modified"
+        self._pending[path] = [kind, is_directory]
+
+    def _overflow(self):
+        """逐条事件过多：改为记录受影响的目录，下一批统一重新扫描"""
+        self.overflows += 1
+        for path in self._pending:
+            self._add_rescan_dir(path)
+        self._pending.clear()
+
+    def _add_rescan_dir(self, path: str):
+        self._rescan_dirs.add(os.path.dirname(path.rstrip("/\\")))
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped and self._first_event_at is None:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                now = time.monotonic()
+                # 等待事件静默，但连续事件流最长只推迟 max_delay；两批之间至少间隔 min_interval
+                due = min(self._last_event_at + self.quiet_period, self._first_event_at + self.max_delay)
+                due = max(due, self._last_batch_at + self.min_interval)
+                if now < due:
+                    self._condition.wait(due - now)
+                    continue
+                events = [(kind, path, None, is_directory) for path, (kind, is_directory) in self._pending.items()]
+                rescan_dirs = set(self._rescan_dirs)
+                self._pending.clear()
+                self._rescan_dirs.clear()
+                self._first_event_at = self._last_event_at = None
+                self._last_batch_at = now
+                self.batches_applied += 1
+            try:
+                if events:
+                    self.apply_batch(events)
+                if rescan_dirs:
+                    self.rescan_directories(rescan_dirs)
+            except Exception as e:
+                print(f"应用文件系统事件失败: {e}")
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import errno
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# 分块复制时每次读写的字节数；不超过该大小的文件整体复制
+COPY_CHUNK_SIZE = 1024 * 1024
+# 进度回调的最小间隔（秒）
+PROGRESS_INTERVAL = 0.1
+# 操作按提交顺序由单个后台线程依次执行，避免同一路径上的操作相互干扰
+FILE_OPERATION_WORKERS = 1
+
+
+class OperationCancelled(Exception):
+    """文件操作被取消"""
+
+
+class FileOperation:
+    """
+    单个后台文件操作（copy / move / delete）及其进度。
+    完成后 delta 为要应用到文件树的事件 [(event_type, path, None, is_directory), ...]；
+    失败或取消且磁盘上留下部分结果时，rescan_dirs 为需要重新扫描的目录。
+    """
+
+    KIND_LABELS = {"copy": "复制", "move": "移动", "delete": "删除"}
+
+    def __init__(self, kind: str, source: Path, destination: Path = None):
+        self.kind = kind
+        self.source = Path(source)
+        self.destination = Path(destination) if destination else None
+        self.status = "pending"  # pending / running / done / cancelled / failed
+        self.error = None
+        self.total_bytes = self.done_bytes = 0
+        self.total_items = self.done_items = 0
+        self.delta = []
+        self.rescan_dirs = set()
+        self._cancel_event = threading.Event()
+        self._cancellable = True
+
+    @property
+    def label(self) -> str:
+        return f"{self.KIND_LABELS[self.kind]} {self.source.name}"
+
+    @property
+    def progress(self) -> float:
+        if self.total_bytes:
+            return min(1.0, self.done_bytes / self.total_bytes)
+        if self.total_items:
+            return min(1.0, self.done_items / self.total_items)
+        return 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "cancelled", "failed")
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def check_cancelled(self):
+        if self._cancellable and self._cancel_event.is_set():
+            raise OperationCancelled()
+
+    def touches(self, path: str) -> bool:
+        """path 是否位于本操作的源或目标路径之下（包括其本身）"""
+        for root in (self.source, self.destination):
+            if root is None:
+                continue
+            root = str(root)
+            if path == root or (path.startswith(root) and path[len(root)] in "/\\"):
+                return True
+        return False
+
+
+def unique_destination(destination: Path) -> Path:
+    """目标已存在时依次尝试 "名称 副本"、"名称 副本 2"……"""
+    if not destination.exists():
+        return destination
+    stem, suffix = (destination.stem, destination.suffix) if destination.is_file() else (destination.name, "")
+    for number in range(1, 10000):
+        name = f"{stem} 副本{suffix}" if number == 1 else f"{stem} 副本 {number}{suffix}"
+        candidate = destination.with_name(name)
+        if not candidate.exists():
+            return candidate
+    raise FileExistsError(str(destination))
+
+
+class FileOperationQueue:
+    """
+    后台文件操作队列。copy/move/delete 在后台线程中执行，大文件分块复制，
+    期间通过 on_progress(op) 报告进度（限频），可随时取消；
+    每个操作结束后调用一次 on_complete(op)，由调用方把 op.delta 作为一次增量应用到文件树。
+    """
+
+    def __init__(self, on_progress=None, on_complete=None, max_workers: int = FILE_OPERATION_WORKERS):
+        self.on_progress = on_progress
+        self.on_complete = on_complete
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="file-operation")
+        self._lock = threading.Lock()
+        self.operations = []  # 尚未结束的操作，按提交顺序
+
+    def copy(self, source: Path, destination: Path) -> FileOperation:
+        return self.submit(FileOperation("copy", source, destination))
+
+    def move(self, source: Path, destination: Path) -> FileOperation:
+        return self.submit(FileOperation("move", source, destination))
+
+    def delete(self, path: Path) -> FileOperation:
+        return self.submit(FileOperation("delete", path))
+
+    def submit(self, operation: FileOperation) -> FileOperation:
+        with self._lock:
+            self.operations.append(operation)
+        self._executor.submit(self._run, operation)
+        return operation
+
+    def cancel_all(self):
+        with self._lock:
+            for operation in self.operations:
+                operation.cancel()
+
+    def owns(self, path: str) -> bool:
+        """path 是否正被某个未结束的操作修改（这些路径上的文件系统事件由操作完成时的增量代替）"""
+        with self._lock:
+            return any(operation.touches(path) for operation in self.operations)
+
+    def shutdown(self):
+        self.cancel_all()
+        self._executor.shutdown(wait=False)
+
+    # ---------------- 执行 ----------------
+
+    def _run(self, operation: FileOperation):
+        operation.status = "running"
+        self._last_progress = 0.0
+        try:
+            operation.check_cancelled()
+            getattr(self, f"_run_{operation.kind}")(operation)
+            operation.status = "done"
+        except OperationCancelled:
+            operation.status = "cancelled"
+        except Exception as e:
+            operation.status, operation.error = "failed", e
+        finally:
+            with self._lock:
+                if operation in self.operations:
+                    self.operations.remove(operation)
+            if self.on_complete:
+                self.on_complete(operation)
+
+    def _report(self, operation: FileOperation, force: bool = False):
+        now = time.monotonic()
+        if self.on_progress and (force or now - self._last_progress >= PROGRESS_INTERVAL):
+            self._last_progress = now
+            self.on_progress(operation)
+
+    def _run_copy(self, operation: FileOperation):
+        source, destination = operation.source, operation.destination
+        if destination == source or str(destination).startswith(str(source) + os.sep):
+            raise ValueError("不能复制到自身或其子目录中")
+        if destination.exists():
+            raise FileExistsError(f"目标已存在: {destination.name}")
+        try:
+            self._copy_tree(operation, source, destination)
+        except BaseException:
+            # 取消或失败时删除已复制的部分
+            self._discard(destination)
+            raise
+        operation.delta = [("created", str(destination), None, destination.is_dir())]
+
+    def _run_move(self, operation: FileOperation):
+        source, destination = operation.source, operation.destination
+        if destination == source or str(destination).startswith(str(source) + os.sep):
+            raise ValueError("不能移动到自身或其子目录中")
+        if destination.exists():
+            raise FileExistsError(f"目标已存在: {destination.name}")
+        is_directory = source.is_dir()
+        try:
+            # 同一文件系统内直接重命名
+            os.rename(source, destination)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            try:
+                self._copy_tree(operation, source, destination)
+            except BaseException:
+                self._discard(destination)
+                raise
+            # 复制完成后不再响应取消，保证源和目标不会同时只剩一半
+            operation._cancellable = False
+            try:
+                self._delete_tree(operation, source)
+            except Exception:
+                operation.delta = [("created", str(destination), None, is_directory)]
+                operation.rescan_dirs.add(str(source.parent))
+                raise
+        operation.delta = [("deleted", str(source), None, is_directory),
+                           ("created", str(destination), None, is_directory)]
+
+    def _run_delete(self, operation: FileOperation):
+        source = operation.source
+        is_directory = source.is_dir() and not source.is_symlink()
+        try:
+            self._delete_tree(operation, source)
+        except BaseException:
+            # 部分删除：重新扫描仍然存在的目录
+            operation.rescan_dirs.add(str(source.parent))
+            if source.exists():
+                operation.rescan_dirs.add(str(source))
+            raise
+        operation.delta = [("deleted", str(source), None, is_directory)]
+
+    def _copy_tree(self, operation: FileOperation, source: Path, destination: Path):
+        """先统计总大小，再逐个复制（目录在前）；每个分块之间检查取消"""
+        if not source.is_dir() or source.is_symlink():
+            plan = [(str(source), str(destination), False, source.stat().st_size)]
+        else:
+            plan = [(str(source), str(destination), True, 0)]
+            for directory, dir_names, file_names in os.walk(source):
+                operation.check_cancelled()
+                target_directory = os.path.join(destination, os.path.relpath(directory, source))
+                for name in dir_names:
+                    plan.append((os.path.join(directory, name), os.path.join(target_directory, name), True, 0))
+                for name in file_names:
+                    path = os.path.join(directory, name)
+                    try:
+                        size = os.lstat(path).st_size
+                    except OSError:
+                        continue
+                    plan.append((path, os.path.join(target_directory, name), False, size))
+        operation.total_bytes = sum(entry[3] for entry in plan)
+        operation.total_items = len(plan)
+        self._report(operation, force=True)
+        for source_path, target_path, is_directory, size in plan:
+            operation.check_cancelled()
+            if is_directory:
+                os.makedirs(target_path, exist_ok=True)
+            elif size <= COPY_CHUNK_SIZE or os.path.islink(source_path):
+                shutil.copy2(source_path, target_path, follow_symlinks=False)
+                operation.done_bytes += size
+            else:
+                self._copy_file_chunked(operation, source_path, target_path)
+                shutil.copystat(source_path, target_path)
+            operation.done_items += 1
+            self._report(operation)
+        self._report(operation, force=True)
+
+    def _copy_file_chunked(self, operation: FileOperation, source_path: str, target_path: str):
+        buffer = bytearray(COPY_CHUNK_SIZE)
+        view = memoryview(buffer)
+        with open(source_path, "rb") as source_file, open(target_path, "wb") as target_file:
+            while True:
+                operation.check_cancelled()
+                count = source_file.readinto(buffer)
+                if not count:
+                    break
+                target_file.write(view[:count])
+                operation.done_bytes += count
+                self._report(operation)
+
+    def _delete_tree(self, operation: FileOperation, path: Path):
+        """自底向上逐个删除，每个条目之间检查取消"""
+        if not path.is_dir() or path.is_symlink():
+            operation.total_items = 1
+            path.unlink()
+            operation.done_items = 1
+            return
+        entries = []
+        for directory, dir_names, file_names in os.walk(path, topdown=False):
+            operation.check_cancelled()
+            entries.extend((os.path.join(directory, name), False) for name in file_names)
+            # 指向目录的符号链接出现在 dir_names 中，按文件删除
+            entries.extend((os.path.join(directory, name), not os.path.islink(os.path.join(directory, name)))
+                           for name in dir_names)
+        operation.total_items = len(entries) + 1
+        self._report(operation, force=True)
+        for entry_path, is_directory in entries:
+            operation.check_cancelled()
+            if is_directory:
+                os.rmdir(entry_path)
+            else:
+                os.unlink(entry_path)
+            operation.done_items += 1
+            self._report(operation)
+        os.rmdir(path)
+        operation.done_items += 1
+
+    @staticmethod
+    def _discard(path: Path):
+        try:
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path)
+            elif path.exists() or path.is_symlink():
+                path.unlink()
+        except OSError:
+            pass
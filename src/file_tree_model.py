@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import datetime
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# 并行扫描展开目录的线程数
+SCAN_MAX_WORKERS = 4
+# 扫描时每处理多少个条目检查一次是否已取消
+SCAN_CANCEL_CHECK_INTERVAL = 1024
+# 校验快照期间有文件系统事件到达时，最多重新扫描的次数
+VALIDATE_MAX_ATTEMPTS = 3
+
+
+class FileNode:
+    """文件树中的单个节点（文件或目录）"""
+
+    __slots__ = ("key", "_path", "name", "is_dir", "size", "mtime", "extension", "children")
+
+    def __init__(self, path, is_dir: bool, size: int = 0, mtime: float = 0.0, name: str = None):
+        # 大目录扫描时 Path 对象的构造开销显著，这里只保存字符串，按需创建
+        self.key = str(path)
+        self._path = path if isinstance(path, Path) else None
+        self.name = name or os.path.basename(self.key) or self.key
+        self.is_dir = is_dir
+        self.size = size
+        self.mtime = mtime
+        self.extension = "" if is_dir else os.path.splitext(self.name)[1].lower()
+        # 目录的子节点: name -> FileNode；None 表示尚未扫描
+        self.children = None
+
+    @property
+    def path(self) -> Path:
+        if self._path is None:
+            self._path = Path(self.key)
+        return self._path
+
+    @property
+    def modified(self):
+        return datetime.datetime.fromtimestamp(self.mtime) if self.mtime else None
+
+    @property
+    def loaded(self) -> bool:
+        return self.children is not None
+
+    def signature(self):
+        """用于判断行是否需要重新渲染的特征值"""
+        return self.name, self.is_dir, self.size, self.mtime
+
+    def to_info(self) -> dict:
+        """转换为组件间传递的文件信息字典"""
+        return {"path": self.path, "name": self.name, "size": self.size, "modified": self.modified,
+                "extension": self.extension, "is_dir": self.is_dir}
+
+
+def _default_ignored(name: str, is_dir: bool) -> bool:
+    return name.startswith('.') or name == '__pycache__'
+
+
+def scan_directory(directory: Path, ignore_rules=None, cancelled=None):
+    """
+    扫描单层目录，返回子节点列表（跳过被忽略的条目）。
+    基于 os.scandir，类型判断使用 DirEntry 缓存的信息；cancelled() 为真时中止并返回 None。
+    """
+    is_ignored = ignore_rules.child_matcher(directory) if ignore_rules else _default_ignored
+    nodes = []
+    try:
+        with os.scandir(directory) as entries:
+            for count, entry in enumerate(entries):
+                if cancelled is not None and count % SCAN_CANCEL_CHECK_INTERVAL == 0 and cancelled():
+                    return None
+                try:
+                    if entry.is_file():
+                        if is_ignored(entry.name, False):
+                            continue
+                        stat = entry.stat()
+                        nodes.append(FileNode(entry.path, False, stat.st_size, stat.st_mtime, entry.name))
+                    elif entry.is_dir():
+                        if not is_ignored(entry.name, True):
+                            nodes.append(FileNode(entry.path, True, name=entry.name))
+                except OSError:
+                    continue
+    except Exception as e:
+        print(f"读取目录错误 {directory}: {e}")
+    return nodes
+
+
+class FileTreeModel:
+    """
+    内存中的文件树模型。
+    目录按需扫描，之后由文件系统事件以增量方式更新受影响的节点。
+    """
+
+    def __init__(self, root: Path, scanner=scan_directory, ignore_rules=None, max_workers: int = SCAN_MAX_WORKERS):
+        self.scanner = scanner
+        self.ignore_rules = ignore_rules
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dir-scan")
+        self.root = None
+        self.generation = 0  # 每次 reset 递增，用于取消旧根目录上的扫描
+        self._index = {}  # str(path) -> FileNode
+        self._event_serial = 0  # 每应用一个事件递增，用于发现与后台校验并发的修改
+        self.reset(root, ignore_rules)
+
+    def reset(self, root: Path, ignore_rules=None):
+        """切换根目录，丢弃所有已扫描的数据，进行中的扫描会被取消"""
+        with self._lock:
+            self.generation += 1
+            self.ignore_rules = ignore_rules
+            self.root = FileNode(root.resolve(), True)
+            self._index = {self.root.key: self.root}
+
+    def get(self, path) -> "FileNode | None":
+        return self._index.get(str(path))
+
+    def is_cancelled(self, generation: int) -> bool:
+        return self.generation != generation
+
+    def load_directory(self, path) -> "FileNode | None":
+        """确保目录已被扫描（已扫描的目录直接返回缓存）；扫描被取消时返回 None"""
+        with self._lock:
+            node = self.get(path)
+            if node is None or not node.is_dir:
+                return None
+            if node.loaded:
+                return node
+            generation, ignore_rules = self.generation, self.ignore_rules
+        # 在锁外扫描，切换根目录时不必等待
+        children = self.scanner(node.path, ignore_rules, lambda: self.is_cancelled(generation))
+        with self._lock:
+            if children is None or self.is_cancelled(generation):
+                return None
+            if not node.loaded:
+                self._populate(node, children)
+            return node
+
+    def load_directories(self, paths):
+        """使用线程池逐层并行扫描 paths 中可达且尚未加载的目录"""
+        paths = {str(p) for p in paths}
+        while True:
+            with self._lock:
+                generation, ignore_rules = self.generation, self.ignore_rules
+                targets = [node for node in (self._index.get(p) for p in paths)
+                           if node is not None and node.is_dir and not node.loaded]
+            if not targets:
+                return
+            futures = [(node, self._executor.submit(self.scanner, node.path, ignore_rules,
+                                                    lambda: self.is_cancelled(generation)))
+                       for node in targets]
+            for node, future in futures:
+                children = future.result()
+                with self._lock:
+                    if self.is_cancelled(generation):
+                        return
+                    if children is not None and not node.loaded and self._index.get(node.key) is node:
+                        self._populate(node, children)
+            paths -= {node.key for node in targets}
+
+    def reload_directory(self, path) -> bool:
+        """重新扫描单个目录并与已有子节点合并，返回是否有变化"""
+        with self._lock:
+            node = self.get(path)
+            if node is None or not node.is_dir:
+                return False
+            if not node.loaded:
+                self._populate(node, self.scanner(node.path, self.ignore_rules))
+                return True
+            return self._merge(node, self.scanner(node.path, self.ignore_rules))
+
+    def reload_loaded(self) -> bool:
+        """重新扫描所有已加载的目录（例如忽略规则变化后），返回是否有变化"""
+        with self._lock:
+            loaded = [node for node in self._index.values() if node.is_dir and node.loaded]
+            changed = False
+            for node in loaded:
+                # 祖先目录合并时可能已移除该节点
+                if self._index.get(node.key) is node:
+                    changed |= self._merge(node, self.scanner(node.path, self.ignore_rules))
+            return changed
+
+    def sorted_children(self, node: FileNode):
+        """返回 (文件列表, 子目录列表)，均按名称排序"""
+        with self._lock:
+            children = list((node.children or {}).values())
+        files = sorted((c for c in children if not c.is_dir), key=lambda c: c.name)
+        dirs = sorted((c for c in children if c.is_dir), key=lambda c: c.name)
+        return files, dirs
+
+    def apply_event(self, event_type: str, src_path: str, dest_path: str = None, is_directory: bool = False):
+        """
+        将一个文件系统事件作为增量应用到模型。
+        返回发生变化的路径集合（变化的文件节点或子节点列表变化的目录）。
+        """
+        with self._lock:
+            self._event_serial += 1
+            changed = set()
+            if event_type == "moved":
+                changed |= self._remove(Path(src_path))
+                if dest_path:
+                    changed |= self._add_or_update(Path(dest_path), is_directory)
+            elif event_type == "deleted":
+                changed |= self._remove(Path(src_path))
+            elif event_type in ("created", "modified", "closed"):
+                changed |= self._add_or_update(Path(src_path), is_directory)
+            return changed
+
+    def export_directories(self, paths):
+        """
+        导出 paths 中已加载目录的子节点，供快照保存：
+        {目录路径: [[目录名], [文件名, 大小, 修改时间], ...]}
+        """
+        with self._lock:
+            result = {}
+            for path in paths:
+                node = self._index.get(str(path))
+                if node is None or not node.is_dir or not node.loaded:
+                    continue
+                result[node.key] = [[child.name] if child.is_dir else [child.name, child.size, child.mtime]
+                                    for child in node.children.values()]
+            return result
+
+    def restore_directories(self, directories) -> list:
+        """
+        用快照内容填充尚未加载的目录（不访问文件系统），按父目录在前的顺序处理。
+        返回已填充的目录路径列表，这些目录需要随后调用 validate_directories 校验。
+        """
+        restored = []
+        with self._lock:
+            for key in sorted(directories, key=len):
+                node = self._index.get(key)
+                if node is None or not node.is_dir or node.loaded:
+                    continue
+                children = []
+                for entry in directories[key]:
+                    child_path = os.path.join(key, entry[0])
+                    if len(entry) == 1:
+                        children.append(FileNode(child_path, True, name=entry[0]))
+                    else:
+                        children.append(FileNode(child_path, False, entry[1], entry[2], entry[0]))
+                self._populate(node, children)
+                restored.append(key)
+        return restored
+
+    def validate_directories(self, paths) -> set:
+        """
+        在线程池中重新扫描 paths 中已加载的目录，只把与现有内容的差异合并进模型。
+        扫描期间若有事件被应用，扫描结果可能早于事件，重新扫描（至多 VALIDATE_MAX_ATTEMPTS 次）。
+        返回子节点有变化的目录集合。
+        """
+        changed = set()
+        for _ in range(VALIDATE_MAX_ATTEMPTS):
+            with self._lock:
+                generation, ignore_rules, serial = self.generation, self.ignore_rules, self._event_serial
+                targets = [node for node in (self._index.get(str(p)) for p in paths)
+                           if node is not None and node.is_dir and node.loaded]
+            futures = [(node, self._executor.submit(self.scanner, node.path, ignore_rules,
+                                                    lambda: self.is_cancelled(generation)))
+                       for node in targets]
+            results = [(node, future.result()) for node, future in futures]
+            with self._lock:
+                if self.is_cancelled(generation):
+                    return set()
+                if self._event_serial != serial:
+                    continue
+                for node, children in results:
+                    if children is not None and node.loaded and self._index.get(node.key) is node \
+                            and self._merge(node, children):
+                        changed.add(node.key)
+                return changed
+        return changed
+
+    def _populate(self, node: FileNode, children):
+        node.children = {}
+        for child in children:
+            node.children[child.name] = child
+            self._index[child.key] = child
+
+    def _merge(self, node: FileNode, children) -> bool:
+        changed = False
+        fresh = {child.name: child for child in children}
+        for name in list(node.children):
+            if name not in fresh:
+                self._drop_subtree(node.children.pop(name))
+                changed = True
+        for name, child in fresh.items():
+            existing = node.children.get(name)
+            if existing is None or existing.is_dir != child.is_dir:
+                if existing is not None:
+                    self._drop_subtree(existing)
+                node.children[name] = child
+                self._index[child.key] = child
+                changed = True
+            elif not child.is_dir and existing.signature() != child.signature():
+                existing.size, existing.mtime = child.size, child.mtime
+                changed = True
+        return changed
+
+    def _add_or_update(self, path: Path, is_directory: bool):
+        parent = self.get(path.parent)
+        # 父目录未扫描过时无需处理，展开时会重新扫描
+        if parent is None or not parent.loaded:
+            return set()
+        is_ignored = self.ignore_rules.is_ignored if self.ignore_rules else (lambda p, d: _default_ignored(p.name, d))
+        try:
+            if path.is_dir():
+                if is_ignored(path, True):
+                    return set()
+                is_directory, size, mtime = True, 0, 0.0
+            elif path.is_file():
+                if is_ignored(path, False):
+                    return set()
+                stat = path.stat()
+                is_directory, size, mtime = False, stat.st_size, stat.st_mtime
+            else:
+                return set()
+        except OSError:
+            return set()
+
+        existing = parent.children.get(path.name)
+        if existing is not None and existing.is_dir == is_directory:
+            if is_directory:
+                return set()
+            new_node = FileNode(path, False, size, mtime)
+            if existing.signature() == new_node.signature():
+                return set()
+            existing.size, existing.mtime = new_node.size, new_node.mtime
+            return {existing.key}
+
+        if existing is not None:
+            self._drop_subtree(existing)
+        node = FileNode(path, is_directory, size, mtime)
+        parent.children[path.name] = node
+        self._index[str(path)] = node
+        return {parent.key}
+
+    def _remove(self, path: Path):
+        parent = self.get(path.parent)
+        if parent is None or not parent.loaded or path.name not in parent.children:
+            return set()
+        self._drop_subtree(parent.children.pop(path.name))
+        return {parent.key}
+
+    def _drop_subtree(self, node: FileNode):
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            self._index.pop(current.key, None)
+            if current.children:
+                stack.extend(current.children.values())
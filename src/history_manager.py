@@ -4,6 +4,10 @@
 import flet as ft
 import datetime
 from typing import Callable
+from .ui_scheduler import get_ui_scheduler
+
+# 每页渲染的历史卡片数量，其余通过“加载更多”分页加载
+HISTORY_PAGE_SIZE = 50
 
 
 class HistoryManager:
@@ -12,10 +16,23 @@ class HistoryManager:
         self.switch_to_tab_callback = switch_to_tab_callback
         self.load_conversation_callback = load_conversation_callback
         self.history_list = None
+        self.ui = None
+
+        # 按对话文件路径索引的已渲染卡片: key -> (signature, card)
+        self._rendered_cards = {}
+        self._conversations = []
+        self._visible_count = HISTORY_PAGE_SIZE
+        self._empty_placeholder = ft.Container(
+            content=ft.Text("暂无对话历史", size=12, color="#9ca3af"),
+            padding=15,
+            alignment=ft.alignment.center
+        )
+        self._load_more_button = ft.TextButton("加载更多", on_click=self._on_load_more)
 
     def create_history_tab(self):
         """创建历史记录标签页"""
-        self.history_list = ft.Column(expand=True, spacing=3)  # 减小间距
+        # 直接使用 ListView，保证滚动时按需渲染
+        self.history_list = ft.ListView(expand=True, spacing=3)  # 减小间距
 
         # 创建顶部操作栏
         top_actions = ft.Container(
@@ -43,7 +60,7 @@ class HistoryManager:
             content=ft.Column([
                 top_actions,
                 ft.Container(
-                    content=ft.ListView([self.history_list], expand=True),
+                    content=self.history_list,
                     expand=True,
                     padding=10,
                     bgcolor="#1f2937",
@@ -60,49 +77,109 @@ class HistoryManager:
         if not self.history_list:
             return
 
-        self.history_list.controls.clear()
-        conversations = self.client.get_conversation_list()
+        self._conversations = self.client.get_conversation_list()
+        self._render_visible()
 
-        if not conversations:
-            self.history_list.controls.append(
-                ft.Container(
-                    content=ft.Text("暂无对话历史", size=12, color="#9ca3af"),
-                    padding=15,
-                    alignment=ft.alignment.center
-                )
-            )
-        else:
-            for conv in conversations:
+    def _render_visible(self):
+        """将当前页的对话列表与已渲染卡片做差异比对，只增删改变化的卡片"""
+        conversations = self._conversations
+        visible = conversations[:self._visible_count]
+        changed_cards = []
+        new_controls = []
+        rendered = {}
+
+        for conv in visible:
+            key = str(conv['path'])
+            signature = self._card_signature(conv)
+            cached = self._rendered_cards.get(key)
+            if cached is None:
                 card = self._create_conversation_card(conv)
-                self.history_list.controls.append(card)
+            else:
+                old_signature, card = cached
+                if old_signature != signature:
+                    self._update_conversation_card(card, conv)
+                    changed_cards.append(card)
+            rendered[key] = (signature, card)
+            new_controls.append(card)
+
+        self._rendered_cards = rendered
+
+        if not conversations:
+            new_controls.append(self._empty_placeholder)
+        elif len(conversations) > len(visible):
+            remaining = len(conversations) - len(visible)
+            self._load_more_button.text = f"加载更多 (剩余 {remaining} 条)"
+            new_controls.append(self._load_more_button)
+            changed_cards.append(self._load_more_button)
+
+        list_changed = [id(c) for c in new_controls] != [id(c) for c in self.history_list.controls]
+        if list_changed:
+            self.history_list.controls = new_controls
 
-        # 如果需要在外部更新页面，可以通过回调实现
-        # 这里不直接操作 page，由主应用负责更新
+        # 由 UI 调度器合并发送，列表结构变化时才刷新整个列表
+        if self.ui:
+            if list_changed:
+                self.ui.mark_dirty(self.history_list)
+            elif changed_cards:
+                self.ui.mark_dirty(*changed_cards)
+
+    def _on_load_more(self, e):
+        """加载下一页历史记录"""
+        self._visible_count += HISTORY_PAGE_SIZE
+        self._render_visible()
+
+    @staticmethod
+    def _card_signature(conversation):
+        return (conversation['name'], conversation['message_count'], conversation['preview'],
+                conversation['updated_at'])
+
+    def _update_conversation_card(self, card, conversation):
+        """原地更新卡片中的文本，避免重建整个控件树"""
+        fields = card.data
+        fields["name"].value = conversation['name']
+        fields["count"].value = f"{conversation['message_count']}条"
+        fields["preview"].value = conversation['preview']
+        fields["time"].value = f"更新时间: {self._format_time(conversation['updated_at'])}"
 
     def _create_conversation_card(self, conversation):
         """创建单个对话卡片"""
         time_display = self._format_time(conversation["updated_at"])
 
+        name_text = ft.Text(
+            conversation['name'],
+            size=12,  # 减小字体
+            color="#e5e7eb",
+            weight="bold",
+            expand=True,
+            max_lines=1,
+            overflow="ellipsis"
+        )
+        count_text = ft.Text(
+            f"{conversation['message_count']}条",
+            size=9,  # 减小字体
+            color="#9ca3af"
+        )
+        preview_text = ft.Text(
+            conversation['preview'],
+            size=10,  # 减小字体
+            color="#d1d5db",
+            max_lines=2,  # 限制行数
+            overflow="ellipsis"
+        )
+        time_text = ft.Text(
+            f"更新时间: {time_display}",
+            size=9,  # 减小字体
+            color="#6b7280"
+        )
+
         return ft.Card(
             content=ft.Container(
                 content=ft.Column([
                     # 标题和消息数量 - 减小高度
                     ft.Row([
-                        ft.Text(
-                            conversation['name'],
-                            size=12,  # 减小字体
-                            color="#e5e7eb",
-                            weight="bold",
-                            expand=True,
-                            max_lines=1,
-                            overflow="ellipsis"
-                        ),
+                        name_text,
                         ft.Container(
-                            content=ft.Text(
-                                f"{conversation['message_count']}条",
-                                size=9,  # 减小字体
-                                color="#9ca3af"
-                            ),
+                            content=count_text,
                             bgcolor="#374151",
                             border_radius=4,
                             padding=ft.padding.symmetric(3, 5)  # 减小内边距
@@ -111,24 +188,12 @@ class HistoryManager:
 
                     # 预览内容 - 减小高度
                     ft.Container(
-                        content=ft.Text(
-                            conversation['preview'],
-                            size=10,  # 减小字体
-                            color="#d1d5db",
-                            max_lines=2,  # 限制行数
-                            overflow="ellipsis"
-                        ),
+                        content=preview_text,
                         margin=ft.margin.only(top=2, bottom=2)
                     ),
 
                     # 更新时间 - 减小高度
-                    ft.Row([
-                        ft.Text(
-                            f"更新时间: {time_display}",
-                            size=9,  # 减小字体
-                            color="#6b7280"
-                        )
-                    ]),
+                    ft.Row([time_text]),
 
                     # 操作按钮 - 减小按钮尺寸
                     ft.Row([
@@ -158,7 +223,8 @@ class HistoryManager:
             ),
             color="#374151",
             elevation=1,  # 减小阴影
-            margin=ft.margin.only(bottom=5)  # 减小底部边距
+            margin=ft.margin.only(bottom=5),  # 减小底部边距
+            data={"name": name_text, "count": count_text, "preview": preview_text, "time": time_text}
         )
 
     def _format_time(self, time_str):
@@ -202,6 +268,7 @@ class HistoryManager:
     def set_page(self, page: ft.Page):
         """设置页面对象（用于显示对话框等需要页面的操作）"""
         self.page = page
+        self.ui = get_ui_scheduler(page)
 
     def _show_delete_confirmation(self, filepath):
         """显示删除确认对话框"""
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import re
+import threading
+from pathlib import Path
+
+# 默认忽略的目录和文件（语义同 .gitignore，可在忽略文件中用 "!" 取消）
+DEFAULT_IGNORE_PATTERNS = [
+    ".*",
+    ".git/",
+    "__pycache__/",
+    "node_modules/",
+    ".venv/",
+    "venv/",
+    "build/",
+    "dist/",
+]
+# 会被读取的忽略规则文件，.deepseekignore 用于只对本应用生效的自定义规则
+IGNORE_FILE_NAMES = (".gitignore", ".deepseekignore")
+
+
+def _translate(pattern: str) -> str:
+    """将 gitignore 通配符转换为正则表达式"""
+    i, n, result = 0, len(pattern), ""
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**/", i):
+                result += "(?:.*/)?"
+                i += 3
+                continue
+            if pattern.startswith("**", i):
+                result += ".*"
+                i += 2
+                continue
+            result += "[^/]*"
+        elif c == "?":
+            result += "[^/]"
+        elif c == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                result += re.escape(c)
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                result += f"[{body}]"
+                i = end
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            result += re.escape(pattern[i])
+        else:
+            result += re.escape(c)
+        i += 1
+    return result
+
+
+class IgnoreRule:
+    """单条忽略规则"""
+
+    __slots__ = ("pattern", "base", "negate", "dir_only", "anchored", "regex")
+
+    def __init__(self, pattern: str, base: str = ""):
+        self.pattern = pattern
+        self.base = base  # 规则所在目录（相对根目录，"/" 分隔，根目录为空串）
+        self.negate = pattern.startswith("!")
+        if self.negate:
+            pattern = pattern[1:]
+        self.dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        # 包含 "/" 的规则相对规则文件所在目录匹配，否则匹配任意层级的名称
+        self.anchored = "/" in pattern
+        self.regex = re.compile(_translate(pattern.lstrip("/")) + r"\Z")
+
+    def matches(self, rel_path: str, name: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        if self.base:
+            if not rel_path.startswith(self.base + "/"):
+                return False
+            rel_path = rel_path[len(self.base) + 1:]
+        return self.regex.match(rel_path if self.anchored else name) is not None
+
+
+def parse_ignore_lines(lines, base: str = ""):
+    """解析忽略文件内容，返回规则列表"""
+    rules = []
+    for line in lines:
+        line = line.rstrip("\n").rstrip("\r")
+        if not line.endswith("\\ "):
+            line = line.rstrip()
+        # "\#"、"\!" 开头的规则保留转义，由 _translate 按字面字符匹配
+        if not line or line.startswith("#"):
+            continue
+        rules.append(IgnoreRule(line, base))
+    return rules
+
+
+class IgnoreRules:
+    """
+    工作区忽略规则。
+    依次应用默认规则、额外规则、根目录及各级子目录中的 .gitignore / .deepseekignore，
+    后出现的规则优先；被忽略目录下的所有内容都视为忽略。
+    """
+
+    def __init__(self, root: Path, extra_patterns=None, use_ignore_files: bool = True):
+        self.root = Path(root).resolve()
+        self._root_str = str(self.root)
+        self.use_ignore_files = use_ignore_files
+        self._base_rules = parse_ignore_lines(list(DEFAULT_IGNORE_PATTERNS) + list(extra_patterns or []))
+        self._lock = threading.Lock()
+        self._dir_rules = {}  # 相对目录 -> 该目录忽略文件中的规则
+        self._dir_ignored = {}  # 相对目录 -> 是否被忽略
+        self._effective_rules = {}  # 相对目录 -> 对其子项生效的全部规则
+
+    def reload(self):
+        """忽略文件变化后清除缓存"""
+        with self._lock:
+            self._dir_rules.clear()
+            self._dir_ignored.clear()
+            self._effective_rules.clear()
+
+    def relative(self, path) -> "str | None":
+        """返回相对根目录的 "/" 分隔路径，不在根目录下时返回 None"""
+        path_str = str(path)
+        if path_str == self._root_str:
+            return ""
+        if not path_str.startswith(self._root_str):
+            return None
+        rest = path_str[len(self._root_str):]
+        if not rest.startswith(("/", "\\")) and not self._root_str.endswith(("/", "\\")):
+            return None
+        return rest.lstrip("/\\").replace("\\", "/")
+
+    def is_ignored(self, path, is_dir: bool = None) -> bool:
+        rel_path = self.relative(path)
+        if not rel_path:
+            return False
+        if is_dir is None:
+            is_dir = Path(path).is_dir()
+        parent, _, name = rel_path.rpartition("/")
+        with self._lock:
+            if parent and self._is_dir_ignored(parent):
+                return True
+            return self._match(rel_path, name, is_dir, parent)
+
+    def child_matcher(self, directory):
+        """
+        返回判断 directory 直接子项是否被忽略的函数 matcher(name, is_dir)。
+        规则只解析一次，供扫描大目录时逐项调用。
+        """
+        rel_dir = self.relative(directory)
+        if rel_dir is None:
+            return lambda name, is_dir: False
+        with self._lock:
+            if rel_dir and self._is_dir_ignored(rel_dir):
+                return lambda name, is_dir: True
+            rules = self._rules_for(rel_dir)
+        prefix = rel_dir + "/" if rel_dir else ""
+
+        def matcher(name: str, is_dir: bool) -> bool:
+            rel_path, ignored = prefix + name, False
+            for rule in rules:
+                if ignored == rule.negate and rule.matches(rel_path, name, is_dir):
+                    ignored = not rule.negate
+            return ignored
+
+        return matcher
+
+    def _is_dir_ignored(self, rel_dir: str) -> bool:
+        cached = self._dir_ignored.get(rel_dir)
+        if cached is None:
+            parent, _, name = rel_dir.rpartition("/")
+            cached = (bool(parent) and self._is_dir_ignored(parent)) or self._match(rel_dir, name, True, parent)
+            self._dir_ignored[rel_dir] = cached
+        return cached
+
+    def _match(self, rel_path: str, name: str, is_dir: bool, parent: str) -> bool:
+        ignored = False
+        for rule in self._rules_for(parent):
+            if ignored == rule.negate and rule.matches(rel_path, name, is_dir):
+                ignored = not rule.negate
+        return ignored
+
+    def _rules_for(self, rel_dir: str):
+        """按从根到当前目录的顺序收集适用的规则"""
+        rules = self._effective_rules.get(rel_dir)
+        if rules is None:
+            rules = list(self._base_rules)
+            if self.use_ignore_files:
+                parts = rel_dir.split("/") if rel_dir else []
+                for depth in range(len(parts) + 1):
+                    rules.extend(self._load_dir_rules("/".join(parts[:depth])))
+            self._effective_rules[rel_dir] = rules
+        return rules
+
+    def _load_dir_rules(self, rel_dir: str):
+        rules = self._dir_rules.get(rel_dir)
+        if rules is None:
+            rules = []
+            directory = self.root / rel_dir if rel_dir else self.root
+            for file_name in IGNORE_FILE_NAMES:
+                try:
+                    with open(directory / file_name, "r", encoding="utf-8", errors="replace") as f:
+                        rules.extend(parse_ignore_lines(f, rel_dir))
+                except OSError:
+                    continue
+            self._dir_rules[rel_dir] = rules
+        return rules
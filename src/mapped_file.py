@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import mmap
+import threading
+import time
+from array import array
+from pathlib import Path
+
+# 每隔多少行记录一次行首偏移（稀疏索引，内存占用约为 行数/STRIDE*8 字节）
+LINE_INDEX_STRIDE = 1000
+# 建索引时每次处理的字节数
+INDEX_CHUNK_SIZE = 4 * 1024 * 1024
+# 块内按小块计数换行，只在包含检查点的小块中逐行查找
+INDEX_BLOCK_SIZE = 4096
+# 单行最多解码的字节数，避免压缩后的超长单行拖慢渲染
+MAX_LINE_BYTES = 4000
+# 索引进度回调的最小间隔（秒）
+INDEX_PROGRESS_INTERVAL = 0.5
+
+
+class MappedTextFile:
+    """
+    基于 mmap 的只读大文本文件。
+    后台线程建立稀疏行偏移索引，get_lines 只解码请求的行，不会把整个文件读入内存。
+    """
+
+    def __init__(self, path: Path, encoding: str = "utf-8", on_progress=None):
+        self.path = Path(path)
+        self.encoding = encoding
+        self.on_progress = on_progress  # on_progress(mapped_file)，索引进度变化及完成时调用
+        self.size = self.path.stat().st_size
+        self._file = open(self.path, "rb")
+        # 空文件无法映射
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        self._lock = threading.Lock()
+        self._checkpoints = array("Q", [0])  # 第 k*STRIDE 行的起始偏移
+        self._newlines = 0  # 已索引的换行符数量
+        self.is_complete = self.size == 0
+        self._closed = False
+        self._thread = None
+
+    @property
+    def indexed_lines(self) -> int:
+        """当前可以访问的行数（索引完成后即总行数）"""
+        with self._lock:
+            if self.is_complete and self._mmap is not None and not self._mmap[-1:] == b"\n":
+                return self._newlines + 1
+            return self._newlines
+
+    def start_indexing(self):
+        if self._thread is None and not self.is_complete:
+            self._thread = threading.Thread(target=self._build_index, name="line-index", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            self._file.close()
+
+    def _build_index(self):
+        stride, pos, last_report = LINE_INDEX_STRIDE, 0, time.monotonic()
+        try:
+            while pos < self.size and not self._closed:
+                with self._lock:
+                    if self._mmap is None:
+                        return
+                    chunk = self._mmap[pos:pos + INDEX_CHUNK_SIZE]
+                newlines, checkpoints = self._newlines, []
+                next_checkpoint = (len(self._checkpoints) + len(checkpoints)) * stride
+                for block_start in range(0, len(chunk), INDEX_BLOCK_SIZE):
+                    block_end = block_start + INDEX_BLOCK_SIZE
+                    count = chunk.count(b"\n", block_start, block_end)
+                    # 第 N 行从第 N 个换行符之后开始
+                    while newlines + count >= next_checkpoint:
+                        found, cursor = newlines, block_start
+                        while found < next_checkpoint:
+                            cursor = chunk.find(b"\n", cursor, block_end) + 1
+                            found += 1
+                        checkpoints.append(pos + cursor)
+                        next_checkpoint += stride
+                    newlines += count
+                pos += len(chunk)
+                with self._lock:
+                    self._checkpoints.extend(checkpoints)
+                    self._newlines = newlines
+                    if pos >= self.size:
+                        self.is_complete = True
+                now = time.monotonic()
+                if self.on_progress and (self.is_complete or now - last_report >= INDEX_PROGRESS_INTERVAL):
+                    last_report = now
+                    self.on_progress(self)
+        except (ValueError, OSError):
+            # 文件在索引过程中被关闭
+            return
+
+    def get_lines(self, start: int, count: int):
+        """返回从 start（0 起）开始的至多 count 行文本"""
+        with self._lock:
+            mm = self._mmap
+            if mm is None or start < 0:
+                return []
+            available = self._newlines + (1 if self.is_complete and mm[-1:] != b"\n" else 0)
+            if start >= available:
+                return []
+            checkpoint = start // LINE_INDEX_STRIDE
+            pos = self._checkpoints[checkpoint]
+            for _ in range(start - checkpoint * LINE_INDEX_STRIDE):
+                pos = mm.find(b"\n", pos) + 1
+            lines = []
+            for _ in range(min(count, available - start)):
+                newline = mm.find(b"\n", pos)
+                end = self.size if newline == -1 else newline
+                raw = mm[pos:min(end, pos + MAX_LINE_BYTES)]
+                text = raw.decode(self.encoding, errors="replace").rstrip("\r")
+                if end - pos > MAX_LINE_BYTES:
+                    text += f" …（本行过长，已截断 {end - pos - MAX_LINE_BYTES} 字节）"
+                lines.append(text)
+                pos = end + 1
+            return lines
@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import datetime
+import hashlib
+import json
+import operator
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from itertools import accumulate, compress, islice, repeat
+from pathlib import Path
+from .ignore_rules import IGNORE_FILE_NAMES
+from .ui_scheduler import IdleDebouncer
+
+# 路径索引的持久化目录（每个根目录一个文件）
+DEFAULT_INDEX_DIR = Path("./.path_index")
+# 索引变化后空闲多久写入磁盘（秒）
+PATH_INDEX_SAVE_DELAY = 5.0
+# 快速打开默认返回的结果数
+QUICK_OPEN_MAX_RESULTS = 50
+# 子序列比较最多检查的候选条数（按排名取最前面的），避免宽泛的查询在大仓库中逐条比较全部路径
+QUICK_OPEN_SCAN_LIMIT = 20000
+# 增量追加/删除的条目超过总数的该比例时在后台整理（恢复排序、回收已删除条目）
+PATH_INDEX_COMPACT_RATIO = 0.2
+# 非 ASCII 字符按码位折叠到固定数量的位图中，避免中文等大字符集占用过多内存
+NON_ASCII_BUCKETS = 64
+
+
+def _char_key(char: str):
+    return char if char < "\x80" else ord(char) % NON_ASCII_BUCKETS
+
+
+def _subsequence_pattern(query: str):
+    """查询字符按顺序出现即匹配；每段排除下一个字符，匹配过程无需回溯"""
+    return re.compile("".join(f"[^{re.escape(c)}]*{re.escape(c)}" for c in query))
+
+
+class _IndexState:
+    """
+    一次构建得到的索引数据。条目按 (路径长度, 路径) 排序，编号即排名；
+    每个字符一个字节位图（bytearray，第 i 字节为 1 表示第 i 条路径包含该字符），
+    查询时把涉及的位图转成整数做按位与，一次得到全部候选。
+    文件名另有一组位图，文件名子序列一层只需检查文件名包含全部查询字符的条目。
+    """
+
+    def __init__(self, paths):
+        # 按字典序排列的路径，删除目录时用二分查找定位其下的条目；已删除的路径在整理时清除
+        self.sorted_paths = sorted(set(paths))
+        paths = sorted(self.sorted_paths, key=len)
+        self.paths = paths  # 相对根目录、"/" 分隔的路径
+        self.lower = [path.lower() for path in paths]
+        self.names = [path.rpartition("/")[2] for path in self.lower]
+        self.ids = {path: index for index, path in enumerate(paths)}
+        # 预先生成的编号列表：从中按标志挑选编号比遍历 range 逐个创建整数快数倍
+        self.ranks = list(range(len(paths)))
+        self.alive = bytearray(b"\x01" * len(paths))
+        self.char_maps = self._build_maps(self.lower)
+        self.name_maps = self._build_maps(self.names)
+        self.masks = {}  # 位图对应的整数缓存，索引变化时清空
+        self._name_blob = None  # (文件名拼接串, 各文件名之前换行符的位置)，追加条目后重建
+        self.name_blob()
+        self.changes = 0  # 构建后追加或删除的条目数
+
+    @classmethod
+    def _build_maps(cls, texts) -> dict:
+        maps = {}
+        for char in set("".join(texts)):
+            if char < "\x80":
+                maps[char] = bytearray(map(operator.contains, texts, repeat(char)))
+        # 含非 ASCII 字符的路径通常很少，逐条处理
+        for index, text in enumerate(texts):
+            if not text.isascii():
+                for char in set(text):
+                    if char >= "\x80":
+                        cls._set_bit(maps, _char_key(char), index)
+        return maps
+
+    @staticmethod
+    def _set_bit(maps: dict, key, index: int):
+        bitmap = maps.get(key)
+        if bitmap is None:
+            bitmap = maps[key] = bytearray()
+        if len(bitmap) <= index:
+            bitmap.extend(bytes(index + 1 - len(bitmap)))
+        bitmap[index] = 1
+
+    def mask(self, key, in_name: bool = False) -> int:
+        """key 为 None 时返回存活条目的位图；in_name 为 True 时使用文件名的位图"""
+        value = self.masks.get((key, in_name))
+        if value is None:
+            if key is None:
+                bitmap = self.alive
+            else:
+                bitmap = (self.name_maps if in_name else self.char_maps).get(key)
+            value = int.from_bytes(bitmap, "little") if bitmap else 0
+            self.masks[key, in_name] = value
+        return value
+
+    def candidates(self, query: str, in_name: bool = False) -> "bytes | None":
+        """包含 query 全部字符的存活条目（每条一个字节的标志）；没有候选时返回 None"""
+        mask = self.mask(None)
+        for char in set(query):
+            if not mask:
+                return None
+            mask &= self.mask(_char_key(char), in_name)
+        return mask.to_bytes(len(self.paths), "little") if mask else None
+
+    def name_blob(self):
+        if self._name_blob is None:
+            offsets = array("q", accumulate(map(operator.add, map(len, self.names), repeat(1)), initial=0))
+            self._name_blob = ("\n" + "\n".join(self.names), offsets)
+        return self._name_blob
+
+    def find_names(self, needle: str):
+        """
+        在文件名拼接串中查找子串，按编号顺序逐个产生文件名包含它的存活条目 (编号, 是否为文件名前缀)；
+        一次遍历同时得到前缀匹配与包含匹配
+        """
+        blob, offsets = self.name_blob()
+        count = len(offsets) - 1
+        position = blob.find(needle)
+        while position != -1:
+            index = bisect_right(offsets, position) - 1
+            if self.alive[index]:
+                yield index, position == offsets[index] + 1
+            if index + 1 >= count:
+                return
+            position = blob.find(needle, offsets[index + 1])
+
+    def select(self, flags: bytes, items, tiers, scan_limit: int):
+        """
+        逐层产生 flags 选中、且通过该层判定（tier(候选条目) -> 判定结果序列）的条目编号，同一层内按编号顺序。
+        只取排名最前的 scan_limit 个候选，各层共用，调用方收集满即停止
+        """
+        ids = list(islice(compress(self.ranks, flags), scan_limit))
+        selected = list(map(items.__getitem__, ids))
+        for tier in tiers:
+            yield from compress(ids, tier(selected))
+
+    def add(self, path: str) -> bool:
+        if path in self.ids:
+            return False
+        index = len(self.paths)
+        lower = path.lower()
+        name = lower.rpartition("/")[2]
+        self.paths.append(path)
+        position = bisect_left(self.sorted_paths, path)
+        if position == len(self.sorted_paths) or self.sorted_paths[position] != path:
+            self.sorted_paths.insert(position, path)
+        self.lower.append(lower)
+        self.names.append(name)
+        self.ids[path] = index
+        self.ranks.append(index)
+        self.alive.append(1)
+        for char in set(lower):
+            self._set_bit(self.char_maps, _char_key(char), index)
+        for char in set(name):
+            self._set_bit(self.name_maps, _char_key(char), index)
+        self.masks.clear()
+        self._name_blob = None
+        self.changes += 1
+        return True
+
+    def remove(self, path: str) -> bool:
+        index = self.ids.pop(path, None)
+        if index is None:
+            return False
+        self.alive[index] = 0
+        self.masks.clear()
+        self.changes += 1
+        return True
+
+    def remove_prefix(self, prefix: str) -> int:
+        """删除 prefix（以 "/" 结尾）下的所有条目"""
+        start = end = bisect_left(self.sorted_paths, prefix)
+        while end < len(self.sorted_paths) and self.sorted_paths[end].startswith(prefix):
+            end += 1
+        return sum(self.remove(path) for path in self.sorted_paths[start:end])
+
+    def alive_paths(self):
+        return list(compress(self.paths, self.alive))
+
+
+class PathIndex:
+    """
+    工作区文件路径索引，供快速打开使用。
+    首次使用时先载入上次保存的索引，再在后台完整扫描；之后由文件系统事件增量维护，
+    并在空闲时保存到 DEFAULT_INDEX_DIR。
+    """
+
+    def __init__(self, root: Path, ignore_rules=None, index_dir: Path = DEFAULT_INDEX_DIR):
+        self.root = Path(root).resolve()
+        self.ignore_rules = ignore_rules
+        self.index_dir = Path(index_dir)
+        self.generation = 0
+        self.is_ready = False  # 当前根目录的完整扫描已完成
+        self._lock = threading.RLock()
+        self._state = _IndexState([])
+        self._building = False
+        self._pending_events = []  # 后台构建期间收到的事件，构建完成后重放
+        self._compacting = False
+        self._save_debouncer = IdleDebouncer(self.save, PATH_INDEX_SAVE_DELAY, "path-index-save")
+
+    # ---------------- 生命周期 ----------------
+
+    def start(self):
+        """载入已保存的索引并在后台重新扫描"""
+        self._start_build(load_saved=True)
+
+    def reset(self, root: Path, ignore_rules=None):
+        """切换根目录"""
+        with self._lock:
+            self.root = Path(root).resolve()
+            self.ignore_rules = ignore_rules
+            self.is_ready = False
+            self._state = _IndexState([])
+            self._pending_events = []
+        self._start_build(load_saved=True)
+
+    def rebuild(self):
+        """忽略规则变化等情况下重新扫描整个根目录"""
+        self._start_build(load_saved=False)
+
+    def stop(self):
+        self._save_debouncer.stop()
+        with self._lock:
+            self.generation += 1
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._state.ids)
+
+    # ---------------- 查询 ----------------
+
+    def search(self, query: str, limit: int = QUICK_OPEN_MAX_RESULTS, scan_limit: int = QUICK_OPEN_SCAN_LIMIT):
+        """
+        模糊查找，返回按相关度排序的相对路径列表。
+        依次收集：文件名前缀匹配、文件名包含、文件名子序列、完整路径子序列（查询含 "/" 时只比较路径），
+        同一层内按路径由短到长；收集满 limit 条即停止，宽泛的查询不需要扫描全部候选。
+        后两层用字符位图筛选候选，且只比较排名最前的 scan_limit 个候选，
+        更长的路径要输入更多字符缩小候选后才会出现在结果中。
+        """
+        query = "".join(query.lower().replace("\\", "/").split())
+        if not query:
+            return []
+        with self._lock:
+            state = self._state
+            results, seen = [], set()
+
+            def collect(indexes) -> bool:
+                for index in indexes:
+                    if index not in seen:
+                        seen.add(index)
+                        results.append(state.paths[index])
+                        if len(results) >= limit:
+                            return True
+                return False
+
+            pattern = _subsequence_pattern(query)
+            if "/" not in query:
+                # 文件名前缀/包含：直接在文件名拼接串中查找子串，前缀匹配收集满即停止
+                prefixed, contained = [], []
+                for index, is_prefix in state.find_names(query):
+                    if is_prefix:
+                        prefixed.append(index)
+                        if len(prefixed) >= limit:
+                            break
+                    elif len(contained) < limit:
+                        contained.append(index)
+                if collect(prefixed) or collect(contained):
+                    return results
+                # 文件名子序列：用文件名的字符位图筛选，候选远少于完整路径
+                flags = state.candidates(query, in_name=True)
+                if flags and collect(state.select(flags, state.names, [lambda names: map(pattern.match, names)],
+                                                  scan_limit)):
+                    return results
+                tiers = [lambda paths: map(pattern.match, paths)]
+            else:
+                # 含 "/" 时先找完整包含查询的路径，再比较子序列
+                tiers = [lambda paths: map(operator.contains, paths, repeat(query)),
+                         lambda paths: map(pattern.match, paths)]
+            flags = state.candidates(query)
+            if flags:
+                collect(state.select(flags, state.lower, tiers, scan_limit))
+            return results
+
+    def absolute(self, rel_path: str) -> Path:
+        return self.root / rel_path
+
+    def file_paths(self):
+        """按排名顺序返回所有文件的绝对路径字符串"""
+        with self._lock:
+            rel_paths = self._state.alive_paths()
+            root = str(self.root)
+        return [os.path.join(root, rel_path) for rel_path in rel_paths]
+
+    # ---------------- 增量更新 ----------------
+
+    def apply_events(self, events):
+        """应用合并后的文件系统事件 [(event_type, path, dest_path, is_directory), ...]"""
+        if any(os.path.basename(event[1]) in IGNORE_FILE_NAMES for event in events):
+            self.rebuild()
+            return
+        with self._lock:
+            if self._building:
+                self._pending_events.extend(events)
+            generation = self.generation
+        for event_type, path, _, is_directory in events:
+            if event_type == "created":
+                self._add_path(path, is_directory, generation)
+            elif event_type == "deleted":
+                self._remove_path(path, is_directory)
+            elif event_type == "modified":
+                # 合并后的 "修改" 可能意味着条目被替换（类型可能改变）
+                if os.path.isdir(path):
+                    self._remove_path(path, True)
+                    self._add_path(path, True, generation)
+                elif os.path.isfile(path):
+                    self._add_path(path, False, generation)
+                else:
+                    self._remove_path(path, is_directory)
+        self._after_change()
+
+    def rescan_directories(self, directories):
+        """事件溢出后重新扫描受影响的目录"""
+        with self._lock:
+            if self._building:
+                self._pending_events.extend(("modified", directory, None, True) for directory in directories)
+            generation = self.generation
+        for directory in directories:
+            if os.path.isdir(directory):
+                self._remove_path(directory, True)
+                self._add_path(directory, True, generation)
+        self._after_change()
+
+    def _root_prefix_length(self) -> int:
+        root = str(self.root)
+        return len(root) if root.endswith(("/", "\\")) else len(root) + 1
+
+    def _relative(self, path) -> "str | None":
+        root, path = str(self.root), str(path)
+        prefix_length = self._root_prefix_length()
+        if not path.startswith(root) or len(path) <= prefix_length or path[prefix_length - 1] not in "/\\":
+            return None
+        return path[prefix_length:].replace("\\", "/")
+
+    def _add_path(self, path: str, is_directory: bool, generation: int):
+        if is_directory:
+            paths = self._walk(path, lambda: self.generation != generation)
+        else:
+            if self.ignore_rules and self.ignore_rules.is_ignored(path, False):
+                return
+            rel_path = self._relative(path)
+            paths = [rel_path] if rel_path else []
+        with self._lock:
+            if self.generation == generation:
+                for rel_path in paths or ():
+                    self._state.add(rel_path)
+
+    def _remove_path(self, path: str, is_directory: bool):
+        rel_path = self._relative(path)
+        if rel_path is None:
+            return
+        with self._lock:
+            # 已知文件的删除事件只需删除该条目；目录（或类型不明、不在索引中的路径）才删除其下的条目
+            if not self._state.remove(rel_path) or is_directory:
+                self._state.remove_prefix(rel_path + "/")
+
+    def _after_change(self):
+        self._save_debouncer.poke()
+        with self._lock:
+            state = self._state
+            if self._building or self._compacting or state.changes <= len(state.paths) * PATH_INDEX_COMPACT_RATIO:
+                return
+            self._compacting = True
+        threading.Thread(target=self._compact, name="path-index-compact", daemon=True).start()
+
+    def _compact(self):
+        """重新排序并回收已删除的条目；期间索引又有变化时放弃，等待下次整理"""
+        try:
+            with self._lock:
+                state, changes = self._state, self._state.changes
+                paths = state.alive_paths()
+            new_state = _IndexState(paths)
+            with self._lock:
+                if self._state is state and state.changes == changes:
+                    self._state = new_state
+        finally:
+            self._compacting = False
+
+    # ---------------- 构建与持久化 ----------------
+
+    def _start_build(self, load_saved: bool):
+        with self._lock:
+            self.generation += 1
+            generation = self.generation
+            self._building = True
+            self._pending_events = []
+        threading.Thread(target=self._build, args=(generation, load_saved), name="path-index-build",
+                         daemon=True).start()
+
+    def _build(self, generation: int, load_saved: bool):
+        cancelled = lambda: self.generation != generation
+        try:
+            if load_saved:
+                saved = self._load()
+                if saved is not None and not cancelled():
+                    state = _IndexState(saved)
+                    with self._lock:
+                        if not cancelled():
+                            self._state = state
+            paths = self._walk(str(self.root), cancelled)
+            if paths is None:
+                return
+            state = _IndexState(paths)
+            with self._lock:
+                if cancelled():
+                    return
+                self._state = state
+                self._building = False
+                pending, self._pending_events = self._pending_events, []
+                self.is_ready = True
+            # 重放扫描期间的事件，避免扫描先于变化经过某个目录时丢失更新
+            if pending:
+                self.apply_events(pending)
+            self.save()
+        except Exception as e:
+            print(f"建立路径索引失败: {e}")
+        finally:
+            with self._lock:
+                if self.generation == generation:
+                    self._building = False
+
+    def _walk(self, top: str, cancelled):
+        """返回 top 下所有未被忽略文件的相对路径；取消时返回 None"""
+        paths, stack = [], [top]
+        root_length = self._root_prefix_length()
+        while stack:
+            if cancelled():
+                return None
+            directory = stack.pop()
+            if self.ignore_rules is not None:
+                if self.ignore_rules.is_ignored(directory, True):
+                    continue
+                matcher = self.ignore_rules.child_matcher(directory)
+            else:
+                matcher = None
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        if matcher is not None and matcher(entry.name, is_dir):
+                            continue
+                        if is_dir:
+                            stack.append(entry.path)
+                        else:
+                            paths.append(entry.path[root_length:].replace("\\", "/"))
+            except OSError:
+                continue
+        return paths
+
+    def _index_file(self) -> Path:
+        digest = hashlib.sha1(str(self.root).encode("utf-8")).hexdigest()
+        return self.index_dir / f"{digest}.json"
+
+    def _load(self):
+        try:
+            with open(self._index_file(), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("root") != str(self.root):
+            return None
+        return data.get("paths") or []
+
+    def save(self):
+        """把索引写入磁盘（写入临时文件后替换）"""
+        with self._lock:
+            if not self.is_ready:
+                return
+            root, paths = str(self.root), self._state.alive_paths()
+            index_file = self._index_file()
+        try:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            temp_file = index_file.with_suffix(".tmp")
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump({"root": root, "saved_at": datetime.datetime.now().isoformat(), "paths": paths},
+                          f, ensure_ascii=False)
+            temp_file.replace(index_file)
+        except OSError as e:
+            print(f"保存路径索引失败: {e}")
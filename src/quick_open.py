@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+import flet as ft
+from .path_index import QUICK_OPEN_MAX_RESULTS
+from .ui_scheduler import IdleDebouncer, get_ui_scheduler
+
+# 结果列表的高度
+QUICK_OPEN_LIST_HEIGHT = 380
+# 输入停顿多久后在后台开始查找（秒）
+QUICK_OPEN_SEARCH_DELAY = 0.03
+
+
+class QuickOpenPalette:
+    """快速打开面板：输入文件名片段模糊查找，回车打开第一项或点击打开任意一项"""
+
+    def __init__(self, main_page, path_index, on_open):
+        self.main_page = main_page
+        self.ui = get_ui_scheduler(main_page)
+        self.path_index = path_index
+        self.on_open = on_open  # on_open(Path)
+        self._results = []
+        self._results_query = ""
+        # 查找在后台线程执行：只保留最新一次查询，过期的结果不显示
+        self._query_seq = 0
+        self._pending_query = ""
+        self._seq_lock = threading.Lock()
+        self._searcher = IdleDebouncer(self._run_search, QUICK_OPEN_SEARCH_DELAY, "quick-open-search")
+        # 结果行控件池，查询变化时只修改文字
+        self._rows = []
+
+        self.query_field = ft.TextField(hint_text="输入文件名查找（支持模糊匹配，如 fexp → file_explorer.py）",
+                                        autofocus=True, height=40, text_size=13, content_padding=8,
+                                        border_color="#4b5563", focused_border_color="#3b82f6",
+                                        on_change=self._on_query_change, on_submit=self._on_submit)
+        self.status_text = ft.Text("", size=11, color="#9ca3af")
+        self.results_list = ft.ListView(spacing=0, height=QUICK_OPEN_LIST_HEIGHT)
+        self.dialog = ft.AlertDialog(
+            title=ft.Text("快速打开", color="#e5e7eb", size=16),
+            content=ft.Container(
+                content=ft.Column([self.query_field, self.status_text, self.results_list], spacing=6, tight=True),
+                width=560,
+            ),
+            bgcolor="#1f2937",
+            actions=[ft.TextButton("关闭", on_click=lambda e: self.close())],
+        )
+
+    def show(self):
+        self.query_field.value = ""
+        with self._seq_lock:
+            self._query_seq += 1
+            self._render([], "")
+        self.main_page.open(self.dialog)
+
+    def close(self):
+        self.main_page.close(self.dialog)
+
+    def _on_query_change(self, e):
+        with self._seq_lock:
+            self._query_seq += 1
+            self._pending_query = self.query_field.value or ""
+        self._searcher.poke()
+
+    def _run_search(self):
+        with self._seq_lock:
+            seq, query = self._query_seq, self._pending_query
+        results = self.path_index.search(query) if query.strip() else []
+        # 查找期间输入又变化时丢弃结果，等待下一次查找
+        with self._seq_lock:
+            if seq == self._query_seq:
+                self._render(results, query)
+
+    def _on_submit(self, e):
+        query = self.query_field.value or ""
+        results = self._results
+        if query != self._results_query:
+            # 后台查找尚未完成时直接查找一次，保证打开的是当前输入的第一项
+            results = self.path_index.search(query) if query.strip() else []
+        if results:
+            self._open(results[0])
+
+    def _open(self, rel_path: str):
+        self.close()
+        self.on_open(self.path_index.absolute(rel_path))
+
+    def _status(self, results, query: str) -> str:
+        total = len(self.path_index)
+        prefix = "" if self.path_index.is_ready else "正在建立索引… "
+        if not query.strip():
+            return f"{prefix}已索引 {total} 个文件"
+        if not results:
+            return f"{prefix}没有匹配的文件"
+        more = f"（仅显示前 {QUICK_OPEN_MAX_RESULTS} 个）" if len(results) >= QUICK_OPEN_MAX_RESULTS else ""
+        return f"{prefix}{len(results)} 个结果{more}"
+
+    def _create_row(self):
+        name_text = ft.Text("", size=13, color="#e5e7eb", no_wrap=True)
+        dir_text = ft.Text("", size=10, color="#9ca3af", no_wrap=True)
+        row = ft.Container(content=ft.Column([name_text, dir_text], spacing=0),
+                           padding=ft.padding.symmetric(horizontal=8, vertical=4), border_radius=4, ink=True)
+        row.data = {"path": None, "name": name_text, "dir": dir_text}
+        row.on_click = lambda e, row=row: self._open(row.data["path"])
+        return row
+
+    def _render(self, results, query: str):
+        self._results = results
+        self._results_query = query
+        while len(self._rows) < len(results):
+            self._rows.append(self._create_row())
+        for index, rel_path in enumerate(results):
+            row = self._rows[index]
+            # 第一项即回车时打开的文件
+            bgcolor = "#374151" if index == 0 else None
+            if row.data["path"] == rel_path and row.bgcolor == bgcolor:
+                continue
+            directory, _, name = rel_path.rpartition("/")
+            row.data["path"] = rel_path
+            row.data["name"].value = name
+            row.data["dir"].value = directory or "."
+            row.bgcolor = bgcolor
+            self.ui.mark_dirty(row)
+        if len(self.results_list.controls) != len(results):
+            self.results_list.controls = self._rows[:len(results)]
+            self.ui.mark_dirty(self.results_list)
+        self.status_text.value = self._status(results, query)
+        self.ui.mark_dirty(self.status_text)
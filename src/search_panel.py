@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import flet as ft
+from pathlib import Path
+from .content_search import ContentSearch, FileSearcher
+from .ui_scheduler import get_ui_scheduler
+
+# 结果列表的高度
+SEARCH_LIST_HEIGHT = 420
+
+
+class SearchPanel:
+    """
+    在文件中查找：结果边搜索边追加到列表，可随时停止；
+    点击匹配行打开对应文件（大文件在查看器中跳转到该行）。
+    """
+
+    def __init__(self, main_page, get_scope, on_open):
+        self.main_page = main_page
+        self.ui = get_ui_scheduler(main_page)
+        self.get_scope = get_scope  # get_scope() -> (根目录, 待搜索文件的可迭代对象)
+        self.on_open = on_open  # on_open(Path, line)
+        self.search = ContentSearch()
+        self._generation = None
+        self._root = ""
+        self._match_count = 0
+
+        self.query_field = ft.TextField(hint_text="在文件中查找", autofocus=True, height=40, text_size=13,
+                                        content_padding=8, expand=True, border_color="#4b5563",
+                                        focused_border_color="#3b82f6", on_submit=lambda e: self.start_search())
+        self.case_checkbox = ft.Checkbox(label="区分大小写", value=False)
+        self.regex_checkbox = ft.Checkbox(label="正则表达式", value=False)
+        self.search_button = ft.IconButton(icon=ft.Icons.SEARCH, tooltip="搜索", on_click=lambda e: self.start_search())
+        self.stop_button = ft.IconButton(icon=ft.Icons.STOP, tooltip="停止", icon_color="#ef4444", visible=False,
+                                         on_click=lambda e: self.stop_search())
+        self.status_text = ft.Text("", size=11, color="#9ca3af")
+        self.results_list = ft.ListView(spacing=0, height=SEARCH_LIST_HEIGHT)
+        self.dialog = ft.AlertDialog(
+            title=ft.Text("在文件中查找", color="#e5e7eb", size=16),
+            content=ft.Container(
+                content=ft.Column([
+                    ft.Row([self.query_field, self.search_button, self.stop_button], spacing=4),
+                    ft.Row([self.case_checkbox, self.regex_checkbox], spacing=12),
+                    self.status_text,
+                    self.results_list,
+                ], spacing=6, tight=True),
+                width=720,
+            ),
+            bgcolor="#1f2937",
+            actions=[ft.TextButton("关闭", on_click=lambda e: self.close())],
+            on_dismiss=lambda e: self.stop_search(),
+        )
+
+    def show(self):
+        self.main_page.open(self.dialog)
+
+    def close(self):
+        self.stop_search()
+        self.main_page.close(self.dialog)
+
+    def start_search(self):
+        query = self.query_field.value or ""
+        if not query.strip():
+            return
+        try:
+            searcher = FileSearcher(query, case_sensitive=self.case_checkbox.value, use_regex=self.regex_checkbox.value)
+        except re.error as e:
+            self._set_status(f"正则表达式无效: {e}")
+            return
+        root, files = self.get_scope()
+        self._root = str(root)
+        self._match_count = 0
+        self.results_list.controls = []
+        self._set_running(True)
+        self._set_status("正在搜索…")
+        self.ui.mark_dirty(self.results_list)
+        self._generation = self.search.start(searcher, files, self._on_results, self._on_done)
+
+    def stop_search(self):
+        if self._generation is not None and not self.search.is_cancelled(self._generation):
+            self.search.cancel()
+            self._set_running(False)
+            self._set_status(f"已停止，{self._match_count} 个匹配")
+
+    def _on_results(self, batch):
+        generation = self._generation
+        rows = []
+        for path, matches in batch:
+            rows.append(self._create_file_row(path, len(matches)))
+            rows.extend(self._create_match_row(path, match) for match in matches)
+        if self.search.is_cancelled(generation):
+            return
+        self._match_count += sum(len(matches) for _, matches in batch)
+        # 只追加新行，已显示的行不重新发送
+        self.results_list.controls.extend(rows)
+        self._set_status(f"正在搜索… 已找到 {self._match_count} 个匹配")
+        self.ui.mark_dirty(self.results_list)
+
+    def _on_done(self, stats):
+        self._set_running(False)
+        truncated = "（已达到结果上限）" if stats["truncated"] else ""
+        first_hit = f"，首个结果 {stats['first_hit']:.2f} 秒" if stats["first_hit"] is not None else ""
+        self._set_status(f"{stats['files_matched']} 个文件中 {stats['matches']} 个匹配{truncated}，"
+                         f"共搜索 {stats['files_searched']} 个文件，用时 {stats['elapsed']:.2f} 秒{first_hit}")
+
+    def _set_running(self, running: bool):
+        self.search_button.visible, self.stop_button.visible = not running, running
+        self.ui.mark_dirty(self.search_button, self.stop_button)
+
+    def _set_status(self, text: str):
+        self.status_text.value = text
+        self.ui.mark_dirty(self.status_text)
+
+    def _relative(self, path: str) -> str:
+        try:
+            return os.path.relpath(path, self._root)
+        except ValueError:
+            return path
+
+    def _create_file_row(self, path: str, count: int):
+        return ft.Container(
+            content=ft.Row([
+                ft.Icon(ft.Icons.INSERT_DRIVE_FILE, size=14, color="#60a5fa"),
+                ft.Text(self._relative(path), size=12, color="#e5e7eb", weight="bold", expand=True, no_wrap=True),
+                ft.Text(str(count), size=10, color="#9ca3af"),
+            ], spacing=6),
+            padding=ft.padding.only(left=4, right=8, top=6, bottom=2),
+        )
+
+    def _create_match_row(self, path: str, match):
+        line_number, text, start, end = match
+        return ft.Container(
+            content=ft.Row([
+                ft.Text(str(line_number), size=11, color="#6b7280", width=48, text_align=ft.TextAlign.RIGHT),
+                ft.Text(spans=[
+                    ft.TextSpan(text[:start]),
+                    ft.TextSpan(text[start:end], ft.TextStyle(bgcolor="#854d0e", color="#fde68a")),
+                    ft.TextSpan(text[end:]),
+                ], size=12, color="#d1d5db", font_family="monospace", no_wrap=True, expand=True),
+            ], spacing=8),
+            padding=ft.padding.symmetric(horizontal=4, vertical=1),
+            ink=True,
+            on_click=lambda e, path=path, line=line_number: self._open(path, line),
+        )
+
+    def _open(self, path: str, line: int):
+        self.close()
+        self.on_open(Path(path), line)
@@ -1,5 +1,6 @@
 import flet as ft
 from .client import DeepSeekClient
+from .ui_scheduler import get_ui_scheduler
 import threading
 import requests
 import json
@@ -10,12 +11,19 @@ class SettingsManager:
         self.client = client
         self.current_tab = 0
         self.page = None
+        self.ui = None
         self.chat_view_ref = None  # 新增：聊天视图引用
         self._create_controls()
 
     def set_page(self, page):
         """设置页面引用"""
         self.page = page
+        self.ui = get_ui_scheduler(page)
+
+    def _mark_dirty(self, *controls):
+        """标记需要刷新的控件，由 UI 调度器统一发送"""
+        if self.ui:
+            self.ui.mark_dirty(*controls)
 
     def set_chat_view_ref(self, chat_view):
         """设置聊天视图引用"""
@@ -63,6 +71,14 @@ class SettingsManager:
                                                                                            e.control.value),
                                                 label="系统提示词", expand=True, **field_style)
 
+        # 对话上下文设置
+        self.workspace_retrieval_switch = ft.Switch(
+            value=self.client.workspace_retrieval, label="自动检索工作区代码", active_color="#4f46e5",
+            on_change=lambda e: self._on_config_change('workspace_retrieval', e.control.value))
+        self.conversation_memory_switch = ft.Switch(
+            value=self.client.conversation_memory, label="引用历史对话", active_color="#4f46e5",
+            on_change=lambda e: self._on_config_change('conversation_memory', e.control.value))
+
         # 余额查询控件
         self.balance_status = ft.Text("点击查询余额", size=12, color="#d1d5db")
         self.balance_details = ft.Text("", size=12, color="#9ca3af")
@@ -141,8 +157,7 @@ class SettingsManager:
         self.balance_details.value = ""
         self.query_balance_button.disabled = True
         self.query_balance_button.text = "查询中..."
-        if self.page:
-            self.page.update()
+        self._mark_dirty(self.balance_status, self.balance_details, self.query_balance_button)
 
         def query_in_thread():
             try:
@@ -188,13 +203,9 @@ class SettingsManager:
 
                     self.query_balance_button.disabled = False
                     self.query_balance_button.text = "查询余额"
-                    if self.page:
-                        self.page.update()
+                    self._mark_dirty(self.balance_status, self.balance_details, self.query_balance_button)
 
-                if self.page:
-                    self.page.run_thread(update_ui)
-                else:
-                    update_ui()
+                update_ui()
 
             except requests.exceptions.Timeout:
                 def update_timeout():
@@ -203,13 +214,9 @@ class SettingsManager:
                     self.balance_details.value = "请求超时，请检查网络连接"
                     self.query_balance_button.disabled = False
                     self.query_balance_button.text = "查询余额"
-                    if self.page:
-                        self.page.update()
+                    self._mark_dirty(self.balance_status, self.balance_details, self.query_balance_button)
 
-                if self.page:
-                    self.page.run_thread(update_timeout)
-                else:
-                    update_timeout()
+                update_timeout()
 
             except requests.exceptions.ConnectionError:
                 def update_connection_error():
@@ -218,13 +225,9 @@ class SettingsManager:
                     self.balance_details.value = "无法连接到API服务器"
                     self.query_balance_button.disabled = False
                     self.query_balance_button.text = "查询余额"
-                    if self.page:
-                        self.page.update()
+                    self._mark_dirty(self.balance_status, self.balance_details, self.query_balance_button)
 
-                if self.page:
-                    self.page.run_thread(update_connection_error)
-                else:
-                    update_connection_error()
+                update_connection_error()
 
             except Exception as e:
                 def update_exception():
@@ -233,13 +236,9 @@ class SettingsManager:
                     self.balance_details.value = f"异常: {str(e)}"
                     self.query_balance_button.disabled = False
                     self.query_balance_button.text = "查询余额"
-                    if self.page:
-                        self.page.update()
+                    self._mark_dirty(self.balance_status, self.balance_details, self.query_balance_button)
 
-                if self.page:
-                    self.page.run_thread(update_exception)
-                else:
-                    update_exception()
+                update_exception()
 
         threading.Thread(target=query_in_thread, daemon=True).start()
 
@@ -249,8 +248,7 @@ class SettingsManager:
         status_field.color = "#fbbf24"
         button.disabled = True
         button.text = "测试中..."
-        if self.page:
-            self.page.update()
+        self._mark_dirty(status_field, button)
 
         def test_in_thread():
             success, message = test_func()
@@ -260,13 +258,9 @@ class SettingsManager:
                 status_field.color = "#10b981" if success else "#ef4444"
                 button.disabled = False
                 button.text = button.text.replace("中...", "").replace("测试", "测试").replace("完整", "完整")
-                if self.page:
-                    self.page.update()
+                self._mark_dirty(status_field, button)
 
-            if self.page:
-                self.page.run_thread(update_ui)
-            else:
-                update_ui()
+            update_ui()
 
         threading.Thread(target=test_in_thread, daemon=True).start()
 
@@ -325,8 +319,7 @@ class SettingsManager:
             self.shortcut_status.value = "❌ 只支持 Enter 或 Ctrl+Enter"
             self.shortcut_status.color = "#ef4444"
 
-        if self.page:
-            self.page.update()
+        self._mark_dirty(self.shortcut_status)
 
     def apply_shortcut_settings(self, e=None):
         """应用快捷键设置"""
@@ -353,8 +346,7 @@ class SettingsManager:
             self.shortcut_status.value = "❌ 只支持 Enter 或 Ctrl+Enter"
             self.shortcut_status.color = "#ef4444"
 
-        if self.page:
-            self.page.update()
+        self._mark_dirty(self.shortcut_status)
 
     def create_settings_tab(self):
         """创建设置标签页UI"""
@@ -391,6 +383,14 @@ class SettingsManager:
                 ft.Text("提示词设置", size=16, weight="bold", color="#e5e7eb"),
                 self.system_prompt_field,
                 ft.Divider(color="#374151"),
+                ft.Text("对话上下文", size=16, weight="bold", color="#e5e7eb"),
+                self.workspace_retrieval_switch,
+                ft.Text("发送消息前在文件管理的根目录中检索相关代码片段并附加到请求（本地索引，首次启用时在后台建立）",
+                        size=12, color="#9ca3af"),
+                self.conversation_memory_switch,
+                ft.Text("发送消息前从已保存的历史对话中检索相关问答并附加到请求（本地索引，不联网）",
+                        size=12, color="#9ca3af"),
+                ft.Divider(color="#374151"),
                 ft.Row([ft.Container(expand=True), self.save_settings_button]),
             ], spacing=15, scroll=ft.ScrollMode.ADAPTIVE),
             padding=20, bgcolor="#1f2937", border_radius=12, border=ft.border.all(1, "#374151"), margin=10, expand=True
@@ -469,9 +469,16 @@ class SettingsManager:
         self.frequency_penalty_field.value = str(self.client.frequency_penalty)
         self.presence_penalty_field.value = str(self.client.presence_penalty)
         self.system_prompt_field.value = self.client.system_content
+        self.workspace_retrieval_switch.value = self.client.workspace_retrieval
+        self.conversation_memory_switch.value = self.client.conversation_memory
 
         # 刷新快捷键设置
         if hasattr(self.client, 'send_shortcut'):
             self.send_shortcut_field.value = self.client.send_shortcut
         else:
-            self.send_shortcut_field.value = "Enter"
\ No newline at end of file
+            self.send_shortcut_field.value = "Enter"
+
+        self._mark_dirty(self.api_key_field, self.api_base_url_field, self.model_dropdown, self.max_tokens_field,
+                         self.temperature_field, self.top_p_field, self.frequency_penalty_field,
+                         self.presence_penalty_field, self.system_prompt_field, self.workspace_retrieval_switch,
+                         self.conversation_memory_switch, self.send_shortcut_field)
\ No newline at end of file
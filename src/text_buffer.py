@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from collections import deque
+
+# 逐块比较公共前缀/后缀时每块的字符数
+DIFF_BLOCK_SIZE = 4096
+# 片段数超过该值时整理为单个片段
+MAX_PIECES = 1024
+# 紧邻上一次插入的短插入直接并入上一个片段（连续输入时避免片段数暴涨）
+MERGE_PIECE_CHARS = 1024
+# 保留的编辑记录条数，用于计算两个快照之间变化的行范围
+EDIT_LOG_SIZE = 256
+
+
+def _common_prefix_length(a: str, b: str) -> int:
+    limit = min(len(a), len(b))
+    i = 0
+    while i + DIFF_BLOCK_SIZE <= limit and a[i:i + DIFF_BLOCK_SIZE] == b[i:i + DIFF_BLOCK_SIZE]:
+        i += DIFF_BLOCK_SIZE
+    while i < limit and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _common_suffix_length(a: str, b: str, limit: int) -> int:
+    len_a, len_b = len(a), len(b)
+    i = 0
+    while i + DIFF_BLOCK_SIZE <= limit and \
+            a[len_a - i - DIFF_BLOCK_SIZE:len_a - i] == b[len_b - i - DIFF_BLOCK_SIZE:len_b - i]:
+        i += DIFF_BLOCK_SIZE
+    while i < limit and a[len_a - i - 1] == b[len_b - i - 1]:
+        i += 1
+    return i
+
+
+class _PieceSequence:
+    """
+    片段序列的只读访问。每个片段为 (source, start, length, newlines)，
+    表示 source[start:start + length]，newlines 为其中的换行符数量。
+    """
+
+    def __init__(self, pieces, length: int, newlines: int, text=None):
+        self._pieces = pieces
+        self.length = length
+        self._newlines = newlines
+        self._text = text  # 拼接后的完整文本缓存
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            pieces = self._pieces
+            if len(pieces) == 1 and pieces[0][1] == 0 and pieces[0][2] == len(pieces[0][0]):
+                self._text = pieces[0][0]
+            else:
+                self._text = "".join(source[start:start + length] for source, start, length, _ in pieces)
+        return self._text
+
+    @property
+    def line_count(self) -> int:
+        return self._newlines + 1
+
+    def offset_of_line(self, line: int) -> int:
+        """第 line 行（0 起）的起始字符偏移，超出末行时返回文本长度"""
+        if line <= 0:
+            return 0
+        if line > self._newlines:
+            return self.length
+        seen = position = 0
+        for source, start, length, newlines in self._pieces:
+            if seen + newlines >= line:
+                cursor = start
+                for _ in range(line - seen):
+                    cursor = source.find("\n", cursor, start + length) + 1
+                return position + cursor - start
+            seen += newlines
+            position += length
+        return self.length
+
+    def get_text(self, begin: int, end: int) -> str:
+        """返回 [begin, end) 范围的文本"""
+        if self._text is not None:
+            return self._text[begin:end]
+        parts, position = [], 0
+        for source, start, length, _ in self._pieces:
+            if position >= end:
+                break
+            if position + length > begin:
+                parts.append(source[start + max(begin - position, 0):start + min(end - position, length)])
+            position += length
+        return "".join(parts)
+
+    def get_lines(self, start: int, count: int):
+        """返回从第 start 行（0 起）开始的至多 count 行，不含换行符"""
+        if count <= 0 or start < 0 or start > self._newlines:
+            return []
+        lines = self.get_text(self.offset_of_line(start), self.offset_of_line(start + count)).split("\n")
+        if start + count <= self._newlines:
+            # 结束位置紧跟在换行符之后，去掉 split 产生的空尾项
+            lines.pop()
+        return lines
+
+
+class TextSnapshot(_PieceSequence):
+    """TextBuffer 某一版本的不可变快照，创建时只复制片段列表"""
+
+    def __init__(self, buffer, pieces, length: int, newlines: int, text, version: int, epoch: int):
+        super().__init__(pieces, length, newlines, text)
+        self._buffer = buffer
+        self.version = version
+        self.epoch = epoch
+
+    def changed_lines_since(self, older):
+        """
+        相对较早快照 older 变化的行范围 (first, old_end, new_end)：
+        older 的 [first, old_end) 行被替换为本快照的 [first, new_end) 行。
+        两个快照不属于同一内容或编辑记录已被丢弃时返回 None。
+        """
+        if not isinstance(older, TextSnapshot) or older._buffer is not self._buffer \
+                or older.epoch != self.epoch or older.version > self.version:
+            return None
+        return self._buffer._changed_lines(older.version, self.version)
+
+
+class TextBuffer(_PieceSequence):
+    """
+    基于片段表（piece table）的编辑器文本缓冲区。
+    插入/删除只修改片段列表，不复制整个文本；插入的文本各自作为独立的 source
+    字符串保存。维护每个片段的换行数用于行索引，并记录最近的编辑供快照之间
+    计算变化的行范围。
+    """
+
+    def __init__(self, text: str = ""):
+        super().__init__([], 0, 0, "")
+        self.version = 0
+        self.epoch = 0  # 每次 reset 递增，不同内容的快照之间不做增量比较
+        self._saved_version = 0
+        self._edit_log = deque(maxlen=EDIT_LOG_SIZE)  # (version, first, old_end, new_end)
+        self.reset(text)
+
+    # ---------------- 内容与状态 ----------------
+
+    def reset(self, text: str = "", modified: bool = False):
+        """载入新内容；modified 为 True 表示内容与磁盘上的文件不同（例如从缓存恢复）"""
+        text = text or ""
+        self._pieces = [(text, 0, len(text), text.count("\n"))] if text else []
+        self.length = len(text)
+        self._newlines = self._pieces[0][3] if text else 0
+        self._text = text
+        self.version += 1
+        self.epoch += 1
+        self._saved_version = None if modified else self.version
+        self._edit_log.clear()
+
+    @property
+    def is_modified(self) -> bool:
+        return self.version != self._saved_version
+
+    def mark_saved(self):
+        self._saved_version = self.version
+
+    def snapshot(self) -> TextSnapshot:
+        return TextSnapshot(self, tuple(self._pieces), self.length, self._newlines, self._text,
+                            self.version, self.epoch)
+
+    # ---------------- 编辑 ----------------
+
+    def insert(self, offset: int, text: str):
+        self.replace(offset, 0, text)
+
+    def delete(self, offset: int, length: int):
+        self.replace(offset, length, "")
+
+    def replace(self, offset: int, length: int, text: str):
+        """把 [offset, offset + length) 替换为 text"""
+        offset = max(0, min(offset, self.length))
+        length = max(0, min(length, self.length - offset))
+        if not length and not text:
+            return
+        index = self._split(offset)
+        end_index = self._split(offset + length)
+        first_line = sum(piece[3] for piece in self._pieces[:index])
+        removed_newlines = sum(piece[3] for piece in self._pieces[index:end_index])
+        inserted_newlines = text.count("\n")
+
+        new_pieces = []
+        if text:
+            previous = self._pieces[index - 1] if index > 0 else None
+            # 紧接在上一次插入之后的短文本并入该片段
+            if previous is not None and previous[1] == 0 and previous[2] == len(previous[0]) \
+                    and previous[2] + len(text) <= MERGE_PIECE_CHARS:
+                merged = previous[0] + text
+                index -= 1
+                new_pieces.append((merged, 0, len(merged), previous[3] + inserted_newlines))
+            else:
+                new_pieces.append((text, 0, len(text), inserted_newlines))
+        self._pieces[index:end_index] = new_pieces
+
+        self.length += len(text) - length
+        self._newlines += inserted_newlines - removed_newlines
+        self._text = None
+        self.version += 1
+        self._edit_log.append((self.version, first_line, first_line + removed_newlines + 1,
+                               first_line + inserted_newlines + 1))
+        if len(self._pieces) > MAX_PIECES:
+            self._compact()
+
+    def set_text(self, new_text: str) -> bool:
+        """
+        用完整的新文本更新缓冲区（编辑控件每次只给出完整字符串）。
+        通过公共前缀/后缀推导出单个替换编辑，内容未变化时返回 False。
+        """
+        new_text = new_text or ""
+        old_text = self.text
+        if new_text is old_text or new_text == old_text:
+            return False
+        prefix = _common_prefix_length(old_text, new_text)
+        suffix = _common_suffix_length(old_text, new_text, min(len(old_text), len(new_text)) - prefix)
+        self.replace(prefix, len(old_text) - prefix - suffix, new_text[prefix:len(new_text) - suffix])
+        # 已经持有完整文本，直接作为缓存，避免再次拼接
+        self._text = new_text
+        return True
+
+    # ---------------- 内部实现 ----------------
+
+    def _split(self, offset: int) -> int:
+        """确保 offset 处是片段边界，返回从 offset 开始的片段下标"""
+        position = 0
+        for index, (source, start, length, newlines) in enumerate(self._pieces):
+            if offset == position:
+                return index
+            if offset < position + length:
+                cut = offset - position
+                left_newlines = source.count("\n", start, start + cut)
+                self._pieces[index:index + 1] = [
+                    (source, start, cut, left_newlines),
+                    (source, start + cut, length - cut, newlines - left_newlines),
+                ]
+                return index + 1
+            position += length
+        return len(self._pieces)
+
+    def _compact(self):
+        text = self.text
+        self._pieces = [(text, 0, len(text), self._newlines)] if text else []
+
+    def _changed_lines(self, from_version: int, to_version: int):
+        if from_version == to_version:
+            return 0, 0, 0
+        entries = [entry for entry in self._edit_log if from_version < entry[0] <= to_version]
+        if len(entries) != to_version - from_version:
+            return None
+        # 依次合并编辑：first/old_end 以较早版本的行号计，new_end 以当前版本的行号计
+        _, first, old_end, new_end = entries[0]
+        for _, edit_first, edit_old_end, edit_new_end in entries[1:]:
+            if edit_old_end > new_end:
+                old_end += edit_old_end - new_end
+                new_end = edit_new_end
+            else:
+                new_end += edit_new_end - edit_old_end
+            first = min(first, edit_first)
+        return first, old_end, new_end
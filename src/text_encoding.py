@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import codecs
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+# 用于检测编码的样本大小
+ENCODING_SAMPLE_SIZE = 64 * 1024
+# 样本中 NUL 字节占比超过该值视为二进制文件
+BINARY_NUL_RATIO = 0.001
+# 编码检测结果缓存的最大条目数
+ENCODING_CACHE_SIZE = 512
+
+# 按优先级排列的字节序标记
+_BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+# 无 BOM 时依次尝试的编码，latin-1 可以解码任意字节，作为最后的兜底
+_CANDIDATES = ["utf-8", "gbk"]
+_FALLBACK = "latin-1"
+
+_cache = OrderedDict()  # (path, mtime_ns, size) -> encoding
+_cache_lock = threading.Lock()
+
+
+class BinaryFileError(ValueError):
+    """文件内容看起来是二进制数据"""
+
+
+def _decodes(sample: bytes, encoding: str) -> bool:
+    # 样本可能在多字节字符中间被截断，使用增量解码器且不要求结束
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def detect_encoding(sample: bytes) -> "str | None":
+    """
+    根据样本字节检测编码：先识别 BOM，再按 NUL 密度判断是否为二进制，
+    最后依次验证 UTF-8 / GBK。二进制数据返回 None。
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+    if sample and sample.count(b"\0") / len(sample) > BINARY_NUL_RATIO:
+        return None
+    for encoding in _CANDIDATES:
+        if _decodes(sample, encoding):
+            return encoding
+    return _FALLBACK
+
+
+def sniff_file_encoding(path: Path) -> "str | None":
+    """只读取文件开头的样本来检测编码（用于不整体读入内存的大文件）"""
+    with open(path, "rb") as f:
+        return detect_encoding(f.read(ENCODING_SAMPLE_SIZE))
+
+
+def read_text_file(path: Path):
+    """
+    读取文本文件，返回 (内容, 编码)。
+    文件只读取一次，在内存中检测并解码；编码按 (路径, 修改时间, 大小) 缓存。
+    二进制文件抛出 BinaryFileError。
+    """
+    path = Path(path)
+    stat = os.stat(path)
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    with open(path, "rb") as f:
+        data = f.read()
+
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+    if cached is not None:
+        try:
+            return data.decode(cached), cached
+        except UnicodeDecodeError:
+            pass
+
+    encoding = detect_encoding(data[:ENCODING_SAMPLE_SIZE])
+    if encoding is None:
+        raise BinaryFileError(str(path))
+    # 样本之后仍可能出现无法解码的字节，依次退回到后续候选编码
+    if encoding in _CANDIDATES:
+        candidates = _CANDIDATES[_CANDIDATES.index(encoding):] + [_FALLBACK]
+    else:
+        candidates = [encoding, _FALLBACK]
+    content = None
+    for candidate in candidates:
+        try:
+            content = data.decode(candidate)
+            encoding = candidate
+            break
+        except UnicodeDecodeError:
+            continue
+
+    with _cache_lock:
+        _cache[key] = encoding
+        _cache.move_to_end(key)
+        while len(_cache) > ENCODING_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return content, encoding
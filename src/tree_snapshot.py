@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import datetime
+import hashlib
+import json
+import os
+from pathlib import Path
+
+# 文件树快照的持久化目录（每个根目录一个文件）
+DEFAULT_SNAPSHOT_DIR = Path("./.explorer_snapshot")
+# 快照格式版本，格式不兼容时递增
+SNAPSHOT_VERSION = 1
+# 快照中最多保存的条目数，超出时不再保存更深的目录
+SNAPSHOT_MAX_ENTRIES = 50000
+
+
+class TreeSnapshotStore:
+    """
+    文件浏览器快照：展开状态以及展开目录的子项（名称、大小、修改时间）。
+    启动时先用快照渲染文件树，再在后台与文件系统校验。
+    路径以相对根目录的形式保存，"" 表示根目录本身。
+    """
+
+    def __init__(self, snapshot_dir: Path = DEFAULT_SNAPSHOT_DIR):
+        self.snapshot_dir = Path(snapshot_dir)
+
+    def _snapshot_file(self, root: Path) -> Path:
+        digest = hashlib.sha1(str(root).encode("utf-8")).hexdigest()
+        return self.snapshot_dir / f"{digest}.json"
+
+    def load(self, root: Path):
+        """返回 (directories, expanded)：directories 为 {目录绝对路径: 条目列表}；没有可用快照时返回 None"""
+        root = str(root)
+        try:
+            with open(self._snapshot_file(root), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != SNAPSHOT_VERSION or data.get("root") != root:
+            return None
+        absolute = lambda rel: os.path.join(root, rel) if rel else root
+        try:
+            directories = {absolute(rel): entries for rel, entries in data["dirs"].items()}
+            expanded = [absolute(rel) for rel in data["expanded"]]
+        except (KeyError, AttributeError, TypeError):
+            return None
+        return directories, expanded
+
+    def save(self, root: Path, directories, expanded):
+        """directories 为 FileTreeModel.export_directories 的结果（写入临时文件后替换）"""
+        root = str(root)
+        relative = lambda path: "" if path == root else os.path.relpath(path, root)
+        dirs, total = {}, 0
+        # 浅层目录优先，超出上限时舍弃更深的目录
+        for path in sorted(directories, key=lambda p: (p.count(os.sep), p)):
+            total += len(directories[path])
+            if total > SNAPSHOT_MAX_ENTRIES:
+                break
+            dirs[relative(path)] = directories[path]
+        data = {"version": SNAPSHOT_VERSION, "root": root, "saved_at": datetime.datetime.now().isoformat(),
+                "expanded": sorted(relative(path) for path in expanded if path in directories), "dirs": dirs}
+        snapshot_file = self._snapshot_file(root)
+        try:
+            self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+            temp_file = snapshot_file.with_suffix(".tmp")
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            temp_file.replace(snapshot_file)
+        except OSError as e:
+            print(f"保存文件树快照失败: {e}")
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from collections import deque
+
+# 每帧最多发送一次批量更新（约 30 FPS）
+FRAME_INTERVAL = 1 / 30
+# 统计窗口（秒）
+STATS_WINDOW = 1.0
+# 估算负载时最多遍历的控件数
+PAYLOAD_WALK_LIMIT = 5000
+
+_schedulers = {}  # id(page) -> UIUpdateScheduler
+_schedulers_lock = threading.Lock()
+
+
+def get_ui_scheduler(page):
+    """获取（必要时创建）页面对应的唯一 UI 调度器"""
+    if page is None:
+        return None
+    with _schedulers_lock:
+        scheduler = _schedulers.get(id(page))
+        if scheduler is None or scheduler.page is not page:
+            scheduler = UIUpdateScheduler(page)
+            _schedulers[id(page)] = scheduler
+        return scheduler
+
+
+class UIUpdateScheduler:
+    """
+    统一的 UI 更新调度器。
+    组件只需标记脏控件，调度线程每帧合并为一次按控件范围的 page.update(...)。
+    """
+
+    def __init__(self, page, frame_interval: float = FRAME_INTERVAL):
+        self.page = page
+        self.frame_interval = frame_interval
+        self._dirty = {}  # id(control) -> control，保持插入顺序
+        self._page_dirty = False
+        self._frame_tasks = {}  # key -> callback，在下一帧发送前执行
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+
+        # 统计信息
+        self._flush_times = deque()
+        self.total_updates = 0
+        self.total_controls_sent = 0
+        self.last_payload_size = 0
+
+        self._thread = threading.Thread(target=self._run, name="ui-scheduler", daemon=True)
+        self._thread.start()
+
+    def mark_dirty(self, *controls):
+        """标记需要同步到前端的控件"""
+        with self._lock:
+            for control in controls:
+                if control is not None:
+                    self._dirty[id(control)] = control
+        self._wakeup.set()
+
+    def request_page_update(self):
+        """标记整个页面需要更新（用于对话框、SnackBar 等页面级状态）"""
+        with self._lock:
+            self._page_dirty = True
+        self._wakeup.set()
+
+    def run_before_frame(self, key, callback):
+        """
+        在下一帧发送前调用 callback（同一 key 在一帧内只执行一次）。
+        用于高频变化的状态：事件处理中只记录最新状态，到帧边界时再一次性应用并标记脏控件。
+        """
+        with self._lock:
+            self._frame_tasks[key] = callback
+        self._wakeup.set()
+
+    def flush(self):
+        """立即在调用线程中发送所有挂起的更新"""
+        with self._lock:
+            tasks = list(self._frame_tasks.values())
+            self._frame_tasks.clear()
+        for task in tasks:
+            try:
+                task()
+            except Exception as e:
+                print(f"帧任务执行失败: {e}")
+        with self._lock:
+            controls = list(self._dirty.values())
+            page_dirty = self._page_dirty
+            self._dirty.clear()
+            self._page_dirty = False
+
+        if not controls and not page_dirty:
+            return
+
+        if page_dirty:
+            targets = []
+        else:
+            targets = self._collapse(controls)
+            if not targets:
+                return
+
+        try:
+            self.page.update(*targets)
+        except Exception as e:
+            print(f"UI 批量更新失败: {e}")
+            return
+
+        payload = self._estimate_payload(targets or [self.page])
+        now = time.monotonic()
+        with self._lock:
+            self._flush_times.append(now)
+            self.total_updates += 1
+            self.total_controls_sent += payload
+            self.last_payload_size = payload
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+
+    def get_stats(self) -> dict:
+        """返回每秒更新次数和负载大小（以发送的控件数计）"""
+        now = time.monotonic()
+        with self._lock:
+            while self._flush_times and now - self._flush_times[0] > STATS_WINDOW:
+                self._flush_times.popleft()
+            updates_per_second = len(self._flush_times) / STATS_WINDOW
+            avg_payload = self.total_controls_sent / self.total_updates if self.total_updates else 0
+            return {
+                "updates_per_second": updates_per_second,
+                "total_updates": self.total_updates,
+                "last_payload_size": self.last_payload_size,
+                "avg_payload_size": avg_payload,
+                "pending": len(self._dirty) + len(self._frame_tasks) + (1 if self._page_dirty else 0),
+            }
+
+    def _run(self):
+        next_frame = time.monotonic()
+        while not self._stopped:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            if self._stopped:
+                break
+            # 对齐到下一帧，让同一帧内的标记合并
+            now = time.monotonic()
+            if now < next_frame:
+                time.sleep(next_frame - now)
+            self.flush()
+            next_frame = time.monotonic() + self.frame_interval
+
+    @staticmethod
+    def _collapse(controls):
+        """过滤未挂载的控件，并去掉祖先已在本批次中的控件"""
+        attached = [c for c in controls if getattr(c, "page", None) is not None]
+        ids = {id(c) for c in attached}
+        result = []
+        for control in attached:
+            parent = getattr(control, "parent", None)
+            covered = False
+            while parent is not None:
+                if id(parent) in ids:
+                    covered = True
+                    break
+                parent = getattr(parent, "parent", None)
+            if not covered:
+                result.append(control)
+        return result
+
+    @staticmethod
+    def _estimate_payload(controls):
+        """估算本次更新涉及的控件数量"""
+        count, stack = 0, list(controls)
+        while stack and count < PAYLOAD_WALK_LIMIT:
+            control = stack.pop()
+            count += 1
+            get_children = getattr(control, "_get_children", None)
+            if get_children:
+                try:
+                    stack.extend(get_children())
+                except Exception:
+                    pass
+        return count
+
+
+class IdleDebouncer:
+    """
+    空闲去抖器：多次 poke() 只在最后一次之后静默 delay 秒时调用一次 callback。
+    使用单个常驻线程，不会为每次调用创建定时器。
+    """
+
+    def __init__(self, callback, delay: float, name: str = "idle-debouncer"):
+        self.callback = callback
+        self.delay = delay
+        self._deadline = None
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def poke(self):
+        with self._condition:
+            self._deadline = time.monotonic() + self.delay
+            self._condition.notify()
+
+    def cancel(self):
+        with self._condition:
+            self._deadline = None
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped and (self._deadline is None or time.monotonic() < self._deadline):
+                    timeout = None if self._deadline is None else self._deadline - time.monotonic()
+                    self._condition.wait(timeout)
+                if self._stopped:
+                    return
+                self._deadline = None
+            try:
+                self.callback()
+            except Exception as e:
+                print(f"去抖回调执行失败: {e}")
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import heapq
+import math
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import chain
+from operator import itemgetter
+from pathlib import Path
+from .content_search import iter_workspace_files
+from .file_context import ChunkCache, estimate_tokens, extract_terms
+from .ignore_rules import IGNORE_FILE_NAMES
+from .text_encoding import ENCODING_SAMPLE_SIZE, detect_encoding
+from .ui_scheduler import IdleDebouncer
+
+# 只索引不超过该大小的文本文件
+RETRIEVAL_MAX_FILE_SIZE = 512 * 1024
+# BM25 参数
+BM25_K1, BM25_B = 1.2, 0.75
+# 每个查询词最多使用的倒排项数：倒排表按权重降序保存，只取权重最高的部分（与文件总数无关）
+RETRIEVAL_POSTINGS_LIMIT = 4000
+# 倒排表末尾未排序的新增项超过该数量时整体重新排序
+POSTINGS_RESORT_TAIL = 1024
+# 每次查询最多使用的词项数（按 idf 从高到低）
+RETRIEVAL_MAX_QUERY_TERMS = 12
+# 参与片段精排的候选文件数、最终附加的片段数
+RETRIEVAL_CANDIDATE_FILES = 8
+RETRIEVAL_TOP_CHUNKS = 6
+# 检索结果最多占用的 token 数
+RETRIEVAL_MAX_TOKENS = 6000
+# 文件变化后空闲多久开始读取新内容（秒），突发的变化合并处理
+RETRIEVAL_UPDATE_DELAY = 0.2
+# 过长的词项（哈希、base64 等）不索引
+RETRIEVAL_MAX_TERM_LENGTH = 40
+# 代码和英文中过于常见、几乎不区分文档的词
+_STOPWORDS = frozenset("""
+self cls def class return import from as if else elif for while in is not and or none true false try except
+finally with pass break continue lambda yield raise del global assert this new var let const function null
+void int str the of to a an be are was were it its on at by this that we you he they or
+""".split())
+
+
+def _bm25_weight(tf: int, length: int, average_length: float) -> float:
+    return tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / average_length))
+
+
+def _index_terms(text: str) -> Counter:
+    return Counter(term for term in extract_terms(text)
+                   if term not in _STOPWORDS and len(term) <= RETRIEVAL_MAX_TERM_LENGTH)
+
+
+def _read_terms(path: str):
+    """读取文件并统计词项；过大、二进制或无法读取时返回 None"""
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size > RETRIEVAL_MAX_FILE_SIZE:
+                return None
+            data = f.read()
+    except OSError:
+        return None
+    encoding = detect_encoding(data[:ENCODING_SAMPLE_SIZE])
+    if encoding is None:
+        return None
+    return _index_terms(data.decode(encoding, errors="replace"))
+
+
+class _Postings:
+    """
+    单个词项的倒排表。前 sorted_count 项按 BM25 权重降序排列并缓存权重，
+    之后是新增的未排序项；查询时只看前 RETRIEVAL_POSTINGS_LIMIT 项和未排序的尾部。
+    """
+
+    __slots__ = ("ids", "tfs", "weights", "sorted_count")
+
+    def __init__(self):
+        self.ids = array("I")
+        self.tfs = array("H")
+        self.weights = array("f")
+        self.sorted_count = 0
+
+    def append(self, doc_id: int, tf: int):
+        self.ids.append(doc_id)
+        self.tfs.append(min(tf, 65535))
+
+    def top(self, state, limit: int):
+        """按权重从高到低返回至多 limit 个已排序项以及全部未排序项: (doc_id, weight)"""
+        if len(self.ids) - self.sorted_count > POSTINGS_RESORT_TAIL:
+            self._resort(state)
+        head = zip(self.ids[:min(limit, self.sorted_count)], self.weights[:limit])
+        if self.sorted_count == len(self.ids):
+            return head
+        lengths, average = state.lengths, state.average_length
+        tail = ((doc_id, _bm25_weight(tf, lengths[doc_id], average))
+                for doc_id, tf in zip(self.ids[self.sorted_count:], self.tfs[self.sorted_count:]))
+        return chain(head, tail)
+
+    def _resort(self, state):
+        """重新计算权重并排序，同时丢弃已删除文件的项"""
+        paths, lengths, average = state.paths, state.lengths, state.average_length
+        entries = sorted(((_bm25_weight(tf, lengths[doc_id], average), doc_id, tf)
+                          for doc_id, tf in zip(self.ids, self.tfs) if paths[doc_id] is not None), reverse=True)
+        self.weights = array("f", (entry[0] for entry in entries))
+        self.ids = array("I", (entry[1] for entry in entries))
+        self.tfs = array("H", (entry[2] for entry in entries))
+        self.sorted_count = len(entries)
+
+
+class _RetrievalState:
+    """文件级倒排索引。文件 id 递增分配，删除只做标记，对应的倒排项在重新排序时清理。"""
+
+    def __init__(self):
+        self.paths = []  # id -> 绝对路径，已删除为 None
+        self.ids = {}  # 绝对路径 -> id
+        self.lengths = array("I")  # id -> 词项总数
+        self.total_length = 0
+        self.postings = {}  # 词项 -> _Postings
+        self.sorted_paths = []  # 按字典序排列的路径（可能含已删除的路径），删除目录时二分查找其下的文件
+        self._unsorted_paths = []  # 新增的、尚未并入 sorted_paths 的路径
+
+    @property
+    def average_length(self) -> float:
+        return self.total_length / len(self.ids) if self.ids else 1.0
+
+    def add(self, path: str, counts: Counter):
+        if not self.remove(path):
+            self._unsorted_paths.append(path)
+        doc_id = len(self.paths)
+        length = sum(counts.values())
+        self.paths.append(path)
+        self.ids[path] = doc_id
+        self.lengths.append(length)
+        self.total_length += length
+        for term, tf in counts.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = _Postings()
+            postings.append(doc_id, tf)
+
+    def remove(self, path: str) -> bool:
+        doc_id = self.ids.pop(path, None)
+        if doc_id is None:
+            return False
+        self.paths[doc_id] = None
+        self.total_length -= self.lengths[doc_id]
+        return True
+
+    def remove_prefix(self, prefix: str) -> int:
+        """删除 prefix（以路径分隔符结尾）下的所有文件"""
+        if self._unsorted_paths:
+            # 两段有序数据归并为线性时间；同时去掉重复和已删除的路径
+            paths = self.sorted_paths + sorted(self._unsorted_paths)
+            paths.sort()
+            ids = self.ids
+            self.sorted_paths = [path for path, previous in zip(paths, [None] + paths)
+                                 if path != previous and path in ids]
+            self._unsorted_paths = []
+        paths = self.sorted_paths
+        start = end = bisect_left(paths, prefix)
+        while end < len(paths) and paths[end].startswith(prefix):
+            end += 1
+        return sum(self.remove(path) for path in paths[start:end])
+
+    def idf(self, term: str) -> float:
+        postings = self.postings.get(term)
+        if postings is None:
+            return 0.0
+        # 文档频率包含尚未清理的已删除项，只会略微低估 idf
+        total, frequency = len(self.ids), min(len(postings.ids), len(self.ids))
+        return math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+
+    def search(self, terms, limit: int):
+        """返回 (按 BM25 得分排序的 [(路径, 得分)], {词项: idf})"""
+        weighted = sorted(((self.idf(term), term) for term in set(terms) if term in self.postings), reverse=True)
+        weighted = weighted[:RETRIEVAL_MAX_QUERY_TERMS]
+        scores, paths = {}, self.paths
+        for idf, term in weighted:
+            for doc_id, weight in self.postings[term].top(self, RETRIEVAL_POSTINGS_LIMIT):
+                if paths[doc_id] is not None:
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * weight
+        best = heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+        return [(paths[doc_id], score) for doc_id, score in best], {term: idf for idf, term in weighted}
+
+
+class WorkspaceIndex:
+    """
+    工作区代码检索索引（BM25，完全离线）。
+    启用后在后台遍历根目录建立文件级倒排索引，之后由文件系统事件增量维护；
+    查询时先按文件打分，再把候选文件切分为片段精排，返回 token 预算内最相关的片段。
+    """
+
+    def __init__(self, root: Path, ignore_rules=None):
+        self.root = Path(root).resolve()
+        self.ignore_rules = ignore_rules
+        self.generation = 0
+        self.started = False
+        self.is_ready = False  # 当前根目录的完整扫描已完成
+        self.build_seconds = None
+        self.chunk_cache = ChunkCache()
+        self._lock = threading.Lock()
+        self._state = _RetrievalState()
+        # 文件系统事件只在事件线程中记录待更新的路径，由索引自己的线程读取文件内容
+        self._pending_paths = {}  # 路径 -> None，保持到达顺序
+        self._update_debouncer = IdleDebouncer(self._apply_pending, RETRIEVAL_UPDATE_DELAY, "workspace-index-update")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._state.ids)
+
+    # ---------------- 生命周期 ----------------
+
+    def start(self):
+        """首次启用时在后台建立索引；已启动时不做任何事"""
+        if not self.started:
+            self.started = True
+            self._start_build()
+
+    def reset(self, root: Path, ignore_rules=None):
+        self.root = Path(root).resolve()
+        self.ignore_rules = ignore_rules
+        if self.started:
+            self._start_build()
+
+    def stop(self):
+        self._update_debouncer.stop()
+        with self._lock:
+            self.generation += 1
+
+    def _start_build(self):
+        with self._lock:
+            self.generation += 1
+            generation = self.generation
+            self._state = _RetrievalState()
+            self._pending_paths = {}
+            self.is_ready = False
+        threading.Thread(target=self._build, args=(generation,), name="workspace-index-build", daemon=True).start()
+
+    def _build(self, generation: int):
+        # 边遍历边写入当前状态，建立期间的查询可以使用已索引的部分；
+        # 期间到达的事件直接应用，遍历稍后读到同一文件时会替换为最新内容
+        started = time.monotonic()
+        cancelled = lambda: self.generation != generation
+        for path in iter_workspace_files(self.root, self.ignore_rules, cancelled):
+            self._index_file(path, generation)
+        with self._lock:
+            if not cancelled():
+                self.is_ready = True
+                self.build_seconds = time.monotonic() - started
+
+    def _index_file(self, path: str, generation: int):
+        counts = _read_terms(path)
+        with self._lock:
+            if self.generation != generation:
+                return
+            if counts:
+                self._state.add(path, counts)
+            else:
+                self._state.remove(path)
+
+    # ---------------- 增量更新 ----------------
+
+    def apply_events(self, events):
+        """应用合并后的文件系统事件 [(event_type, path, dest_path, is_directory), ...]"""
+        if not self.started:
+            return
+        if any(os.path.basename(event[1]) in IGNORE_FILE_NAMES for event in events):
+            self._start_build()
+            return
+        with self._lock:
+            for event_type, path, _, is_directory in events:
+                # 已索引文件的删除直接生效；其余变化需要访问磁盘，交给更新线程
+                if event_type == "deleted" and not is_directory and self._state.remove(path):
+                    self._pending_paths.pop(path, None)
+                else:
+                    self._pending_paths[path] = None
+        self._update_debouncer.poke()
+
+    def rescan_directories(self, directories):
+        """事件溢出后重新索引受影响的目录"""
+        if not self.started:
+            return
+        with self._lock:
+            self._pending_paths.update(dict.fromkeys(directories))
+        self._update_debouncer.poke()
+
+    def _apply_pending(self):
+        """在更新线程中按到达顺序处理待更新的路径"""
+        while True:
+            with self._lock:
+                if not self._pending_paths:
+                    return
+                path = next(iter(self._pending_paths))
+                del self._pending_paths[path]
+                generation = self.generation
+            if os.path.isdir(path):
+                # 目录可能替换了同名文件，或者其下的文件已在溢出期间变化
+                with self._lock:
+                    if self.generation == generation:
+                        self._state.remove(path)
+                        self._state.remove_prefix(path + os.sep)
+                self._index_directory(path, generation)
+            elif os.path.isfile(path):
+                if not (self.ignore_rules and self.ignore_rules.is_ignored(path, False)):
+                    self._index_file(path, generation)
+            else:
+                with self._lock:
+                    if self.generation == generation and not self._state.remove(path):
+                        self._state.remove_prefix(path + os.sep)
+
+    def _index_directory(self, directory: str, generation: int):
+        for path in iter_workspace_files(directory, self.ignore_rules, lambda: self.generation != generation):
+            self._index_file(path, generation)
+
+    # ---------------- 查询 ----------------
+
+    def search(self, query: str, limit: int = RETRIEVAL_CANDIDATE_FILES):
+        """按 BM25 得分返回最相关的文件 [(绝对路径, 得分), ...]"""
+        with self._lock:
+            return self._state.search(_index_terms(query), limit)[0]
+
+    def retrieve(self, query: str, budget: int, exclude=()):
+        """返回 token 预算内与 query 最相关的片段，格式化为上下文文本；没有相关内容时返回 None"""
+        with self._lock:
+            files, idf = self._state.search(_index_terms(query), RETRIEVAL_CANDIDATE_FILES + len(exclude))
+        if not idf:
+            return None
+        exclude = set(exclude)
+        candidates = []
+        for path, _ in files:
+            if path in exclude:
+                continue
+            try:
+                candidates.extend(self.chunk_cache.get_chunks(path))
+            except Exception:
+                continue
+            if len({chunk.path for chunk in candidates}) >= RETRIEVAL_CANDIDATE_FILES:
+                break
+        if not candidates:
+            return None
+        # 片段精排：使用全局 idf，长度按候选片段归一化
+        lengths = [sum(chunk.terms.values()) or 1 for chunk in candidates]
+        average = sum(lengths) / len(lengths)
+        scored = []
+        for chunk, length in zip(candidates, lengths):
+            score = sum(weight * _bm25_weight(chunk.terms[term], length, average)
+                        for term, weight in idf.items() if term in chunk.terms)
+            if score > 0:
+                scored.append((score, chunk))
+        scored.sort(key=itemgetter(0), reverse=True)
+
+        budget = min(budget, RETRIEVAL_MAX_TOKENS) - 40
+        selected, used = [], 0
+        for _, chunk in scored:
+            cost = chunk.tokens + estimate_tokens(chunk.path) + 12
+            if used + cost <= budget:
+                selected.append(chunk)
+                used += cost
+                if len(selected) >= RETRIEVAL_TOP_CHUNKS:
+                    break
+        if not selected:
+            return None
+        selected.sort(key=lambda chunk: (chunk.path, chunk.start_line))
+        parts = ["以下是从当前工作区自动检索到的、可能与问题相关的代码片段（仅供参考）："]
+        for chunk in selected:
+            relative = os.path.relpath(chunk.path, self.root)
+            parts.append(f"### {relative}（第 {chunk.start_line}-{chunk.end_line} 行）\n```\n{chunk.text}\n```")
+        return "\n\n".join(parts)
+
+
+class WorkspaceRetriever:
+    """DeepSeekClient 的上下文提供者：启用时从工作区索引检索相关片段"""
+
+    def __init__(self, index: WorkspaceIndex, is_enabled, exclude=None):
+        self.index = index
+        self.is_enabled = is_enabled  # is_enabled() -> bool，对应设置中的开关
+        self.exclude = exclude  # exclude() -> 已经作为附件发送的文件路径
+
+    def __call__(self, prompt: str, budget: int):
+        if not self.is_enabled():
+            return None
+        self.index.start()
+        exclude = self.exclude() if self.exclude else ()
+        return self.index.retrieve(prompt, budget, exclude)
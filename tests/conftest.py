@@ -0,0 +1,8 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+from pathlib import Path
+
+# 测试通过 src.<模块> 导入，只覆盖不依赖 flet / watchdog / requests 的模块
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import codecs
+import re
+import threading
+import pytest
+from src import content_search
+from src.content_search import ContentSearch, FileSearcher, iter_workspace_files
+from src.ignore_rules import IgnoreRules
+
+
+def _lines(result):
+    return [(line, text[start:end]) for line, text, start, end in result[1]] if result else []
+
+
+def test_gbk_trail_bytes_do_not_match_ascii(tmp_path):
+    path = tmp_path / "gbk.txt"
+    # "丄" 为 b"\x81A"，"癮" 为 b"\xb0a"：尾字节与 ASCII 字母相同
+    path.write_bytes("中文丄癮\n第二行 Abc\n".encode("gbk"))
+    assert _lines(FileSearcher("a").search_file(str(path))) == [(2, "A")]
+    assert _lines(FileSearcher("abc", case_sensitive=True).search_file(str(path))) == []
+    assert _lines(FileSearcher("癮").search_file(str(path))) == [(1, "癮")]
+
+
+def test_utf8_and_bom_files(tmp_path):
+    utf8 = tmp_path / "utf8.py"
+    utf8.write_bytes("# 注释\r\nvalue = 'Hello'\r\n".encode("utf-8"))
+    assert _lines(FileSearcher("hello").search_file(str(utf8))) == [(2, "Hello")]
+    assert FileSearcher("hello").search_file(str(utf8))[1][0][1] == "value = 'Hello'"
+
+    utf16 = tmp_path / "utf16.txt"
+    utf16.write_bytes(codecs.BOM_UTF16_LE + "first\nsecond 中文\n".encode("utf-16-le"))
+    assert _lines(FileSearcher("中文").search_file(str(utf16))) == [(2, "中文")]
+
+
+def test_regex_and_binary_files(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("foo1\nbar\nfoo22\n")
+    assert _lines(FileSearcher(r"foo\d+", use_regex=True).search_file(str(path))) == [(1, "foo1"), (3, "foo22")]
+    # 非正则模式按字面查找
+    assert FileSearcher("foo\\d+").search_file(str(path)) is None
+    with pytest.raises(re.error):
+        FileSearcher("(", use_regex=True)
+
+    binary = tmp_path / "a.bin"
+    binary.write_bytes(b"foo\0" * 100)
+    assert FileSearcher("foo").search_file(str(binary)) is None
+
+
+def test_large_file_uses_mmap_and_counts_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(content_search, "SEARCH_MMAP_THRESHOLD", 10)
+    path = tmp_path / "big.txt"
+    path.write_text("".join(f"line {i}\n" for i in range(100)) + "needle here\nneedle again")
+    assert _lines(FileSearcher("needle").search_file(str(path))) == [(101, "needle"), (102, "needle")]
+
+
+def test_iter_workspace_files_respects_ignore_rules(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "a.py").write_text("")
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "node_modules" / "b.js").write_text("")
+    (tmp_path / "top.py").write_text("")
+    files = list(iter_workspace_files(tmp_path, IgnoreRules(tmp_path)))
+    # 广度优先：浅层文件先出现
+    assert files == [str(tmp_path / "top.py"), str(tmp_path / "pkg" / "a.py")]
+
+
+def test_content_search_streams_results(tmp_path):
+    for index in range(20):
+        (tmp_path / f"f{index}.txt").write_text("match\n" if index % 2 else "nothing\n")
+    search = ContentSearch(max_workers=4)
+    results, done = [], threading.Event()
+    stats = {}
+    search.start(FileSearcher("match"), iter_workspace_files(tmp_path), results.extend,
+                 lambda s: (stats.update(s), done.set()))
+    assert done.wait(5)
+    search.shutdown()
+    assert len(results) == 10 and stats["files_searched"] == 20 and stats["matches"] == 10
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import time
+import pytest
+from src import conversation_memory
+from src.conversation_memory import ConversationMemory
+
+PARSER_HISTORY = [
+    ("user", "How does the tokenizer handle unicode escapes in string literals?"),
+    ("assistant", "The tokenizer decodes unicode escapes while scanning string literals."),
+]
+DEPLOY_HISTORY = [
+    ("user", "Which docker compose file configures the nginx reverse proxy?"),
+    ("assistant", "The nginx reverse proxy is configured in deploy/compose.yaml."),
+]
+
+
+def _save(path, history, name):
+    path.write_text(json.dumps({"metadata": {"name": name}, "history": [list(item) for item in history]}),
+                    encoding="utf-8")
+
+
+def _wait_ready(memory: ConversationMemory):
+    deadline = time.monotonic() + 5
+    while not memory.is_ready and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert memory.is_ready
+
+
+@pytest.fixture
+def conversations(tmp_path):
+    _save(tmp_path / "parser.json", PARSER_HISTORY, "词法分析")
+    _save(tmp_path / "deploy.json", DEPLOY_HISTORY, "部署")
+    return tmp_path
+
+
+@pytest.fixture(params=[True, False], ids=["vectors", "bm25"])
+def memory(request, conversations):
+    memory = ConversationMemory(conversations, use_vectors=request.param)
+    memory.start()
+    _wait_ready(memory)
+    return memory
+
+
+def test_load_and_rank_relevant_exchange(memory, conversations):
+    assert len(memory) == 2
+    results = memory.search("tokenizer unicode escapes")
+    assert [exchange.name for _, exchange in results] == ["词法分析"]
+    assert results[0][1].path == str(conversations / "parser.json")
+    results = memory.search("nginx reverse proxy")
+    assert [exchange.name for _, exchange in results] == ["部署"]
+
+
+def test_irrelevant_query_is_below_threshold(memory):
+    # 只命中一个常见词、覆盖率低于门槛的问题不应注入任何历史
+    assert memory.search("what is the weather forecast for tomorrow in the file") == []
+    # 只包含停用词的问题没有可检索的词项
+    assert memory.search("how can you do this please") == []
+
+
+def test_coverage_threshold(monkeypatch, conversations):
+    memory = ConversationMemory(conversations, use_vectors=False)
+    memory.start()
+    _wait_ready(memory)
+    # 四个词中只命中 tokenizer：默认门槛下被过滤，放宽门槛后可以命中
+    query = "tokenizer kubernetes helm grafana"
+    assert memory.search(query) == []
+    monkeypatch.setattr(conversation_memory, "MEMORY_MIN_COVERAGE", 0.1)
+    assert [exchange.name for _, exchange in memory.search(query)] == ["词法分析"]
+
+
+def test_update_file_appends_and_reuses_prefix(memory, conversations):
+    path = conversations / "parser.json"
+    old_ids = list(memory._files[str(path)][1])
+    history = PARSER_HISTORY + [
+        ("user", "Why are heredoc delimiters matched case sensitively?"),
+        ("assistant", "Heredoc delimiters must match exactly."),
+    ]
+    _save(path, history, "词法分析")
+    memory.update_file(path, history)
+    ids = memory._files[str(path)][1]
+    assert len(memory) == 3
+    assert ids[0] == old_ids[0] and len(ids) == 2
+    results = memory.search("heredoc delimiters")
+    assert results[0][1].question.startswith("Why are heredoc")
+    assert results[0][1].name == "词法分析"
+    # 修改已有问答时重建该文件的全部问答，旧内容不再可检索
+    history = [("user", "How are heredoc delimiters parsed?"), ("assistant", "Line by line.")]
+    _save(path, history, "词法分析")
+    memory.update_file(path, history, name="Heredoc")
+    assert len(memory) == 2
+    assert memory.search("tokenizer unicode escapes") == []
+    assert [exchange.name for _, exchange in memory.search("heredoc delimiters")] == ["Heredoc"]
+
+
+def test_rename_and_remove_file(memory, conversations):
+    old_path, new_path = conversations / "deploy.json", conversations / "ops.json"
+    memory.rename_file(old_path, new_path, name="运维")
+    results = memory.search("nginx reverse proxy")
+    assert [(exchange.path, exchange.name) for _, exchange in results] == [(str(new_path), "运维")]
+    memory.remove_file(new_path)
+    assert len(memory) == 1
+    assert memory.search("nginx reverse proxy") == []
+    assert not any(str(new_path) == exchange.path for exchange in memory._exchanges.values())
+    # 删除后倒排表中不残留该问答的词项
+    assert "nginx" not in memory._postings
+
+
+def test_update_before_start_is_ignored(conversations):
+    memory = ConversationMemory(conversations)
+    memory.update_file(conversations / "parser.json", PARSER_HISTORY)
+    assert len(memory) == 0
+
+
+def test_call_excludes_current_file_and_respects_budget(conversations):
+    current = {"path": None}
+    memory = ConversationMemory(conversations, current_file=lambda: current["path"])
+    memory.start()
+    _wait_ready(memory)
+    text = memory("How does the tokenizer handle unicode escapes?", 4000)
+    assert "《词法分析》" in text and "《部署》" not in text
+    # 当前对话的内容已在历史中，不重复注入
+    current["path"] = conversations / "parser.json"
+    assert memory("How does the tokenizer handle unicode escapes?", 4000) is None
+    # 预算不足以容纳一组问答时不注入
+    current["path"] = None
+    assert memory("How does the tokenizer handle unicode escapes?", 80) is None
+
+
+def test_call_truncates_long_answer(tmp_path):
+    history = [("user", "Explain the tokenizer unicode escapes"), ("assistant", "unicode escapes " * 2000)]
+    _save(tmp_path / "long.json", history, "长回答")
+    memory = ConversationMemory(tmp_path)
+    memory.start()
+    _wait_ready(memory)
+    text = memory("tokenizer unicode escapes", 600)
+    assert text.endswith("（已截断）")
+    assert conversation_memory.estimate_tokens(text) <= 600
+
+
+def test_call_disabled_does_not_load(conversations):
+    memory = ConversationMemory(conversations, is_enabled=lambda: False)
+    assert memory("tokenizer unicode escapes", 4000) is None
+    assert not memory.started
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pytest
+from src.dirty_buffer_store import DirtyBufferStore
+
+
+@pytest.fixture
+def make_store(tmp_path):
+    stores = []
+
+    def create(**kwargs):
+        # 同步延迟设得很长，测试中只在显式 sync()/close() 时写恢复文件
+        options = {"swap_dir": tmp_path / "swap", "sync_delay": 3600}
+        options.update(kwargs)
+        stores.append(DirtyBufferStore(**options))
+        return stores[-1]
+
+    yield create
+    for store in stores:
+        store._sync_debouncer.stop()
+
+
+def test_dict_interface(make_store):
+    store = make_store()
+    store["a.py"] = "one"
+    store["b.py"] = "two"
+    assert "a.py" in store and len(store) == 2
+    assert store["a.py"] == "one" and store.get("missing") is None
+    assert store.pop("a.py") == "one" and "a.py" not in store
+    del store["b.py"]
+    assert len(store) == 0
+    with pytest.raises(KeyError):
+        store["b.py"]
+
+
+def test_least_recently_used_buffers_spill_to_disk(make_store, tmp_path):
+    store = make_store(max_entries=2)
+    store["a.py"] = "A"
+    store["b.py"] = "B"
+    store["a.py"]  # a 变为最近使用
+    store["c.py"] = "C"
+    stats = store.get_stats()
+    assert stats["in_memory"] == 2 and stats["spilled"] == 1
+    assert len(list((tmp_path / "swap").glob("*.json"))) == 1
+    # 读取溢出的缓冲区时重新调入内存，另一个被换出
+    assert store["b.py"] == "B"
+    assert store.get_stats()["spilled"] == 1
+    assert sorted(store.keys()) == ["a.py", "b.py", "c.py"]
+
+
+def test_memory_limit_keeps_most_recent_buffer(make_store):
+    store = make_store(memory_limit=1)
+    store["a.py"] = "x" * 1000
+    store["b.py"] = "y" * 1000
+    assert store.get_stats()["in_memory"] == 1
+    assert store["a.py"] == "x" * 1000 and store["b.py"] == "y" * 1000
+
+
+def test_recover_after_crash(make_store, tmp_path):
+    store = make_store()
+    store["a.py"] = "unsaved A"
+    store["b.py"] = "unsaved B"
+    store.sync()
+    # 模拟崩溃：不调用 close()，直接用新实例读取交换目录
+    recovered = make_store()
+    assert sorted(recovered.recover()) == ["a.py", "b.py"]
+    assert recovered.get_stats()["in_memory"] == 0
+    assert recovered["a.py"] == "unsaved A"
+
+
+def test_discard_removes_recovery_file(make_store, tmp_path):
+    store = make_store()
+    store["a.py"] = "A"
+    store.close()
+    assert len(list((tmp_path / "swap").glob("*.json"))) == 1
+    store.pop("a.py")
+    assert list((tmp_path / "swap").glob("*.json")) == []
+    assert make_store().recover() == []
+
+
+def test_unsynced_edit_is_written_when_spilled(make_store):
+    store = make_store(max_entries=1)
+    store["a.py"] = "old"
+    store.sync()
+    store["a.py"] = "new"
+    store["b.py"] = "B"
+    # a 被换出时写入的是最新内容，而不是上次同步的旧内容
+    recovered = make_store()
+    recovered.recover()
+    assert recovered["a.py"] == "new"
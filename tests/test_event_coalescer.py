@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+import pytest
+
+pytest.importorskip("watchdog")
+from src.file_monitor import EventCoalescer
+
+
+class _Recorder:
+    """收集合并后的批次；push 完成后由 wait() 等待下一批应用"""
+
+    def __init__(self, **kwargs):
+        self.batches, self.rescans = [], []
+        self._applied = threading.Event()
+        options = {"quiet_period": 0.05, "max_delay": 2.0, "min_interval": 0.0}
+        options.update(kwargs)
+        self.coalescer = EventCoalescer(self._apply, self._rescan, **options)
+
+    def _apply(self, events):
+        self.batches.append(events)
+        self._applied.set()
+
+    def _rescan(self, directories):
+        self.rescans.append(directories)
+        self._applied.set()
+
+    def wait(self):
+        assert self._applied.wait(2.0)
+        self._applied.clear()
+
+
+@pytest.fixture
+def recorder():
+    recorders = []
+
+    def create(**kwargs):
+        recorders.append(_Recorder(**kwargs))
+        return recorders[-1]
+
+    yield create
+    for item in recorders:
+        item.coalescer.stop()
+
+
+def test_create_modify_delete_cancels_out(recorder):
+    rec = recorder()
+    push = rec.coalescer.push
+    push("created", "/w/a.txt")
+    push("modified", "/w/a.txt")
+    push("deleted", "/w/a.txt")
+    push("created", "/w/b.txt")
+    rec.wait()
+    assert rec.batches == [[("created", "/w/b.txt", None, False)]]
+    assert rec.coalescer.get_stats()["events_coalesced"] == 2
+
+
+def test_sequences_collapse_to_one_event_per_path(recorder):
+    rec = recorder()
+    push = rec.coalescer.push
+    push("created", "/w/new.txt")
+    push("modified", "/w/new.txt")
+    push("deleted", "/w/replaced")
+    push("created", "/w/replaced", is_directory=True)
+    push("modified", "/w/edited.txt")
+    push("closed", "/w/edited.txt")
+    push("closed", "/w/closed.txt")
+    rec.wait()
+    assert rec.batches == [[("created", "/w/new.txt", None, False),
+                            ("modified", "/w/replaced", None, True),
+                            ("modified", "/w/edited.txt", None, False),
+                            ("modified", "/w/closed.txt", None, False)]]
+
+
+def test_move_splits_into_delete_and_create(recorder):
+    rec = recorder()
+    rec.coalescer.push("moved", "/w/old.txt", "/w/new.txt")
+    rec.coalescer.push("opened", "/w/ignored.txt")
+    rec.wait()
+    assert rec.batches == [[("deleted", "/w/old.txt", None, False), ("created", "/w/new.txt", None, False)]]
+
+
+def test_overflow_switches_to_directory_rescan(recorder):
+    rec = recorder(max_pending=3)
+    for index in range(3):
+        rec.coalescer.push("created", f"/w/a/{index}.txt")
+    rec.coalescer.push("created", "/w/b/x.txt")
+    # 溢出后同一批内的新事件也只记录目录
+    rec.coalescer.push("modified", "/w/c/y.txt")
+    rec.wait()
+    assert rec.batches == []
+    assert rec.rescans == [{os.path.dirname(path) for path in ("/w/a/0.txt", "/w/b/x.txt", "/w/c/y.txt")}]
+    assert rec.coalescer.get_stats()["overflows"] == 1
+
+
+def test_clear_discards_pending_events(recorder):
+    rec = recorder(quiet_period=0.3)
+    rec.coalescer.push("created", "/w/dropped.txt")
+    rec.coalescer.clear()
+    rec.coalescer.push("created", "/w/kept.txt")
+    rec.wait()
+    assert rec.batches == [[("created", "/w/kept.txt", None, False)]]
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from src import file_context
+from src.file_context import ChunkCache, FileAttachments, chunk_text, estimate_tokens, extract_terms
+
+
+def _source(functions: int, body_lines: int = 30) -> str:
+    blocks = []
+    for index in range(functions):
+        body = "\n".join(f"    value_{index} = compute_{index}({line})" for line in range(body_lines))
+        blocks.append(f"def function_{index}():\n{body}\n")
+    return "\n".join(blocks)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("a" * 10) == 3
+    assert estimate_tokens("中" * 10) == 6
+
+
+def test_extract_terms_splits_identifiers_and_cjk():
+    terms = extract_terms("parseHTTPResponse snake_case_name 文件编码")
+    assert {"parsehttpresponse", "parse", "http", "response"} <= set(terms)
+    assert {"snake_case_name", "snake", "case", "name"} <= set(terms)
+    assert {"文件", "件编", "编码"} <= set(terms)
+
+
+def test_chunks_cover_file_and_break_at_boundaries():
+    text = _source(6)
+    chunks = chunk_text("a.py", text)
+    lines = text.split("\n")
+    # 末尾换行产生的空行不单独成片段
+    assert chunks[0].start_line == 1 and chunks[-1].end_line == len(lines) - 1
+    for previous, current in zip(chunks, chunks[1:]):
+        assert current.start_line == previous.end_line + 1
+        # 在空行或顶格定义处切开
+        first_line = lines[current.start_line - 1]
+        assert not first_line.strip() or not first_line[0].isspace()
+    assert all(chunk.end_line - chunk.start_line < file_context.CHUNK_MAX_LINES for chunk in chunks)
+
+
+def test_overlong_lines_are_truncated():
+    chunks = chunk_text("min.js", "x" * (file_context.CHUNK_MAX_CHARS * 3))
+    assert len(chunks) == 1 and "已截断" in chunks[0].text
+
+
+def test_chunk_cache_revalidates_on_change(tmp_path):
+    path = tmp_path / "a.py"
+    path.write_text("first = 1\n")
+    cache = ChunkCache()
+    chunks = cache.get_chunks(path)
+    assert cache.get_chunks(path) is chunks
+    path.write_text("second = 2\nthird = 3\n")
+    assert cache.get_chunks(path)[0].text.startswith("second")
+
+
+def test_small_attachments_are_included_whole(tmp_path):
+    path = tmp_path / "small.py"
+    path.write_text("def hello():\n    return 1\n")
+    attachments = FileAttachments()
+    assert attachments.attach(path) and not attachments.attach(path)
+    context = attachments("anything", 10000)
+    assert "```python" in context and "def hello" in context and "省略" not in context
+
+
+def test_large_attachments_select_relevant_chunks_within_budget(tmp_path):
+    path = tmp_path / "big.py"
+    path.write_text(_source(40))
+    attachments = FileAttachments()
+    attachments.attach(path)
+    budget = 1500
+    context = attachments("where is compute_27 used?", budget)
+    assert "compute_27" in context and "篇幅有限" in context and "因篇幅省略" in context
+    assert "compute_12(" not in context
+    assert estimate_tokens(context) <= budget
+
+
+def test_unreadable_attachments_are_reported(tmp_path):
+    binary = tmp_path / "data.bin"
+    binary.write_bytes(b"\0" * 1000)
+    attachments = FileAttachments()
+    attachments.attach(binary)
+    attachments.attach(tmp_path / "missing.py")
+    context = attachments("question", 1000)
+    assert "data.bin" in context and "missing.py" in context and "无法读取" in context
+    attachments.clear()
+    assert attachments("question", 1000) is None and len(attachments) == 0
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import errno
+import threading
+import pytest
+from src import file_operations
+from src.file_operations import FileOperation, FileOperationQueue, unique_destination
+
+
+class _Queue(FileOperationQueue):
+    """记录完成的操作，run() 提交后等待其结束"""
+
+    def __init__(self, on_progress=None):
+        self.completed = []
+        self._finished = threading.Event()
+        super().__init__(on_progress=on_progress, on_complete=self._done)
+
+    def _done(self, operation):
+        self.completed.append(operation)
+        self._finished.set()
+
+    def run(self, operation: FileOperation) -> FileOperation:
+        self._finished.clear()
+        self.submit(operation)
+        assert self._finished.wait(5)
+        return operation
+
+
+@pytest.fixture
+def queue():
+    queue = _Queue()
+    yield queue
+    queue.shutdown()
+
+
+def _make_tree(root):
+    (root / "sub").mkdir(parents=True)
+    (root / "a.txt").write_text("alpha")
+    (root / "sub" / "b.bin").write_bytes(b"x" * 5000)
+    return root
+
+
+def _snapshot(root):
+    return sorted((str(path.relative_to(root)), path.read_bytes() if path.is_file() else None)
+                  for path in root.rglob("*"))
+
+
+def test_copy_tree_in_chunks(queue, tmp_path, monkeypatch):
+    monkeypatch.setattr(file_operations, "COPY_CHUNK_SIZE", 1024)
+    source = _make_tree(tmp_path / "src")
+    destination = tmp_path / "copy"
+    operation = queue.run(FileOperation("copy", source, destination))
+    assert operation.status == "done" and operation.progress == 1.0
+    assert _snapshot(destination) == _snapshot(source)
+    assert operation.delta == [("created", str(destination), None, True)]
+    assert operation.total_bytes == 5005 and operation.done_items == operation.total_items == 4
+
+
+def test_move_and_cross_device_fallback(queue, tmp_path, monkeypatch):
+    source = _make_tree(tmp_path / "src")
+    expected = _snapshot(source)
+    moved = tmp_path / "moved"
+    operation = queue.run(FileOperation("move", source, moved))
+    assert operation.status == "done" and not source.exists() and _snapshot(moved) == expected
+    assert operation.delta == [("deleted", str(source), None, True), ("created", str(moved), None, True)]
+
+    def cross_device(src, dst):
+        raise OSError(errno.EXDEV, "cross-device link")
+
+    monkeypatch.setattr(file_operations.os, "rename", cross_device)
+    again = tmp_path / "again"
+    operation = queue.run(FileOperation("move", moved, again))
+    assert operation.status == "done" and not moved.exists() and _snapshot(again) == expected
+
+
+def test_delete_tree(queue, tmp_path):
+    source = _make_tree(tmp_path / "src")
+    operation = queue.run(FileOperation("delete", source))
+    assert operation.status == "done" and not source.exists()
+    assert operation.delta == [("deleted", str(source), None, True)]
+    assert operation.done_items == operation.total_items == 4
+
+
+def test_invalid_destinations_fail_without_side_effects(queue, tmp_path):
+    source = _make_tree(tmp_path / "src")
+    into_self = queue.run(FileOperation("copy", source, source / "sub" / "copy"))
+    assert into_self.status == "failed" and isinstance(into_self.error, ValueError)
+    assert not (source / "sub" / "copy").exists()
+    (tmp_path / "taken").mkdir()
+    existing = queue.run(FileOperation("move", source, tmp_path / "taken"))
+    assert existing.status == "failed" and isinstance(existing.error, FileExistsError)
+    assert source.exists()
+
+
+def test_cancelled_copy_removes_partial_result(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_operations, "COPY_CHUNK_SIZE", 16)
+    monkeypatch.setattr(file_operations, "PROGRESS_INTERVAL", 0)
+    source = tmp_path / "big.bin"
+    source.write_bytes(b"y" * 4096)
+    # 复制出第一个分块后取消
+    queue = _Queue(on_progress=lambda operation: operation.done_bytes and operation.cancel())
+    try:
+        operation = queue.run(FileOperation("copy", source, tmp_path / "big copy.bin"))
+    finally:
+        queue.shutdown()
+    assert operation.status == "cancelled" and operation.delta == []
+    assert not (tmp_path / "big copy.bin").exists()
+
+
+def test_unique_destination_and_touches(tmp_path):
+    target = tmp_path / "report.txt"
+    assert unique_destination(target) == target
+    target.write_text("")
+    assert unique_destination(target).name == "report 副本.txt"
+    (tmp_path / "report 副本.txt").write_text("")
+    assert unique_destination(target).name == "report 副本 2.txt"
+
+    operation = FileOperation("move", tmp_path / "a", tmp_path / "b")
+    assert operation.touches(str(tmp_path / "a" / "x.py"))
+    assert operation.touches(str(tmp_path / "b"))
+    assert not operation.touches(str(tmp_path / "ab"))
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from src.file_tree_model import FileTreeModel, scan_directory
+
+
+def _names(model, path):
+    files, dirs = model.sorted_children(model.get(path))
+    return [node.name for node in files], [node.name for node in dirs]
+
+
+def test_scan_directory_skips_hidden_entries(tmp_path):
+    (tmp_path / "a.py").write_text("x")
+    (tmp_path / ".hidden").write_text("x")
+    (tmp_path / "__pycache__").mkdir()
+    (tmp_path / "pkg").mkdir()
+    nodes = {node.name: node for node in scan_directory(tmp_path)}
+    assert set(nodes) == {"a.py", "pkg"}
+    assert nodes["a.py"].size == 1 and not nodes["a.py"].is_dir
+    assert nodes["pkg"].is_dir and not nodes["pkg"].loaded
+
+
+def test_load_directory_is_lazy_and_cached(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "inner.py").write_text("")
+    model = FileTreeModel(tmp_path)
+    root = model.load_directory(tmp_path)
+    assert root is model.root
+    assert not model.get(tmp_path / "pkg").loaded
+    model.load_directories([tmp_path / "pkg"])
+    assert _names(model, tmp_path / "pkg") == (["inner.py"], [])
+    # 已加载的目录不再扫描
+    (tmp_path / "pkg" / "later.py").write_text("")
+    assert model.load_directory(tmp_path / "pkg") is model.get(tmp_path / "pkg")
+    assert _names(model, tmp_path / "pkg") == (["inner.py"], [])
+
+
+def test_apply_event_updates_only_affected_nodes(tmp_path):
+    model = FileTreeModel(tmp_path)
+    model.load_directory(tmp_path)
+    new_file = tmp_path / "new.txt"
+    new_file.write_text("hello")
+    assert model.apply_event("created", str(new_file)) == {model.root.key}
+    assert model.get(new_file).size == 5
+
+    new_file.write_text("hello world")
+    assert model.apply_event("modified", str(new_file)) == {str(new_file)}
+    assert model.get(new_file).size == 11
+    # 内容未变化的修改事件不产生更新
+    assert model.apply_event("modified", str(new_file)) == set()
+
+    moved = tmp_path / "moved.txt"
+    new_file.rename(moved)
+    assert model.apply_event("moved", str(new_file), str(moved)) == {model.root.key}
+    assert model.get(new_file) is None and model.get(moved) is not None
+
+    moved.unlink()
+    assert model.apply_event("deleted", str(moved)) == {model.root.key}
+    assert _names(model, tmp_path) == ([], [])
+
+
+def test_events_under_unloaded_directories_are_ignored(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    model = FileTreeModel(tmp_path)
+    model.load_directory(tmp_path)
+    (tmp_path / "pkg" / "a.py").write_text("")
+    assert model.apply_event("created", str(tmp_path / "pkg" / "a.py")) == set()
+    assert model.get(tmp_path / "pkg" / "a.py") is None
+
+
+def test_removing_directory_drops_subtree(tmp_path):
+    pkg = tmp_path / "pkg"
+    pkg.mkdir()
+    (pkg / "a.py").write_text("")
+    model = FileTreeModel(tmp_path)
+    model.load_directories([tmp_path, pkg])
+    assert model.get(pkg / "a.py") is not None
+    (pkg / "a.py").unlink()
+    pkg.rmdir()
+    model.apply_event("deleted", str(pkg), is_directory=True)
+    assert model.get(pkg) is None and model.get(pkg / "a.py") is None
+
+
+def test_reload_directory_merges_changes(tmp_path):
+    (tmp_path / "keep.py").write_text("")
+    (tmp_path / "gone.py").write_text("")
+    model = FileTreeModel(tmp_path)
+    model.load_directory(tmp_path)
+    keep = model.get(tmp_path / "keep.py")
+    (tmp_path / "gone.py").unlink()
+    (tmp_path / "added.py").write_text("")
+    assert model.reload_directory(tmp_path)
+    assert _names(model, tmp_path) == (["added.py", "keep.py"], [])
+    # 未变化的节点保持原对象
+    assert model.get(tmp_path / "keep.py") is keep
+    assert not model.reload_directory(tmp_path)
+
+
+def test_snapshot_round_trip_and_validation(tmp_path):
+    (tmp_path / "a.py").write_text("abc")
+    (tmp_path / "pkg").mkdir()
+    model = FileTreeModel(tmp_path)
+    model.load_directory(tmp_path)
+    exported = model.export_directories([tmp_path])
+
+    restored_model = FileTreeModel(tmp_path)
+    assert restored_model.restore_directories(exported) == [str(tmp_path.resolve())]
+    assert _names(restored_model, tmp_path) == (["a.py"], ["pkg"])
+
+    (tmp_path / "b.py").write_text("")
+    assert restored_model.validate_directories([tmp_path]) == {str(tmp_path.resolve())}
+    assert _names(restored_model, tmp_path) == (["a.py", "b.py"], ["pkg"])
+
+
+def test_reset_cancels_previous_root(tmp_path):
+    other = tmp_path / "other"
+    other.mkdir()
+    model = FileTreeModel(tmp_path)
+    generation = model.generation
+    model.reset(other)
+    assert model.is_cancelled(generation)
+    assert model.get(tmp_path) is None and model.root.key == str(other.resolve())
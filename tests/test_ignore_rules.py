@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from src.ignore_rules import IgnoreRules, parse_ignore_lines
+
+
+def _rules(tmp_path, gitignore: str, **kwargs):
+    (tmp_path / ".gitignore").write_text(gitignore)
+    return IgnoreRules(tmp_path, **kwargs)
+
+
+def test_default_patterns(tmp_path):
+    rules = IgnoreRules(tmp_path)
+    assert rules.is_ignored(tmp_path / ".git", True)
+    assert rules.is_ignored(tmp_path / "node_modules", True)
+    assert rules.is_ignored(tmp_path / "pkg" / "__pycache__", True)
+    assert rules.is_ignored(tmp_path / ".env", False)
+    assert not rules.is_ignored(tmp_path / "main.py", False)
+    # 根目录本身和根目录外的路径不视为忽略
+    assert not rules.is_ignored(tmp_path, True)
+    assert not rules.is_ignored(tmp_path.parent / "elsewhere.py", False)
+
+
+def test_negation_overrides_earlier_rule(tmp_path):
+    rules = _rules(tmp_path, "*.log\n!keep.log\n")
+    assert rules.is_ignored(tmp_path / "debug.log", False)
+    assert not rules.is_ignored(tmp_path / "keep.log", False)
+    assert not rules.is_ignored(tmp_path / "sub" / "keep.log", False)
+
+
+def test_negation_cannot_reinclude_file_in_ignored_directory(tmp_path):
+    rules = _rules(tmp_path, "logs/\n!logs/keep.log\n")
+    assert rules.is_ignored(tmp_path / "logs", True)
+    assert rules.is_ignored(tmp_path / "logs" / "keep.log", False)
+
+
+def test_dir_only_rule_does_not_match_files(tmp_path):
+    rules = _rules(tmp_path, "out/\n")
+    assert rules.is_ignored(tmp_path / "out", True)
+    assert rules.is_ignored(tmp_path / "nested" / "out", True)
+    assert not rules.is_ignored(tmp_path / "out", False)
+
+
+def test_anchored_and_unanchored_patterns(tmp_path):
+    rules = _rules(tmp_path, "/root_only.txt\ndocs/*.md\nanywhere.txt\n")
+    assert rules.is_ignored(tmp_path / "root_only.txt", False)
+    assert not rules.is_ignored(tmp_path / "sub" / "root_only.txt", False)
+    assert rules.is_ignored(tmp_path / "docs" / "a.md", False)
+    assert not rules.is_ignored(tmp_path / "sub" / "docs" / "a.md", False)
+    # 不含 "/" 的规则匹配任意层级
+    assert rules.is_ignored(tmp_path / "a" / "b" / "anywhere.txt", False)
+
+
+def test_double_star_patterns(tmp_path):
+    rules = _rules(tmp_path, "**/gen/*.py\nassets/**\n")
+    assert rules.is_ignored(tmp_path / "gen" / "a.py", False)
+    assert rules.is_ignored(tmp_path / "x" / "y" / "gen" / "a.py", False)
+    assert not rules.is_ignored(tmp_path / "gen" / "a.txt", False)
+    assert rules.is_ignored(tmp_path / "assets" / "img" / "logo.png", False)
+
+
+def test_nested_ignore_file_applies_relative_to_its_directory(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / ".gitignore").write_text("/local.txt\n*.tmp\n")
+    rules = IgnoreRules(tmp_path)
+    assert rules.is_ignored(tmp_path / "pkg" / "local.txt", False)
+    assert not rules.is_ignored(tmp_path / "local.txt", False)
+    assert rules.is_ignored(tmp_path / "pkg" / "deep" / "a.tmp", False)
+    assert not rules.is_ignored(tmp_path / "a.tmp", False)
+
+
+def test_child_matcher_agrees_with_is_ignored(tmp_path):
+    rules = _rules(tmp_path, "*.log\n!keep.log\nbuild/\n")
+    matcher = rules.child_matcher(tmp_path)
+    for name, is_dir in [("a.log", False), ("keep.log", False), ("build", True), ("build", False),
+                         (".hidden", False), ("main.py", False)]:
+        assert matcher(name, is_dir) == rules.is_ignored(tmp_path / name, is_dir)
+    # 被忽略目录下的子项全部忽略
+    assert rules.child_matcher(tmp_path / "build")("anything.py", False)
+
+
+def test_reload_picks_up_changed_ignore_file(tmp_path):
+    rules = _rules(tmp_path, "*.log\n")
+    assert rules.is_ignored(tmp_path / "a.log", False)
+    (tmp_path / ".gitignore").write_text("*.txt\n")
+    rules.reload()
+    assert not rules.is_ignored(tmp_path / "a.log", False)
+    assert rules.is_ignored(tmp_path / "a.txt", False)
+
+
+def test_extra_patterns_and_disabled_ignore_files(tmp_path):
+    rules = _rules(tmp_path, "*.log\n", extra_patterns=["*.bak"], use_ignore_files=False)
+    assert rules.is_ignored(tmp_path / "a.bak", False)
+    assert not rules.is_ignored(tmp_path / "a.log", False)
+
+
+def test_comments_and_escaped_leading_characters(tmp_path):
+    rules = _rules(tmp_path, "# comment\n\n\\#literal\n\\!bang\ntrailing   \n")
+    assert len(parse_ignore_lines((tmp_path / ".gitignore").read_text().splitlines())) == 3
+    assert rules.is_ignored(tmp_path / "#literal", False)
+    # "\!" 开头是字面的 "!"，不是取反规则
+    assert rules.is_ignored(tmp_path / "!bang", False)
+    assert rules.is_ignored(tmp_path / "trailing", False)
+    assert not rules.is_ignored(tmp_path / "comment", False)
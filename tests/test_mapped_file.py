@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+import pytest
+from src import mapped_file
+from src.mapped_file import MappedTextFile
+
+
+def _open_indexed(path, encoding="utf-8"):
+    done = threading.Event()
+    mapped = MappedTextFile(path, encoding, on_progress=lambda m: m.is_complete and done.set())
+    mapped.start_indexing()
+    assert mapped.is_complete or done.wait(5)
+    return mapped
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # 缩小分块和检查点间隔，让少量行也能跨越分块、小块与检查点边界
+    monkeypatch.setattr(mapped_file, "LINE_INDEX_STRIDE", 7)
+    monkeypatch.setattr(mapped_file, "INDEX_CHUNK_SIZE", 64)
+    monkeypatch.setattr(mapped_file, "INDEX_BLOCK_SIZE", 16)
+
+
+@pytest.mark.parametrize("trailing_newline", [True, False])
+def test_every_line_is_reachable(tmp_path, small_chunks, trailing_newline):
+    lines = [f"line {index} " + "x" * (index % 13) for index in range(200)]
+    path = tmp_path / "big.txt"
+    path.write_bytes(("\n".join(lines) + ("\n" if trailing_newline else "")).encode())
+    mapped = _open_indexed(path)
+    try:
+        assert mapped.indexed_lines == len(lines)
+        for start in range(0, len(lines), 5):
+            assert mapped.get_lines(start, 9) == lines[start:start + 9]
+        assert mapped.get_lines(len(lines), 5) == []
+        assert mapped.get_lines(-1, 5) == []
+    finally:
+        mapped.close()
+
+
+def test_crlf_encoding_and_long_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(mapped_file, "MAX_LINE_BYTES", 10)
+    path = tmp_path / "gbk.txt"
+    path.write_bytes("中文\r\n".encode("gbk") + b"0123456789abcdef\r\nend")
+    mapped = _open_indexed(path, "gbk")
+    try:
+        first, second, last = mapped.get_lines(0, 3)
+        assert first == "中文" and last == "end"
+        assert second.startswith("0123456789 ") and "已截断" in second
+    finally:
+        mapped.close()
+
+
+def test_empty_file_and_close(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    mapped = MappedTextFile(path)
+    assert mapped.is_complete and mapped.indexed_lines == 0
+    assert mapped.get_lines(0, 10) == []
+    mapped.close()
+
+    path.write_bytes(b"a\nb\n")
+    mapped = _open_indexed(path)
+    mapped.close()
+    assert mapped.get_lines(0, 2) == []
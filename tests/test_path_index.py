@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+import pytest
+from src.path_index import PathIndex, _IndexState
+
+
+def _make_index(tmp_path, paths):
+    index = PathIndex(tmp_path / "root", index_dir=tmp_path / "index")
+    index._state = _IndexState(paths)
+    return index
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = _make_index(tmp_path, [
+        "src/file_explorer.py",
+        "src/file_manager.py",
+        "docs/explorer.md",
+        "explorer.py",
+        "tests/test_file_explorer.py",
+        "lib/src/token.py",
+        "src/lib/helpers.py",
+        "assets/fexp_icon.png",
+        "中文/说明.md",
+    ])
+    yield index
+    index.stop()
+
+
+def test_ranking_tiers(index):
+    # 文件名前缀 > 文件名包含 > 文件名子序列 > 完整路径子序列，同层内短路径在前
+    assert index.search("explorer") == ["explorer.py", "docs/explorer.md", "src/file_explorer.py",
+                                        "tests/test_file_explorer.py"]
+    assert index.search("fexp") == ["assets/fexp_icon.png", "src/file_explorer.py",
+                                    "tests/test_file_explorer.py"]
+    assert index.search("srcfm") == ["src/file_manager.py"]
+
+
+def test_query_normalization_and_limit(index):
+    assert index.search("  EXPLORER ") == index.search("explorer")
+    assert index.search("src\\lib") == index.search("src/lib")
+    assert index.search("explorer", limit=2) == ["explorer.py", "docs/explorer.md"]
+    assert index.search("") == [] and index.search("zzz") == []
+
+
+def test_path_queries_prefer_substring_matches(index):
+    assert index.search("src/lib") == ["src/lib/helpers.py"]
+    assert index.search("lib/tok") == ["lib/src/token.py"]
+    # 不连续时按完整路径子序列匹配
+    assert index.search("l/s/t") == ["lib/src/token.py"]
+
+
+def test_non_ascii_names(index):
+    assert index.search("说明") == ["中文/说明.md"]
+    assert index.search("中说") == ["中文/说明.md"]
+
+
+def test_incremental_add_and_remove(index):
+    state = index._state
+    assert state.add("src/explorer_view.py") and not state.add("src/explorer_view.py")
+    assert index.search("explorer")[:2] == ["explorer.py", "docs/explorer.md"]
+    assert "src/explorer_view.py" in index.search("explorer")
+    assert state.remove("explorer.py")
+    assert "explorer.py" not in index.search("explorer")
+    assert state.remove_prefix("src/") == 4
+    assert index.search("helpers") == []
+    assert len(index) == 5
+
+
+def test_delete_events(index):
+    root = index.root
+    index._state.add("src2/file_explorer.py")
+    # 文件的删除事件只删除该条目
+    index.apply_events([("deleted", str(root / "src" / "file_manager.py"), None, False)])
+    assert index.search("file_manager") == [] and len(index) == 9
+    # 目录的删除事件删除其下的全部条目，不影响同前缀的其他目录
+    index.apply_events([("deleted", str(root / "src"), None, True)])
+    assert index.search("file_explorer") == ["src2/file_explorer.py", "tests/test_file_explorer.py"]
+    # 类型不明、但不在索引中的路径按目录处理
+    index.apply_events([("deleted", str(root / "lib"), None, False)])
+    assert index.search("token") == []
+    # 删除后重新添加的路径只出现一次
+    index._state.add("lib/src/token.py")
+    index.apply_events([("deleted", str(root / "lib"), None, True)])
+    assert index.search("token") == [] and len(index) == 6
+
+
+def test_scan_limit_only_drops_lower_ranked_candidates(tmp_path):
+    paths = [f"dir{i:03d}/module{i:03d}.py" for i in range(300)]
+    index = _make_index(tmp_path, paths)
+    try:
+        full = index.search("dmpy", limit=1000)
+        assert len(full) == 300
+        assert index.search("dmpy", limit=1000, scan_limit=50) == full[:50]
+    finally:
+        index.stop()
+
+
+def test_build_save_and_reload(tmp_path):
+    root = tmp_path / "root"
+    (root / "pkg").mkdir(parents=True)
+    (root / "pkg" / "mod.py").write_text("")
+    (root / "top.txt").write_text("")
+    index = PathIndex(root, index_dir=tmp_path / "index")
+    index.start()
+    deadline = time.monotonic() + 5
+    while not index.is_ready and time.monotonic() < deadline:
+        time.sleep(0.01)
+    index.stop()
+    assert index.is_ready and sorted(index.search("o", limit=10)) == ["pkg/mod.py", "top.txt"]
+
+    saved = PathIndex(root, index_dir=tmp_path / "index")
+    try:
+        assert sorted(saved._load()) == ["pkg/mod.py", "top.txt"]
+    finally:
+        saved.stop()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import random
+import pytest
+from src import text_buffer
+from src.text_buffer import TextBuffer
+
+
+def _random_edit(rng, buffer, reference: str) -> str:
+    offset = rng.randint(0, len(reference))
+    length = rng.randint(0, min(8, len(reference) - offset))
+    text = rng.choice(["", "x", "ab\n", "\n", "中文\n行", "line\nline\n"])
+    buffer.replace(offset, length, text)
+    return reference[:offset] + text + reference[offset + length:]
+
+
+def _assert_consistent(sequence, reference: str):
+    lines = reference.split("\n")
+    assert sequence.text == reference and sequence.length == len(reference)
+    assert sequence.line_count == len(lines)
+    assert sequence.get_lines(0, len(lines)) == lines
+    for line in range(0, len(lines), 3):
+        assert sequence.get_lines(line, 2) == lines[line:line + 2]
+        assert sequence.offset_of_line(line) == len("\n".join(lines[:line])) + (1 if line else 0)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_edits_match_reference(monkeypatch, seed):
+    # 缩小片段上限，让随机编辑同时覆盖片段拆分、合并与整理
+    monkeypatch.setattr(text_buffer, "MAX_PIECES", 16)
+    rng = random.Random(seed)
+    reference = "first\nsecond\nthird\n"
+    buffer = TextBuffer(reference)
+    for _ in range(300):
+        reference = _random_edit(rng, buffer, reference)
+        # 交替使用缓存文本和片段拼接两条读取路径
+        if rng.random() < 0.3:
+            _assert_consistent(buffer, reference)
+    _assert_consistent(buffer, reference)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_changed_lines_since_covers_all_edits(seed):
+    rng = random.Random(seed)
+    reference = "\n".join(f"line {i}" for i in range(30))
+    buffer = TextBuffer(reference)
+    for _ in range(20):
+        older, old_text = buffer.snapshot(), reference
+        for _ in range(rng.randint(1, 6)):
+            reference = _random_edit(rng, buffer, reference)
+        newer = buffer.snapshot()
+        first, old_end, new_end = newer.changed_lines_since(older)
+        old_lines, new_lines = old_text.split("\n"), reference.split("\n")
+        assert old_lines[:first] + new_lines[first:new_end] + old_lines[old_end:] == new_lines
+
+
+def test_snapshot_is_immutable():
+    buffer = TextBuffer("a\nb\n")
+    snapshot = buffer.snapshot()
+    buffer.insert(0, "new\n")
+    buffer.delete(len("new\n"), 2)
+    assert snapshot.text == "a\nb\n" and snapshot.get_lines(1, 1) == ["b"]
+    assert buffer.text == "new\nb\n"
+
+
+def test_set_text_derives_minimal_edit():
+    buffer = TextBuffer("alpha\nbeta\ngamma\n")
+    older = buffer.snapshot()
+    assert buffer.set_text("alpha\nBETA\ngamma\n")
+    assert not buffer.set_text("alpha\nBETA\ngamma\n")
+    assert buffer.snapshot().changed_lines_since(older) == (1, 2, 2)
+
+
+def test_modified_state_and_reset():
+    buffer = TextBuffer("x")
+    assert not buffer.is_modified
+    buffer.insert(1, "y")
+    assert buffer.is_modified
+    buffer.mark_saved()
+    assert not buffer.is_modified
+    older = buffer.snapshot()
+    buffer.reset("restored", modified=True)
+    assert buffer.is_modified
+    # 重新载入内容后不再与旧快照做增量比较
+    assert buffer.snapshot().changed_lines_since(older) is None
+    assert older.changed_lines_since(buffer.snapshot()) is None
+
+
+def test_edit_log_overflow_returns_none(monkeypatch):
+    monkeypatch.setattr(text_buffer, "EDIT_LOG_SIZE", 4)
+    buffer = TextBuffer("abc")
+    older = buffer.snapshot()
+    for _ in range(5):
+        buffer.insert(0, "x")
+    assert buffer.snapshot().changed_lines_since(older) is None
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import codecs
+import pytest
+from src.text_encoding import (ENCODING_SAMPLE_SIZE, BinaryFileError, detect_encoding, read_text_file,
+                               sniff_file_encoding)
+
+
+@pytest.mark.parametrize("data, expected", [
+    (codecs.BOM_UTF8 + "中文".encode("utf-8"), "utf-8-sig"),
+    (codecs.BOM_UTF16_LE + "ab".encode("utf-16-le"), "utf-16"),
+    (codecs.BOM_UTF32_LE + "ab".encode("utf-32-le"), "utf-32"),
+    ("print('中文')".encode("utf-8"), "utf-8"),
+    ("中文注释".encode("gbk"), "gbk"),
+    (b"caf\xe9 \xff\xfe\xfd", "latin-1"),
+    (b"", "utf-8"),
+])
+def test_detect_encoding(data, expected):
+    assert detect_encoding(data) == expected
+
+
+def test_detect_encoding_binary():
+    assert detect_encoding(b"\x7fELF" + b"\0" * 100) is None
+
+
+def test_sample_cut_inside_multibyte_character():
+    # 样本末尾截断的多字节字符不应导致误判
+    data = "中".encode("utf-8") * 10
+    assert detect_encoding(data[:-1]) == "utf-8"
+
+
+def test_read_text_file_falls_back_when_tail_does_not_decode(tmp_path):
+    path = tmp_path / "mixed.txt"
+    path.write_bytes(b"a" * ENCODING_SAMPLE_SIZE + "中文".encode("gbk"))
+    content, encoding = read_text_file(path)
+    assert encoding == "gbk" and content.endswith("中文")
+
+    path.write_bytes(b"a" * ENCODING_SAMPLE_SIZE + b"\x81")
+    content, encoding = read_text_file(path)
+    assert encoding == "latin-1" and content.endswith("\x81")
+
+
+def test_read_text_file_uses_and_revalidates_cache(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_bytes("你好".encode("gbk"))
+    assert read_text_file(path) == ("你好", "gbk")
+    assert read_text_file(path) == ("你好", "gbk")
+    path.write_bytes("你好, world".encode("utf-8"))
+    assert read_text_file(path) == ("你好, world", "utf-8")
+
+
+def test_read_text_file_rejects_binary(tmp_path):
+    path = tmp_path / "blob.bin"
+    path.write_bytes(bytes(range(256)) * 4)
+    with pytest.raises(BinaryFileError):
+        read_text_file(path)
+    assert sniff_file_encoding(path) is None
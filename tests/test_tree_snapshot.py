@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+from src import tree_snapshot
+from src.tree_snapshot import TreeSnapshotStore
+
+
+def _directories(root):
+    root = str(root)
+    return {
+        root: [["pkg", True, 0, 1.0], ["README.md", False, 12, 2.0]],
+        os.path.join(root, "pkg"): [["sub", True, 0, 3.0], ["mod.py", False, 5, 4.0]],
+        os.path.join(root, "pkg", "sub"): [["deep.py", False, 1, 5.0]],
+    }
+
+
+def test_save_and_load_round_trip(tmp_path):
+    root = tmp_path / "root"
+    store = TreeSnapshotStore(tmp_path / "snapshot")
+    directories = _directories(root)
+    expanded = [str(root), os.path.join(str(root), "pkg"), os.path.join(str(root), "missing")]
+    store.save(root, directories, expanded)
+    loaded_directories, loaded_expanded = store.load(root)
+    assert loaded_directories == directories
+    # 没有导出内容的展开目录不保存
+    assert sorted(loaded_expanded) == sorted(expanded[:2])
+    # 路径以相对形式保存，不含根目录
+    data = json.loads(next((tmp_path / "snapshot").glob("*.json")).read_text(encoding="utf-8"))
+    assert sorted(data["dirs"]) == ["", "pkg", os.path.join("pkg", "sub")]
+
+
+def test_stale_or_missing_snapshot_is_rejected(tmp_path):
+    root, other = tmp_path / "root", tmp_path / "other"
+    store = TreeSnapshotStore(tmp_path / "snapshot")
+    assert store.load(root) is None
+    store.save(root, _directories(root), [str(root)])
+    assert store.load(other) is None
+    snapshot_file = store._snapshot_file(str(root))
+    data = json.loads(snapshot_file.read_text(encoding="utf-8"))
+    # 文件中记录的根目录与请求的不一致（例如复制了快照目录）时不使用
+    snapshot_file.write_text(json.dumps(dict(data, root=str(other))), encoding="utf-8")
+    assert store.load(root) is None
+    # 格式版本不一致或内容损坏时不使用
+    snapshot_file.write_text(json.dumps(dict(data, version=tree_snapshot.SNAPSHOT_VERSION + 1)), encoding="utf-8")
+    assert store.load(root) is None
+    snapshot_file.write_text("{", encoding="utf-8")
+    assert store.load(root) is None
+
+
+def test_entry_limit_drops_deeper_directories(tmp_path, monkeypatch):
+    monkeypatch.setattr(tree_snapshot, "SNAPSHOT_MAX_ENTRIES", 4)
+    root = tmp_path / "root"
+    store = TreeSnapshotStore(tmp_path / "snapshot")
+    store.save(root, _directories(root), [str(root)])
+    directories, _ = store.load(root)
+    assert sorted(directories) == [str(root), os.path.join(str(root), "pkg")]
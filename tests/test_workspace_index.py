@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import shutil
+import time
+import pytest
+from src.workspace_index import WorkspaceIndex, WorkspaceRetriever
+
+
+def _wait_ready(index: WorkspaceIndex):
+    deadline = time.monotonic() + 5
+    while not index.is_ready and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert index.is_ready
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    root = tmp_path / "repo"
+    (root / "pkg").mkdir(parents=True)
+    (root / "pkg" / "tokenizer.py").write_text(
+        "def tokenize_source(text):\n    tokens = split_tokens(text)\n    return tokens\n")
+    (root / "pkg" / "render.py").write_text(
+        "def render_page(page):\n    return page.render()\n\n\ndef paint_canvas(canvas):\n    canvas.paint()\n")
+    (root / "README.md").write_text("This project renders pages and paints the canvas.\n")
+    index = WorkspaceIndex(root)
+    index.start()
+    _wait_ready(index)
+    yield root, index
+    index.stop()
+
+
+def test_bm25_ranks_files_by_rare_terms(workspace):
+    root, index = workspace
+    assert len(index) == 3
+    results = index.search("how are tokens split?")
+    assert results[0][0] == str(root / "pkg" / "tokenizer.py")
+    assert all(score > 0 for _, score in results)
+    ranked = [path for path, _ in index.search("paint_canvas")]
+    assert ranked[0] == str(root / "pkg" / "render.py")
+
+
+def test_irrelevant_or_stopword_queries_retrieve_nothing(workspace):
+    _, index = workspace
+    assert index.search("kubernetes helm chart") == []
+    assert index.retrieve("kubernetes helm chart", 4000) is None
+    # 停用词不参与检索
+    assert index.retrieve("return the self class", 4000) is None
+
+
+def test_retrieve_formats_relevant_chunks(workspace):
+    root, index = workspace
+    context = index.retrieve("where is tokenize_source defined?", 4000)
+    assert "pkg/tokenizer.py" in context.replace("\\", "/") and "def tokenize_source" in context
+    assert "render_page" not in context
+    # 已作为附件发送的文件不再重复检索
+    assert index.retrieve("tokenize_source", 4000, exclude=[str(root / "pkg" / "tokenizer.py")]) is None
+    assert index.retrieve("tokenize_source", 10) is None
+
+
+def test_events_update_the_index(workspace):
+    root, index = workspace
+    new_file = root / "pkg" / "scheduler.py"
+    new_file.write_text("def schedule_frame():\n    pass\n")
+    index.apply_events([("created", str(new_file), None, False)])
+    # 事件线程只记录路径，文件内容由更新线程读取
+    assert str(new_file) in index._pending_paths
+    index._apply_pending()
+    assert index.search("schedule_frame")[0][0] == str(new_file)
+
+    new_file.write_text("def unrelated():\n    pass\n")
+    index.apply_events([("modified", str(new_file), None, False)])
+    index._apply_pending()
+    assert index.search("schedule_frame") == []
+
+    # 已索引文件的删除立即生效，不需要更新线程
+    new_file.unlink()
+    index.apply_events([("deleted", str(new_file), None, False)])
+    assert len(index) == 3 and not index._pending_paths
+
+    shutil.rmtree(root / "pkg")
+    index.apply_events([("deleted", str(root / "pkg"), None, True)])
+    index._apply_pending()
+    assert len(index) == 1
+
+
+def test_directory_delete_reported_as_file(workspace):
+    root, index = workspace
+    (root / "pkg2").mkdir()
+    (root / "pkg2" / "render.py").write_text("def render_page(page):\n    pass\n")
+    index.rescan_directories([str(root / "pkg2")])
+    index._apply_pending()
+    assert len(index) == 4
+    (root / "pkg2" / "render.py").unlink()
+    (root / "pkg2").rmdir()
+    # 类型不明、不是已索引文件的路径按目录处理，同前缀的 pkg 不受影响
+    index.apply_events([("deleted", str(root / "pkg2"), None, False)])
+    index._apply_pending()
+    assert len(index) == 3
+    assert index.search("render_page")[0][0] == str(root / "pkg" / "render.py")
+
+
+def test_retriever_is_disabled_by_default_switch(tmp_path):
+    (tmp_path / "a.py").write_text("def unique_symbol():\n    pass\n")
+    index = WorkspaceIndex(tmp_path)
+    enabled = [False]
+    retriever = WorkspaceRetriever(index, lambda: enabled[0])
+    try:
+        assert retriever("unique_symbol", 4000) is None and not index.started
+        enabled[0] = True
+        retriever("unique_symbol", 4000)
+        _wait_ready(index)
+        assert "unique_symbol" in retriever("unique_symbol", 4000)
+    finally:
+        index.stop()